@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Serverless函数共享运行时
+保存上传文件，并在热实例中复用已解析的处理器和派生结果
+
+以下划线开头的文件不会被Vercel当作函数部署。
+pandas和核心处理模块在首次需要时才导入，保证冷启动足够轻量。
+"""
+
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 上传文件目录，Serverless环境只有临时目录可写
+UPLOAD_DIR = os.environ.get('TRADING_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'trading_uploads'))
+
+# 热实例中最多缓存的上传数量，超出后按最近最少使用淘汰
+MAX_CACHED_UPLOADS = int(os.environ.get('TRADING_MAX_CACHED_UPLOADS', '4'))
+
+# 已处理的处理器缓存: {上传ID: TradingProcessor}
+_processors = OrderedDict()
+
+# 派生结果缓存: {上传ID: {结果名称: 结果}}
+_results = {}
+
+# 构建锁: {(上传ID,) 或 (上传ID, 结果名称): Lock}，同一处理器或结果只由一个请求构建，其他请求等待后复用
+_build_locks = {}
+
+# 保护以上缓存字典的锁，构建期间不持有
+_lock = threading.Lock()
+
+# 上传ID格式，防止通过ID访问上传目录之外的文件
+_UPLOAD_ID_PATTERN = re.compile(r'^upload_[0-9a-f]{16}$')
+
+
+def upload_path(upload_id):
+    """根据上传ID获取文件路径"""
+    return os.path.join(UPLOAD_DIR, f"{upload_id}.xlsx")
+
+
+def save_upload(file_storage):
+    """保存上传的Excel文件
+
+    上传ID由文件内容哈希生成，重复上传同一文件会命中已有缓存。
+
+    Args:
+        file_storage: 请求中的上传文件对象
+
+    Returns:
+        str: 上传ID
+    """
+    content = file_storage.read()
+    upload_id = f"upload_{hashlib.sha1(content).hexdigest()[:16]}"
+
+    path = upload_path(upload_id)
+    if not os.path.exists(path):
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        tmp_path = f"{path}.part"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    return upload_id
+
+
+def _build_lock(key):
+    """获取构建锁，不存在时创建"""
+    with _lock:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def _evict(upload_id):
+    """淘汰上传的派生结果和构建锁，调用方需持有 _lock"""
+    _results.pop(upload_id, None)
+    for key in [key for key in _build_locks if key[0] == upload_id]:
+        del _build_locks[key]
+
+
+def get_processor(upload_id):
+    """获取已加载并处理完成的处理器，热实例中直接复用
+
+    同一上传的并发冷请求只有一个解析和处理文件，其他请求等待后复用结果。
+
+    Args:
+        upload_id: 上传ID
+
+    Returns:
+        TradingProcessor: 处理器实例，文件不存在或处理失败时返回None
+    """
+    with _lock:
+        if upload_id in _processors:
+            _processors.move_to_end(upload_id)
+            return _processors[upload_id]
+
+    if not upload_id or not _UPLOAD_ID_PATTERN.match(upload_id):
+        return None
+
+    path = upload_path(upload_id)
+    if not os.path.exists(path):
+        return None
+
+    with _build_lock((upload_id,)):
+        # 等待期间其他请求可能已经处理完成
+        with _lock:
+            if upload_id in _processors:
+                _processors.move_to_end(upload_id)
+                return _processors[upload_id]
+
+        from config.settings import setup_logging
+        from core.trading_processor import TradingProcessor
+
+        # Serverless环境只有临时目录可写，日志只输出到控制台
+        setup_logging(log_to_file=False)
+
+        processor = TradingProcessor()
+        if not processor.load_data(path) or not processor.process_data():
+            return None
+
+        with _lock:
+            _processors[upload_id] = processor
+            _results[upload_id] = {}
+            while len(_processors) > MAX_CACHED_UPLOADS:
+                evicted_id, _ = _processors.popitem(last=False)
+                _evict(evicted_id)
+
+    return processor
+
+
+def get_result(upload_id, name, builder):
+    """获取派生结果，同一上传的同名结果只计算一次
+
+    上传在计算期间被淘汰时结果照常返回，但不再缓存。
+
+    Args:
+        upload_id: 上传ID
+        name: 结果名称，例如 'positions'、('review', '2024-01-02')
+        builder: 生成结果的函数，接收处理器作为参数
+
+    Returns:
+        派生结果，上传不存在时返回None
+    """
+    processor = get_processor(upload_id)
+    if processor is None:
+        return None
+
+    def cached():
+        with _lock:
+            results = _results.get(upload_id)
+            return (True, results[name]) if results is not None and name in results else (False, None)
+
+    found, result = cached()
+    if found:
+        return result
+
+    with _build_lock((upload_id, name)):
+        found, result = cached()
+        if found:
+            return result
+
+        result = builder(processor)
+        with _lock:
+            # 只缓存到仍在缓存中的上传，被淘汰的上传不留下孤立的结果
+            if upload_id in _results:
+                _results[upload_id][name] = result
+    return result
+
+
+def clear_cache():
+    """清空热实例缓存"""
+    with _lock:
+        _processors.clear()
+        _results.clear()
+        _build_locks.clear()
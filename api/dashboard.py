@@ -1,14 +1,57 @@
 from flask import Flask, request, jsonify
 from datetime import datetime
+import os
+import sys
+
+# 添加api目录到Python路径，以便导入共享运行时
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import _runtime
+from utils.http_cache import conditional_json, make_etag
 
 app = Flask(__name__)
 
+def _build_dashboard_data(processor):
+    """汇总仪表盘数据"""
+    positions_df = processor.get_current_positions()
+    stock_pnl_df = processor.get_stock_historical_pnl()
+    
+    total_pnl = float(stock_pnl_df['总盈亏'].sum()) if not stock_pnl_df.empty else 0
+    win_rate = float((stock_pnl_df['总盈亏'] > 0).mean() * 100) if not stock_pnl_df.empty else 0
+    
+    stats = {
+        'total_trades': len(processor.trades_df),
+        'total_amount': round(float(processor.trades_df['交易金额'].sum()), 2),
+        'current_positions': len(positions_df),
+        'total_market_value': round(float(positions_df['持仓市值'].sum()), 2) if not positions_df.empty else 0,
+        'total_pnl': round(total_pnl, 2),
+        'win_rate': round(win_rate, 1)
+    }
+    
+    positions = []
+    for row in positions_df.to_dict('records'):
+        positions.append({
+            'symbol': row['证券代码'],
+            'name': row['证券名称'],
+            'quantity': float(row['持仓数量']),
+            'cost': float(row['持仓成本价']),
+            'current_price': float(row['当前价格']),
+            'market_value': float(row['持仓市值']),
+            'pnl': float(row['未实现盈亏'])
+        })
+    
+    return {
+        'stats': stats,
+        'positions': positions,
+        'last_updated': datetime.now().isoformat()
+    }
+
 def handler(request):
     """Vercel函数入口点"""
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200, {
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match',
             'Access-Control-Allow-Methods': 'GET,PUT,POST,DELETE,OPTIONS'
         }
     
@@ -18,53 +61,26 @@ def handler(request):
         }
     
     try:
-        # 模拟股票交易分析数据
-        dashboard_data = {
-            'stats': {
-                'total_trades': 25,
-                'total_amount': 500000,
-                'current_positions': 5,
-                'total_market_value': 485000,
-                'total_pnl': 15000,
-                'win_rate': 68.5
-            },
-            'positions': [
-                {
-                    'symbol': '000001',
-                    'name': '平安银行',
-                    'quantity': 1000,
-                    'cost': 10.50,
-                    'current_price': 11.20,
-                    'market_value': 11200,
-                    'pnl': 700
-                },
-                {
-                    'symbol': '600519',
-                    'name': '贵州茅台',
-                    'quantity': 50,
-                    'cost': 1680.00,
-                    'current_price': 1720.50,
-                    'market_value': 86025,
-                    'pnl': 2025
-                },
-                {
-                    'symbol': '300750',
-                    'name': '宁德时代',
-                    'quantity': 100,
-                    'cost': 520.00,
-                    'current_price': 485.30,
-                    'market_value': 48530,
-                    'pnl': -3470
-                }
-            ],
-            'last_updated': datetime.now().isoformat()
-        }
+        file_id = request.args.get('fileId')
+        processor = _runtime.get_processor(file_id)
+        if processor is None:
+            return jsonify({'error': '请先上传并处理数据'}), 400, {
+                'Access-Control-Allow-Origin': '*'
+            }
         
-        return jsonify(dashboard_data), 200, {
-            'Access-Control-Allow-Origin': '*'
-        }
+        # 数据版本未变化时返回304，热实例中复用已汇总的结果
+        etag = make_etag('dashboard', processor.data_tag)
+        return conditional_json(
+            request,
+            lambda: _runtime.get_result(file_id, 'dashboard', _build_dashboard_data),
+            etag=etag,
+            headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Expose-Headers': 'ETag'
+            }
+        )
         
     except Exception as e:
         return jsonify({'error': f'获取数据失败: {str(e)}'}), 500, {
             'Access-Control-Allow-Origin': '*'
-        }
\ No newline at end of file
+        }
@@ -438,14 +438,8 @@ def index():
                 reviewLoading.style.display = 'block';
 
                 try {
-                    const response = await fetch('/api/review', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ 
-                            fileId: currentFileId,
-                            date: reviewDate 
-                        })
-                    });
+                    const params = new URLSearchParams({ fileId: currentFileId, date: reviewDate });
+                    const response = await fetch('/api/review?' + params);
 
                     const result = await response.json();
                     
@@ -1,8 +1,29 @@
 from flask import Flask, request, jsonify
 from datetime import datetime
+import os
+import sys
+
+# 添加api目录到Python路径，以便导入共享运行时
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import _runtime
 
 app = Flask(__name__)
 
+def _build_summary(processor):
+    """汇总处理结果"""
+    positions_df = processor.get_current_positions()
+    stock_pnl_df = processor.get_stock_historical_pnl()
+    
+    return {
+        'total_trades': len(processor.trades_df),
+        'total_amount': round(float(processor.trades_df['交易金额'].sum()), 2),
+        'total_fees': round(float(processor.trades_df['总费用'].sum()), 2),
+        'current_positions': len(positions_df),
+        'total_market_value': round(float(positions_df['持仓市值'].sum()), 2) if not positions_df.empty else 0,
+        'total_pnl': round(float(stock_pnl_df['总盈亏'].sum()), 2) if not stock_pnl_df.empty else 0
+    }
+
 def handler(request):
     """Vercel函数入口点"""
     if request.method == 'OPTIONS':
@@ -18,10 +39,20 @@ def handler(request):
         }
     
     try:
-        # 模拟数据处理成功
+        data = request.get_json(silent=True) or {}
+        file_id = data.get('fileId')
+        
+        summary = _runtime.get_result(file_id, 'summary', _build_summary)
+        if summary is None:
+            return jsonify({'error': '请先上传数据文件'}), 400, {
+                'Access-Control-Allow-Origin': '*'
+            }
+        
         response_data = {
             'success': True,
-            'message': '数据处理完成（演示模式）',
+            'message': '数据处理完成',
+            'fileId': file_id,
+            'summary': summary,
             'timestamp': datetime.now().isoformat()
         }
         
@@ -32,4 +63,4 @@ def handler(request):
     except Exception as e:
         return jsonify({'error': f'处理失败: {str(e)}'}), 500, {
             'Access-Control-Allow-Origin': '*'
-        }
\ No newline at end of file
+        }
@@ -1,68 +1,78 @@
 from flask import Flask, request, jsonify
 from datetime import datetime
+import os
+import sys
+
+# 添加api目录到Python路径，以便导入共享运行时
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import _runtime
+from utils.http_cache import conditional_json, make_etag
 
 app = Flask(__name__)
 
+def _build_review(processor, review_date):
+    """生成复盘报告响应数据"""
+    from core.trading_review import TradingReview
+    
+    review = TradingReview(processor=processor)
+    review.set_review_date(review_date)
+    
+    return {
+        'success': True,
+        'content': review.generate_review_report(),
+        'date': review_date,
+        'generated_at': datetime.now().isoformat()
+    }
+
 def handler(request):
     """Vercel函数入口点"""
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200, {
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match',
             'Access-Control-Allow-Methods': 'GET,PUT,POST,DELETE,OPTIONS'
         }
     
-    if request.method != 'POST':
-        return jsonify({'error': '只支持POST请求'}), 405, {
+    if request.method not in ('GET', 'POST'):
+        return jsonify({'error': '只支持GET和POST请求'}), 405, {
             'Access-Control-Allow-Origin': '*'
         }
     
     try:
-        # 获取请求数据
-        data = request.get_json() or {}
+        # 获取请求数据：GET从查询参数读取，可按ETag缓存；POST从JSON请求体读取
+        data = request.args if request.method == 'GET' else (request.get_json(silent=True) or {})
+        file_id = data.get('fileId')
         review_date = data.get('date', datetime.now().strftime('%Y-%m-%d'))
         
-        # 生成模拟复盘报告
-        review_content = f"""# 股票交易复盘报告 - {review_date}
-
-## 📊 市场环境分析
-今日市场整体呈震荡上涨态势，成交量较昨日放大。
-
-## 💼 个人交易回顾
-- 交易笔数：3笔
-- 交易金额：¥85,000
-- 实现盈亏：+¥1,250
-- 胜率：66.7%
-
-## 📈 持仓分析
-当前持仓5只股票，总市值¥485,000，浮盈¥15,000。
-
-## 🎯 经验总结
-1. 严格执行止损策略
-2. 及时获利了结
-3. 控制仓位风险
-
-## 📅 明日计划
-1. 关注新能源板块机会
-2. 控制单日风险敞口
-3. 保持理性交易心态
-
----
-报告生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-"""
+        try:
+            datetime.strptime(review_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': '日期格式错误，请使用 YYYY-MM-DD 格式'}), 400, {
+                'Access-Control-Allow-Origin': '*'
+            }
         
-        response_data = {
-            'success': True,
-            'content': review_content,
-            'date': review_date,
-            'generated_at': datetime.now().isoformat()
-        }
+        processor = _runtime.get_processor(file_id)
+        if processor is None:
+            return jsonify({'error': '请先上传并处理数据'}), 400, {
+                'Access-Control-Allow-Origin': '*'
+            }
         
-        return jsonify(response_data), 200, {
-            'Access-Control-Allow-Origin': '*'
-        }
+        # 同一数据版本和复盘日期的报告内容不变，客户端已缓存时跳过生成
+        etag = make_etag('review', processor.data_tag, review_date)
+        return conditional_json(
+            request,
+            lambda: _runtime.get_result(
+                file_id, ('review', review_date), lambda p: _build_review(p, review_date)
+            ),
+            etag=etag,
+            headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Expose-Headers': 'ETag'
+            }
+        )
         
     except Exception as e:
         return jsonify({'error': f'生成复盘失败: {str(e)}'}), 500, {
             'Access-Control-Allow-Origin': '*'
-        }
\ No newline at end of file
+        }
@@ -1,5 +1,12 @@
 from flask import Flask, request, jsonify
 from datetime import datetime
+import os
+import sys
+
+# 添加api目录到Python路径，以便导入共享运行时
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import _runtime
 
 app = Flask(__name__)
 
@@ -18,13 +25,28 @@ def handler(request):
         }
     
     try:
-        # 模拟文件上传成功
-        file_id = f"upload_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        file = request.files.get('file')
+        if file is None or file.filename == '':
+            return jsonify({'error': '没有选择文件'}), 400, {
+                'Access-Control-Allow-Origin': '*'
+            }
+        
+        if not file.filename.endswith('.xlsx'):
+            return jsonify({'error': '请上传Excel文件(.xlsx)'}), 400, {
+                'Access-Control-Allow-Origin': '*'
+            }
+        
+        # 保存文件并立即解析，解析结果留在热实例缓存中供后续请求复用
+        file_id = _runtime.save_upload(file)
+        if _runtime.get_processor(file_id) is None:
+            return jsonify({'error': '数据加载失败'}), 400, {
+                'Access-Control-Allow-Origin': '*'
+            }
         
         response_data = {
             'success': True,
             'fileId': file_id,
-            'message': '文件上传成功（演示模式）',
+            'message': '文件上传成功',
             'timestamp': datetime.now().isoformat()
         }
         
@@ -35,4 +57,4 @@ def handler(request):
     except Exception as e:
         return jsonify({'error': f'上传失败: {str(e)}'}), 500, {
             'Access-Control-Allow-Origin': '*'
-        }
\ No newline at end of file
+        }
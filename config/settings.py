@@ -19,6 +19,7 @@ LOGS_DIR = os.path.join(BASE_DIR, "logs")
 # 默认文件名
 DEFAULT_DATA_FILE = "交易数据.xlsx"
 DEFAULT_OUTPUT_FILE = f"交易分析结果_{datetime.now().strftime('%Y%m%d')}.xlsx"
+DEFAULT_DB_FILE = os.path.join(DATA_DIR, "trading.db")  # 本地交易数据库
 
 # Excel工作表名称
 SHEET_NAMES = {
@@ -27,6 +28,9 @@ SHEET_NAMES = {
     'PRICES': '收盘价格',
     'SECURITIES': '证券信息',
     'DIVIDENDS': '分红记录',
+    'CORPORATE_ACTIONS': '公司行动',
+    'FX_RATES': '汇率',
+    'HOLIDAYS': '休市日',
     'PNL': '盈亏分析',
     'POSITIONS': '持仓数据',
     'DETAILS': '交易明细'
@@ -71,6 +75,60 @@ DEFAULT_RATES = {
     '监管费': 0.0
 }
 
-# 确保必要目录存在
-for directory in [DATA_DIR, REPORTS_DIR, LOGS_DIR]:
-    os.makedirs(directory, exist_ok=True)
\ No newline at end of file
+# 金额计算配置
+MONEY_CONFIG = {
+    'fixed_point': False,  # 是否按分整数计算费用和盈亏，结果与券商对账单逐分一致
+    'rounding': '四舍五入'  # 费用的默认取整规则，费率配置的 取整规则 列可按费率单独指定
+}
+
+# 币种配置：本币和各市场的计价币种，未列出的市场按本币计价
+BASE_CURRENCY = 'CNY'
+MARKET_CURRENCIES = {
+    '港交所': 'HKD',
+    '美股': 'USD'
+}
+
+# 批量处理配置
+BATCH_CONFIG = {
+    'workers': None,  # 工作进程数，None时使用CPU核数
+    'max_tasks_per_child': None,  # 每个工作进程处理多少个文件后重启，None时一直复用
+    'memory_limit_mb': None,  # 每个工作进程的内存上限(MB)，None时不限制
+    'exclude_patterns': ['~$*', '*_分析结果_*', '*_持仓快照_*']  # 扫描目录时跳过的文件
+}
+
+
+def ensure_directories():
+    """创建数据、报告和日志目录
+    
+    导入配置模块时不再创建目录，由入口程序在启动时显式调用，
+    Serverless等只读环境下导入配置不会失败。
+    """
+    for directory in [DATA_DIR, REPORTS_DIR, LOGS_DIR]:
+        os.makedirs(directory, exist_ok=True)
+
+
+def setup_logging(level=None, log_to_file=True):
+    """配置根日志：输出到控制台，可选同时写入日志文件
+    
+    导入核心模块时不再配置日志，由入口程序显式调用。根日志已有处理器时不重复配置。
+    
+    Args:
+        level: 日志级别名称，默认使用 LOG_CONFIG['level']
+        log_to_file: 是否写入 LOG_CONFIG['file']
+    """
+    import logging
+    
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    
+    handlers = [logging.StreamHandler()]
+    if log_to_file:
+        os.makedirs(LOGS_DIR, exist_ok=True)
+        handlers.insert(0, logging.FileHandler(LOG_CONFIG['file'], encoding='utf-8'))
+    
+    logging.basicConfig(
+        level=getattr(logging, level or LOG_CONFIG['level']),
+        format=LOG_CONFIG['format'],
+        handlers=handlers
+    )
\ No newline at end of file
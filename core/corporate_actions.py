@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+公司行动复权
+拆股、合股、送股和转增只改变股数，不改变持仓成本总额。按前复权处理：每个事件折算为股数因子，
+按证券从最后一个事件向前累乘，除权日之前的成交数量乘以之后全部事件的累计因子、成交价格和收盘价
+除以该因子，交易金额和成本总额不变，整段历史统一为最新股本口径。累计因子通过按证券分组的
+merge_asof 一次匹配到所有交易和价格行，不逐行修改。
+
+配股需要按除权日前的持仓缴款认购，生成买卖方向为 '配股' 的买入记录，不收取交易费用。
+"""
+
+import numpy as np
+import pandas as pd
+
+from core.cost_basis import compute_cost_basis
+
+# 公司行动表的标准列
+CORPORATE_ACTION_COLUMNS = ['日期', '证券代码', '行动类型', '比例', '配股价格']
+
+# 股数类行动: {行动类型: 由比例计算股数因子的函数}
+# 拆股: 比例为每股拆为几股；合股: 比例为几股合为一股；送股/转增: 比例为每股送转股数
+SHARE_ACTIONS = {
+    '拆股': lambda ratio: ratio,
+    '合股': lambda ratio: 1.0 / ratio,
+    '送股': lambda ratio: 1.0 + ratio,
+    '转增': lambda ratio: 1.0 + ratio
+}
+
+# 配股: 比例为每股配股数，按配股价格缴款
+RIGHTS_ACTION = '配股'
+
+# 配股生成的认购记录的买卖方向，按买入处理，不计算交易费用
+RIGHTS_SIDE = '配股'
+
+
+def empty_corporate_actions():
+    """空的公司行动表"""
+    return pd.DataFrame(columns=CORPORATE_ACTION_COLUMNS)
+
+
+def _normalize_actions(actions):
+    """统一公司行动的列类型，检查行动类型和比例
+    
+    Raises:
+        ValueError: 存在不支持的行动类型或比例不为正数
+    """
+    actions = actions.copy()
+    if '配股价格' not in actions.columns:
+        actions['配股价格'] = np.nan
+    actions['日期'] = pd.to_datetime(actions['日期']).astype('datetime64[ns]')
+    actions['证券代码'] = actions['证券代码'].astype(str)
+    actions['行动类型'] = actions['行动类型'].astype(str).str.strip()
+    actions['比例'] = pd.to_numeric(actions['比例'], errors='coerce')
+    actions['配股价格'] = pd.to_numeric(actions['配股价格'], errors='coerce')
+    
+    unknown = sorted(set(actions['行动类型']) - set(SHARE_ACTIONS) - {RIGHTS_ACTION})
+    if unknown:
+        raise ValueError(f"不支持的公司行动类型: {unknown}")
+    if not (actions['比例'] > 0).all():
+        raise ValueError("公司行动的比例必须为正数")
+    if (actions['行动类型'].eq(RIGHTS_ACTION) & ~(actions['配股价格'] >= 0)).any():
+        raise ValueError("配股记录必须填写配股价格")
+    return actions.sort_values(['证券代码', '日期'], kind='stable').reset_index(drop=True)
+
+
+def cumulative_factors(actions):
+    """各证券每个事件日的累计股数因子
+    
+    Args:
+        actions: 公司行动，需包含 日期、证券代码、行动类型、比例
+    
+    Returns:
+        DataFrame: 日期、证券代码、累计因子，累计因子为该日及之后全部股数类事件的因子乘积
+    """
+    shares = actions[actions['行动类型'].isin(list(SHARE_ACTIONS))]
+    if shares.empty:
+        return pd.DataFrame({'日期': pd.Series(dtype='datetime64[ns]'), '证券代码': pd.Series(dtype=str),
+                             '累计因子': pd.Series(dtype=float)})
+    
+    factor = np.ones(len(shares))
+    for action, to_factor in SHARE_ACTIONS.items():
+        mask = (shares['行动类型'] == action).to_numpy()
+        factor[mask] = to_factor(shares['比例'].to_numpy(dtype=np.float64)[mask])
+    
+    # 同一天的多个事件合并，再按证券从后向前累乘
+    events = shares[['日期', '证券代码']].assign(因子=factor).groupby(['证券代码', '日期'], as_index=False)['因子'].prod()
+    events = events.iloc[::-1]
+    events['累计因子'] = events.groupby('证券代码', sort=False)['因子'].cumprod()
+    return events.iloc[::-1][['日期', '证券代码', '累计因子']].reset_index(drop=True)
+
+
+def factors_after(dates, symbols, cumulative):
+    """每行日期之后（不含当天）全部股数类事件的累计因子
+    
+    除权日当天的交易和收盘价已经是新股本口径，只受之后的事件影响。
+    
+    Args:
+        dates: 日期序列
+        symbols: 证券代码序列，与 dates 等长
+        cumulative: cumulative_factors 的结果
+    
+    Returns:
+        ndarray: 与输入等长的因子数组，没有之后事件时为1
+    """
+    if cumulative.empty or len(dates) == 0:
+        return np.ones(len(dates))
+    
+    left = pd.DataFrame({
+        '日期': pd.to_datetime(pd.Series(dates)).astype('datetime64[ns]').to_numpy(),
+        '证券代码': pd.Series(symbols).astype(str).to_numpy(),
+        '_行': np.arange(len(dates))
+    })
+    left = left[left['日期'].notna()].sort_values('日期', kind='stable')
+    matched = pd.merge_asof(left, cumulative.sort_values('日期', kind='stable'), on='日期', by='证券代码',
+                            allow_exact_matches=False, direction='forward')
+    factors = np.ones(len(dates))
+    factors[matched['_行'].to_numpy()] = matched['累计因子'].fillna(1.0).to_numpy()
+    return factors
+
+
+def _scale_quantity(values, factors):
+    """数量乘以因子，结果均为整数时保持整数类型"""
+    scaled = np.asarray(values, dtype=np.float64) * factors
+    rounded = np.round(scaled)
+    if np.allclose(scaled, rounded, rtol=0, atol=1e-6):
+        return rounded.astype(np.int64)
+    return scaled
+
+
+def _rights_trades(rights, trades, cumulative):
+    """按除权日前的持仓生成配股认购记录
+    
+    多次配股按日期依次计算，之前配得的股数计入之后配股的持仓。
+    
+    Args:
+        rights: 配股事件
+        trades: 已复权的交易数据
+        cumulative: cumulative_factors 的结果
+    
+    Returns:
+        DataFrame: 配股认购记录，列与 trades 一致
+    """
+    template = trades.drop_duplicates('证券代码', keep='last').set_index('证券代码')
+    generated = []
+    for date, events in rights.groupby('日期', sort=True):
+        stream = pd.concat([trades] + generated, ignore_index=True)
+        # 持仓数量只取决于成交数量，费用可能尚未计算
+        if '总费用' not in stream.columns:
+            stream = stream.assign(总费用=0.0)
+        _, positions = compute_cost_basis(stream[stream['日期'] < date])
+        held = positions.sort_values('日期', kind='stable').drop_duplicates('证券代码', keep='last')
+        held = held.set_index('证券代码')['持仓数量'].clip(lower=0)
+        
+        events = events[events['证券代码'].isin(held.index) & events['证券代码'].isin(template.index)]
+        if events.empty:
+            continue
+        factor = factors_after([date] * len(events), events['证券代码'], cumulative)
+        # 配股数按除权日的股本口径取整
+        entitled = held.reindex(events['证券代码']).to_numpy(dtype=np.float64) / factor
+        quantity = np.floor(entitled * events['比例'].to_numpy() + 1e-9) * factor
+        keep = quantity > 0
+        if not keep.any():
+            continue
+        
+        rows = template.loc[events['证券代码'][keep]].reset_index()
+        rows['日期'] = date
+        rows['买卖方向'] = RIGHTS_SIDE
+        rows['成交数量'] = _scale_quantity(quantity[keep], 1.0)
+        rows['成交价格'] = events['配股价格'].to_numpy()[keep] / factor[keep]
+        rows['复权因子'] = factor[keep]
+        generated.append(rows[trades.columns])
+    
+    if not generated:
+        return trades.iloc[0:0]
+    return pd.concat(generated, ignore_index=True)
+
+
+def apply_corporate_actions(actions, trades, prices, dividends=None):
+    """按公司行动对交易、收盘价和分红计划做前复权，并生成配股认购记录
+    
+    Args:
+        actions: 公司行动，需包含 日期（除权日）、证券代码、行动类型、比例；配股需包含 配股价格
+        trades: 交易数据，需包含 日期、证券代码、买卖方向、成交价格、成交数量
+        prices: 收盘价格，需包含 日期、证券代码、收盘价
+        dividends: 分红计划，可选，每股分红和持有数量按除息日之后的事件复权
+    
+    Returns:
+        tuple: (trades, prices, dividends)，交易数据追加 '复权因子' 列，没有公司行动时原样返回
+    
+    Raises:
+        ValueError: 公司行动的行动类型、比例或配股价格无效
+    """
+    if actions is None or actions.empty:
+        return trades, prices, dividends
+    
+    actions = _normalize_actions(actions)
+    cumulative = cumulative_factors(actions)
+    
+    trades = trades.copy()
+    factor = factors_after(trades['日期'], trades['证券代码'], cumulative)
+    trades['成交数量'] = _scale_quantity(trades['成交数量'], factor)
+    trades['成交价格'] = trades['成交价格'].to_numpy(dtype=np.float64) / factor
+    trades['复权因子'] = factor
+    
+    rights = actions[actions['行动类型'] == RIGHTS_ACTION]
+    if not rights.empty and not trades.empty:
+        trades = pd.concat([trades, _rights_trades(rights, trades, cumulative)], ignore_index=True)
+        trades = trades.sort_values(['日期', '证券代码']).reset_index(drop=True)
+    
+    prices = prices.copy()
+    prices['收盘价'] = prices['收盘价'].to_numpy(dtype=np.float64) / factors_after(
+        prices['日期'], prices['证券代码'], cumulative
+    )
+    
+    if dividends is not None and not dividends.empty:
+        dividends = dividends.copy()
+        factor = factors_after(dividends['日期'], dividends['证券代码'], cumulative)
+        dividends['每股分红'] = pd.to_numeric(dividends['每股分红'], errors='coerce') / factor
+        if '持有数量' in dividends.columns:
+            dividends['持有数量'] = pd.to_numeric(dividends['持有数量'], errors='coerce') * factor
+    
+    return trades, prices, dividends
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+摊薄成本递推计算
+按证券逐笔递推持仓数量、持仓成本和已实现盈亏：买入累加成本总额，卖出按比例扣减成本总额，
+全部卖出时成本清零；分红现金冲减持仓成本总额，无持仓时计入已实现盈亏。递推在连续的NumPy数组上进行，安装numba时编译为机器码，
+否则在Python列表上执行同一个循环。
+"""
+
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+# 视为卖出的买卖方向，其余均按买入处理
+SELL_SIDES = ('卖出', '卖', 'SELL', 'S')
+
+# 逐笔递推结果的列名
+STATE_COLUMNS = ['已实现盈亏', '当日已实现盈亏', '持仓数量', '持仓成本', '持仓成本总额', '累计已实现盈亏']
+
+
+def _walk_cost_basis(price, qty, fees, is_buy, dividend, is_dividend, offsets, day_start,
+                     init_qty, init_cost, init_cost_total, init_realized,
+                     out_realized, out_day_realized, out_qty, out_cost, out_cost_total, out_cum_realized):
+    """摊薄成本递推内核，每个证券的交易在 offsets[g]:offsets[g+1] 区间内按时间排列
+    
+    Args:
+        price, qty, fees, is_buy: 逐笔成交价格、成交数量、总费用、是否买入
+        dividend, is_dividend: 分红现金金额、是否为分红事件（分红事件不使用成交价格和数量）
+        offsets: 各证券交易区间的起始位置，长度为证券数加一
+        day_start: 是否为该证券当日第一笔交易
+        init_qty, init_cost, init_cost_total, init_realized: 各证券的初始持仓数量、成本价、成本总额、累计已实现盈亏
+        out_*: 输出，逐笔的已实现盈亏、当日累计已实现盈亏以及成交后的持仓状态
+    """
+    for group in range(len(offsets) - 1):
+        position = init_qty[group]
+        cost = init_cost[group]
+        cost_total = init_cost_total[group]
+        realized_base = init_realized[group]
+        day_realized = 0.0
+        
+        for i in range(offsets[group], offsets[group + 1]):
+            if day_start[i]:
+                # 新的一天：前一天的已实现盈亏并入累计值
+                realized_base = realized_base + day_realized
+                day_realized = 0.0
+            
+            quantity = qty[i]
+            trade_realized = 0.0
+            if is_dividend[i]:
+                # 分红：持仓期间冲减成本总额，无持仓时（如手工录入的持有数量）直接计入已实现盈亏
+                if position > 0:
+                    cost_total = cost_total - dividend[i]
+                    cost = cost_total / position
+                else:
+                    trade_realized = dividend[i]
+            elif is_buy[i]:
+                # 买入：成本总额增加买入金额加手续费，重新计算成本价
+                position = position + quantity
+                cost_total = cost_total + (price[i] * quantity + fees[i])
+                if position > 0:
+                    cost = cost_total / position
+                else:
+                    cost = 0.0
+            elif position > 0:
+                # 卖出：按卖出比例扣减成本总额，成本价不变；无持仓时的卖出不处理
+                ratio = min(quantity / position, 1.0)
+                trade_realized = (price[i] * quantity - fees[i]) - cost_total * ratio
+                position = position - quantity
+                if position > 0:
+                    cost_total = cost_total * (1 - ratio)
+                else:
+                    cost = 0.0
+                    cost_total = 0.0
+            
+            day_realized = day_realized + trade_realized
+            out_realized[i] = trade_realized
+            out_day_realized[i] = day_realized
+            out_qty[i] = position
+            out_cost[i] = cost
+            out_cost_total[i] = cost_total
+            out_cum_realized[i] = realized_base + day_realized
+
+
+# 已编译的递推内核 {Python函数: numba编译函数或None}
+_compiled_kernels = {}
+
+# 当前使用的递推实现，只查找numba而不导入
+BACKEND = 'numba' if importlib.util.find_spec('numba') is not None else 'python'
+
+
+def compiled_kernel(func):
+    """递推内核的numba编译版本
+    
+    numba为可选依赖，导入本身较慢，因此在第一次执行递推时才导入并编译，
+    导入本模块的入口（批处理、serverless、看板）不承担这部分启动开销。
+    
+    Args:
+        func: 纯Python实现的递推内核
+    
+    Returns:
+        编译后的函数，未安装numba时为None，此时使用纯Python循环
+    """
+    if func not in _compiled_kernels:
+        try:
+            from numba import njit
+        except ImportError:
+            _compiled_kernels[func] = None
+        else:
+            _compiled_kernels[func] = njit(cache=True, nogil=True)(func)
+    return _compiled_kernels[func]
+
+
+def walk_cost_basis(price, qty, fees, is_buy, offsets, day_start, initial_state=None, dividend=None):
+    """对已按证券分组、组内按时间排序的逐笔交易数组执行摊薄成本递推
+    
+    Args:
+        price: 成交价格数组
+        qty: 成交数量数组，整数数量时持仓数量也保持整数
+        fees: 总费用数组
+        is_buy: 是否买入（布尔数组）
+        offsets: 各证券交易区间的起始位置，长度为证券数加一
+        day_start: 是否为该证券当日第一笔交易（布尔数组）
+        initial_state: 各证券初始状态的元组 (持仓数量, 成本价, 成本总额, 累计已实现盈亏)，每项为长度等于证券数的数组，默认为0
+        dividend: 分红现金数组，非分红事件为NaN，默认没有分红事件
+    
+    Returns:
+        dict: {列名: 数组}，列名见 STATE_COLUMNS
+    """
+    n = len(price)
+    groups = len(offsets) - 1
+    qty_dtype = np.int64 if np.issubdtype(np.asarray(qty).dtype, np.integer) else np.float64
+    
+    price = np.ascontiguousarray(price, dtype=np.float64)
+    qty = np.ascontiguousarray(qty, dtype=qty_dtype)
+    fees = np.ascontiguousarray(fees, dtype=np.float64)
+    is_buy = np.ascontiguousarray(is_buy, dtype=np.bool_)
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+    day_start = np.ascontiguousarray(day_start, dtype=np.bool_)
+    if dividend is None:
+        dividend = np.full(n, np.nan)
+    dividend = np.ascontiguousarray(dividend, dtype=np.float64)
+    is_dividend = ~np.isnan(dividend)
+    
+    if initial_state is None:
+        initial_state = (np.zeros(groups, dtype=qty_dtype), np.zeros(groups), np.zeros(groups), np.zeros(groups))
+    init_qty, init_cost, init_cost_total, init_realized = initial_state
+    init_qty = np.ascontiguousarray(init_qty, dtype=qty_dtype)
+    init_cost = np.ascontiguousarray(init_cost, dtype=np.float64)
+    init_cost_total = np.ascontiguousarray(init_cost_total, dtype=np.float64)
+    init_realized = np.ascontiguousarray(init_realized, dtype=np.float64)
+    
+    kernel = compiled_kernel(_walk_cost_basis)
+    if kernel is not None:
+        outputs = [np.empty(n, dtype=qty_dtype if column == '持仓数量' else np.float64) for column in STATE_COLUMNS]
+        kernel(price, qty, fees, is_buy, dividend, is_dividend, offsets, day_start,
+               init_qty, init_cost, init_cost_total, init_realized, *outputs)
+        return dict(zip(STATE_COLUMNS, outputs))
+    
+    # 纯Python循环：在列表上逐项访问比NumPy标量快得多
+    outputs = [[0.0] * n for _ in STATE_COLUMNS]
+    _walk_cost_basis(price.tolist(), qty.tolist(), fees.tolist(), is_buy.tolist(), dividend.tolist(),
+                     is_dividend.tolist(), offsets.tolist(), day_start.tolist(), init_qty.tolist(), init_cost.tolist(),
+                     init_cost_total.tolist(), init_realized.tolist(), *outputs)
+    return {
+        column: np.asarray(values, dtype=qty_dtype if column == '持仓数量' else np.float64)
+        for column, values in zip(STATE_COLUMNS, outputs)
+    }
+
+
+def sort_trade_stream(trades_df):
+    """将交易整理为按证券分组、组内按时间排列的交易流
+    
+    证券按出现顺序编号，同一证券内按日期稳定排序，同日交易保持原有顺序。
+    
+    Args:
+        trades_df: 交易数据，需包含 日期、证券代码
+    
+    Returns:
+        tuple: (trades, symbols, offsets, day_start)
+        - trades: 排序后的交易数据（不含日期为空的行）
+        - symbols: 各组的证券代码
+        - offsets: 各证券交易区间的起始位置，长度为证券数加一
+        - day_start: 是否为该证券当日第一笔交易
+    """
+    trades = trades_df[trades_df['日期'].notna()]
+    
+    symbol_codes, symbols = pd.factorize(trades['证券代码'])
+    days = trades['日期'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').view(np.int64)
+    order = np.lexsort((days, symbol_codes))
+    trades = trades.iloc[order]
+    symbol_codes = symbol_codes[order]
+    days = days[order]
+    
+    offsets = np.searchsorted(symbol_codes, np.arange(len(symbols) + 1))
+    day_start = np.ones(len(trades), dtype=bool)
+    day_start[1:] = (symbol_codes[1:] != symbol_codes[:-1]) | (days[1:] != days[:-1])
+    return trades, symbols, offsets, day_start
+
+
+def day_end_mask(day_start):
+    """每个证券每天最后一笔交易的掩码"""
+    day_end = np.ones(len(day_start), dtype=bool)
+    day_end[:-1] = day_start[1:]
+    return day_end
+
+
+def trade_quantities(trades):
+    """成交数量数组，整数列保持整数类型"""
+    quantities = trades['成交数量'].to_numpy()
+    if quantities.dtype == object:
+        quantities = quantities.astype(np.float64)
+    return quantities
+
+
+def compute_cost_basis(trades_df, initial_positions=None, dividends=None):
+    """按摊薄成本法逐笔计算持仓状态和已实现盈亏
+    
+    Args:
+        trades_df: 交易数据，需包含 日期、证券代码、成交价格、成交数量、总费用、买卖方向
+        initial_positions: 各证券的初始持仓 {证券代码: {'持仓数量', '持仓成本', '持仓成本总额', '累计已实现盈亏'}}
+        dividends: 分红现金事件，需包含 日期（除息日）、证券代码、净分红金额；在除息日当天的交易之前处理
+    
+    Returns:
+        tuple: (trade_state, daily_state)
+        - trade_state: 按证券和时间排序的逐笔交易（含分红事件行，买卖方向为 '分红'），追加 STATE_COLUMNS 各列
+        - daily_state: 每个证券每个交易日（含只有分红的日期）收盘后的状态，日期为 datetime.date，
+          另含当日最后成交价 '最后成交价'、当日成交笔数 '成交笔数' 和当日分红现金 '当日分红'
+    """
+    if dividends is not None and not dividends.empty:
+        # 分红事件放在交易之前，稳定排序后位于同一天的交易之前
+        events = pd.DataFrame({
+            '日期': pd.to_datetime(dividends['日期']).to_numpy(),
+            '证券代码': dividends['证券代码'].astype(str).to_numpy(),
+            '成交价格': 0.0,
+            '成交数量': 0,
+            '总费用': 0.0,
+            '买卖方向': '分红',
+            '分红金额': dividends['净分红金额'].astype(float).to_numpy()
+        })
+        trades_df = pd.concat([events, trades_df.assign(分红金额=np.nan)], ignore_index=True)
+    trades, symbols, offsets, day_start = sort_trade_stream(trades_df)
+    dividend = trades['分红金额'].to_numpy(dtype=np.float64) if '分红金额' in trades else None
+    
+    initial_state = None
+    if initial_positions:
+        state = [[], [], [], []]
+        for symbol in symbols:
+            position = initial_positions.get(symbol, {})
+            state[0].append(position.get('持仓数量', 0))
+            state[1].append(position.get('持仓成本', 0))
+            state[2].append(position.get('持仓成本总额', 0))
+            state[3].append(position.get('累计已实现盈亏', 0))
+        initial_state = tuple(np.asarray(values) for values in state)
+    
+    result = walk_cost_basis(
+        trades['成交价格'].to_numpy(dtype=np.float64),
+        trade_quantities(trades),
+        trades['总费用'].to_numpy(dtype=np.float64),
+        ~trades['买卖方向'].isin(SELL_SIDES).to_numpy(),
+        offsets,
+        day_start,
+        initial_state,
+        dividend
+    )
+    
+    trade_state = trades.assign(**result)
+    
+    # 每个证券每天的最后一笔交易即当日收盘后的状态
+    starts = np.flatnonzero(day_start)
+    is_dividend = ~np.isnan(dividend) if dividend is not None else np.zeros(len(trades), dtype=bool)
+    daily_state = trade_state[day_end_mask(day_start)]
+    daily_state = pd.DataFrame({
+        '日期': daily_state['日期'].dt.date,
+        '证券代码': daily_state['证券代码'],
+        '证券名称': daily_state['证券名称'] if '证券名称' in daily_state else '',
+        '市场': daily_state['市场'] if '市场' in daily_state else '默认市场',
+        '产品类型': daily_state['产品类型'] if '产品类型' in daily_state else '股票',
+        '最后成交价': daily_state['成交价格'],
+        **{column: daily_state[column] for column in STATE_COLUMNS if column != '已实现盈亏'},
+        '成交笔数': np.add.reduceat((~is_dividend).astype(np.int64), starts) if len(starts) else 0,
+        '当日分红': np.add.reduceat(np.where(is_dividend, dividend, 0.0), starts) if is_dividend.any() else 0.0
+    }).reset_index(drop=True)
+    
+    return trade_state, daily_state
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+分红权益计算
+分红记录作为每股分红计划：日期为除息日，持有数量为空的记录按除息日前一个交易日收盘后的持仓
+自动计算持有数量、总分红金额、税费和净分红金额；已填写持有数量的记录视为手工录入，保持不变。
+持仓查找使用按证券分组的 merge_asof，不逐行查找。
+"""
+
+import numpy as np
+import pandas as pd
+
+# 分红记录的标准列
+DIVIDEND_COLUMNS = ['日期', '证券代码', '证券名称', '持有数量', '每股分红', '总分红金额', '税费', '净分红金额']
+
+
+def empty_dividends():
+    """空的分红记录表"""
+    return pd.DataFrame(columns=DIVIDEND_COLUMNS)
+
+
+def compute_dividend_entitlements(schedule, positions):
+    """按除息日前的持仓计算分红权益
+    
+    Args:
+        schedule: 分红计划，需包含 日期（除息日）、证券代码、每股分红；可选 持有数量、证券名称、
+            税费（金额）、税率（0-1之间的小数）
+        positions: 每日收盘持仓，需包含 日期、证券代码、持仓数量，可选 证券名称；
+            只需包含持仓有变化的日期
+    
+    Returns:
+        DataFrame: 补全后的分红记录，保留计划中的其他列，按日期和证券代码排序
+    """
+    if schedule is None or schedule.empty:
+        return empty_dividends()
+    
+    result = schedule.copy()
+    for column in DIVIDEND_COLUMNS:
+        if column not in result.columns:
+            result[column] = np.nan
+    result['日期'] = pd.to_datetime(result['日期'])
+    result['证券代码'] = result['证券代码'].astype(str)
+    result['每股分红'] = pd.to_numeric(result['每股分红'], errors='coerce').fillna(0.0)
+    
+    # 持有数量为空（或为0）的记录需要按持仓计算
+    manual_qty = pd.to_numeric(result['持有数量'], errors='coerce')
+    pending = manual_qty.isna() | (manual_qty == 0)
+    
+    entitled = pd.Series(0.0, index=result.index)
+    names = pd.Series(np.nan, index=result.index, dtype=object)
+    if pending.any() and positions is not None and not positions.empty:
+        right = pd.DataFrame({
+            '日期': pd.to_datetime(positions['日期']).astype('datetime64[ns]'),
+            '证券代码': positions['证券代码'].astype(str),
+            '_持仓': positions['持仓数量'].astype(float),
+            '_名称': positions['证券名称'] if '证券名称' in positions else np.nan
+        }).sort_values('日期', kind='stable')
+        left = pd.DataFrame({
+            '日期': result.loc[pending, '日期'].astype('datetime64[ns]'),
+            '证券代码': result.loc[pending, '证券代码'],
+            '_行': result.index[pending]
+        }).sort_values('日期', kind='stable')
+        
+        # 日期统一为纳秒精度后合并；除息日当天的交易不影响权益，只匹配除息日之前的最后一条持仓
+        matched = pd.merge_asof(left, right, on='日期', by='证券代码', allow_exact_matches=False,
+                                direction='backward').set_index('_行')
+        entitled.loc[matched.index] = matched['_持仓'].fillna(0.0).clip(lower=0.0)
+        names.loc[matched.index] = matched['_名称']
+    
+    quantity = manual_qty.where(~pending, entitled)
+    gross = (quantity * result['每股分红']).round(2)
+    
+    # 税费：手工填写的金额优先，其次按税率计算，否则为0
+    tax = pd.to_numeric(result['税费'], errors='coerce')
+    if '税率' in result.columns:
+        tax = tax.fillna(gross * pd.to_numeric(result['税率'], errors='coerce'))
+    tax = tax.fillna(0.0).round(2)
+    
+    result['持有数量'] = quantity
+    result['总分红金额'] = pd.to_numeric(result['总分红金额'], errors='coerce').where(~pending, gross).fillna(gross)
+    result['税费'] = tax
+    result['净分红金额'] = pd.to_numeric(result['净分红金额'], errors='coerce').where(~pending).fillna(
+        result['总分红金额'] - tax
+    ).round(2)
+    blank_name = result['证券名称'].isna() | (result['证券名称'].astype(str).str.strip() == '')
+    result['证券名称'] = result['证券名称'].where(~blank_name, names)
+    
+    # 整数持有数量保持整数显示
+    if (result['持有数量'] % 1 == 0).all():
+        result['持有数量'] = result['持有数量'].astype('int64')
+    
+    ordered = DIVIDEND_COLUMNS + [column for column in result.columns if column not in DIVIDEND_COLUMNS]
+    return result[ordered].sort_values(['日期', '证券代码'], kind='stable').reset_index(drop=True)
+
+
+def dividend_cash_events(dividends, start_after=None):
+    """分红现金事件，用于在摊薄成本递推中冲减持仓成本
+    
+    Args:
+        dividends: 补全后的分红记录
+        start_after: 只保留该日期之后的记录（datetime.date）
+    
+    Returns:
+        DataFrame: 日期、证券代码、净分红金额，只含金额不为0的记录
+    """
+    if dividends is None or dividends.empty or '净分红金额' not in dividends.columns:
+        return None
+    cash = pd.to_numeric(dividends['净分红金额'], errors='coerce').fillna(0.0)
+    events = pd.DataFrame({
+        '日期': pd.to_datetime(dividends['日期']),
+        '证券代码': dividends['证券代码'].astype(str),
+        '净分红金额': cash
+    })[cash != 0]
+    if start_after is not None:
+        events = events[events['日期'].dt.date > start_after]
+    return events
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+分时段费率
+费率配置可带 生效日期、失效日期 列，同一 (券商, 市场, 产品类型) 可以有多条先后生效的费率，
+例如印花税调整或佣金重新谈判。每笔交易通过按组合分组的 merge_asof 取成交日当天或之前最近生效的
+一条费率，成交日晚于该费率的失效日期时视为没有费率。不填生效日期的费率从最早开始生效，
+不填失效日期的费率一直生效到同一组合的下一条费率生效为止。
+费用按列一次计算，不逐笔循环。定点模式下费用按分整数计算，每项费用按费率的 取整规则 取整到分。
+"""
+
+import numpy as np
+import pandas as pd
+
+from config.settings import DEFAULT_RATES
+from core.money import (
+    DEFAULT_ROUNDING, MONEY_DIGITS, RATE_DIGITS, ROUNDING_RULES, div_round, from_fixed, rounding_codes, to_fixed
+)
+
+# 确定费率的组合
+RULE_KEYS = ['券商', '市场', '产品类型']
+
+# 每条费率包含的费率项
+RATE_FIELDS = ['手续费率', '规费率', '印花税率', '过户费率', '最低手续费', '平台使用费', '结算费', '汇率费', '监管费']
+
+# 计算得到的费用列
+FEE_COLUMNS = ['手续费', '规费', '印花税', '过户费', '平台使用费', '结算费', '汇率费', '监管费', '总费用']
+
+# 卖出方向，只有卖出收取印花税
+SELL_SIDES = ['卖出', '卖', 'SELL', 'S']
+
+# 收取汇率费的市场
+FX_FEE_MARKETS = ['港交所', '美股']
+
+# 手续费与规费合计不低于最低手续费的券商（根据君安app测算），其他券商手续费单独不低于最低手续费
+COMBINED_MINIMUM_BROKERS = ['国泰君安']
+
+# 交易数据缺少组合列时使用的默认值
+KEY_DEFAULTS = {'券商': '默认券商', '市场': '默认市场', '产品类型': '股票'}
+
+# 没有生效日期的费率视为从最早开始生效
+EARLIEST = pd.Timestamp.min
+
+
+def _rule_keys(df):
+    """组合列统一为字符串，缺失的列使用默认值"""
+    return pd.DataFrame({
+        key: (df[key] if key in df.columns else pd.Series(KEY_DEFAULTS[key], index=df.index)).fillna('').astype(str)
+        for key in RULE_KEYS
+    }, index=df.index)
+
+
+def normalize_fee_schedule(rates):
+    """整理费率配置为按生效日期排序的费率表
+    
+    Args:
+        rates: 费率配置，需包含 券商、市场、产品类型 和费率项，可选 生效日期、失效日期、取整规则；
+            缺少的费率项使用 DEFAULT_RATES，缺少取整规则时使用默认取整规则
+    
+    Returns:
+        DataFrame: 券商、市场、产品类型、生效日期、失效日期、费率项和取整规则代码，按生效日期排序
+    
+    Raises:
+        ValueError: 存在失效日期早于生效日期的费率，或存在未知的取整规则
+    """
+    schedule = _rule_keys(rates)
+    starts = pd.to_datetime(rates['生效日期']) if '生效日期' in rates.columns else pd.Series(pd.NaT, index=rates.index)
+    ends = pd.to_datetime(rates['失效日期']) if '失效日期' in rates.columns else pd.Series(pd.NaT, index=rates.index)
+    schedule['生效日期'] = starts.astype('datetime64[ns]').fillna(EARLIEST)
+    schedule['失效日期'] = ends.astype('datetime64[ns]')
+    for field in RATE_FIELDS:
+        schedule[field] = rates[field] if field in rates.columns else DEFAULT_RATES[field]
+    rules = rates['取整规则'] if '取整规则' in rates.columns else pd.Series(np.nan, index=rates.index)
+    schedule['取整规则'] = rounding_codes(rules)
+    
+    if (schedule['失效日期'] < schedule['生效日期']).any():
+        raise ValueError("费率配置中存在失效日期早于生效日期的记录")
+    return schedule.sort_values('生效日期', kind='stable').reset_index(drop=True)
+
+
+def _round_cents(values):
+    """保留2位小数，结果与逐笔使用内置 round 一致
+    
+    np.round 先乘以100再取整，恰好在半分附近的金额可能与内置 round 相差1分，只对这些金额逐个使用内置 round。
+    """
+    scaled = values * 100
+    rounded = np.rint(scaled)
+    # 与取整结果相差接近0.5的即为半分附近的金额
+    np.subtract(scaled, rounded, out=scaled)
+    near_half = np.abs(scaled, out=scaled) > 0.5 - 1e-6
+    rounded /= 100
+    rounded[near_half] = [round(float(value), 2) for value in values[near_half]]
+    return rounded
+
+
+def _default_rates(product_types):
+    """没有匹配费率时使用的默认费率，股票收取印花税和过户费"""
+    is_stock = (product_types == '股票').to_numpy()
+    return pd.DataFrame({
+        '手续费率': 0.0003,
+        '规费率': 0,
+        '印花税率': np.where(is_stock, 0.001, 0),
+        '过户费率': np.where(is_stock, 0.00002, 0),
+        '最低手续费': 5,
+        '平台使用费': 0,
+        '结算费': 0,
+        '汇率费': 0,
+        '监管费': 0
+    }, index=product_types.index)
+
+
+def resolve_fee_rates(trades, schedule):
+    """按成交日期为每笔交易匹配生效的费率
+    
+    Args:
+        trades: 交易数据，需包含 日期，可选 券商、市场、产品类型
+        schedule: normalize_fee_schedule 的结果
+    
+    Returns:
+        tuple: (rates, matched)
+        - rates: 与 trades 同索引的费率项和取整规则代码，没有匹配费率的交易使用默认费率和默认取整规则
+        - matched: 是否匹配到费率的布尔数组
+    """
+    keys = _rule_keys(trades)
+    left = keys.assign(日期=pd.to_datetime(trades['日期']).astype('datetime64[ns]'), _行=np.arange(len(trades)))
+    left = left.sort_values('日期', kind='stable')
+    joined = pd.merge_asof(left, schedule, left_on='日期', right_on='生效日期', by=RULE_KEYS, direction='backward')
+    
+    matched = np.zeros(len(trades), dtype=bool)
+    in_force = joined['生效日期'].notna() & ~(joined['日期'] > joined['失效日期'])
+    matched[joined['_行'].to_numpy()] = in_force.to_numpy()
+    
+    rates = _default_rates(keys['产品类型'])
+    order = joined['_行'].to_numpy()
+    for field in RATE_FIELDS:
+        values = rates[field].to_numpy(dtype=np.float64, copy=True)
+        values[order[in_force.to_numpy()]] = joined.loc[in_force, field].to_numpy(dtype=np.float64)
+        rates[field] = values
+    rules = np.full(len(trades), ROUNDING_RULES[DEFAULT_ROUNDING], dtype=np.int8)
+    rules[order[in_force.to_numpy()]] = joined.loc[in_force, '取整规则'].to_numpy(dtype=np.int8)
+    rates['取整规则'] = rules
+    return rates, matched
+
+
+def _fee_components(amount, rate, is_sell, combined, fx_market):
+    """按费率计算各项费用，参数可以是一维数组，也可以是按 交易 × 券商 广播的二维数组
+    
+    Args:
+        amount: 交易金额
+        rate: {费率项: 费率数组}
+        is_sell: 是否卖出
+        combined: 是否按手续费与规费合计计算最低手续费
+        fx_market: 是否收取汇率费的市场
+    
+    Returns:
+        list: 与 FEE_COLUMNS 对应的费用数组，保留2位小数
+    """
+    # 手续费：按比例计算，不低于最低手续费
+    commission = amount * rate['手续费率']
+    gui_fee = amount * rate['规费率']
+    below = commission < rate['最低手续费']
+    commission = np.where(
+        combined,
+        np.where(below, rate['最低手续费'] - gui_fee, commission),
+        np.maximum(commission, rate['最低手续费'])
+    )
+    
+    stamp_tax = np.where(is_sell, amount * rate['印花税率'], 0.0)
+    transfer_fee = amount * rate['过户费率']
+    platform_fee = rate['平台使用费']
+    settlement_fee = amount * rate['结算费']
+    fx_fee = np.where(fx_market, amount * rate['汇率费'], 0.0)
+    regulatory_fee = amount * rate['监管费']
+    total_fee = (commission + stamp_tax + transfer_fee + platform_fee + settlement_fee + fx_fee + regulatory_fee
+                 + gui_fee)
+    
+    # 全为0的费用（例如A股不收取的结算费、汇率费）不需要取整
+    shape = np.broadcast(amount, commission).shape
+    return [
+        _round_cents(np.broadcast_to(fee, shape).astype(np.float64)) if np.any(fee) else np.zeros(shape)
+        for fee in (
+            commission, gui_fee, stamp_tax, transfer_fee, platform_fee, settlement_fee, fx_fee, regulatory_fee,
+            total_fee
+        )
+    ]
+
+
+def _fixed_rates(rate):
+    """费率项转换为定点整数：比例费率以1e-8为单位，最低手续费和平台使用费以分为单位"""
+    return {
+        field: to_fixed(values, MONEY_DIGITS if field in ('最低手续费', '平台使用费') else RATE_DIGITS)
+        for field, values in rate.items()
+    }
+
+
+def _fixed_fee_components(amount, rate, rules, is_sell, combined, fx_market):
+    """按分整数计算各项费用，参数的形状与 _fee_components 相同
+    
+    每项费用由 金额 × 费率 的整数乘积按取整规则整除得到，结果精确；总费用为各项费用之和，
+    与对账单上逐项列出的费用合计一致。
+    
+    Args:
+        amount: 以分为单位的 int64 交易金额
+        rate: _fixed_rates 转换后的 {费率项: 定点费率数组}
+        rules: 取整规则代码
+        is_sell: 是否卖出
+        combined: 是否按手续费与规费合计计算最低手续费
+        fx_market: 是否收取汇率费的市场
+    
+    Returns:
+        list: 与 FEE_COLUMNS 对应的以分为单位的 int64 费用数组
+    """
+    def charge(field):
+        if not np.any(rate[field]):
+            return np.zeros((), dtype=np.int64)
+        return div_round(amount * rate[field], 10 ** RATE_DIGITS, rules)
+    
+    # 手续费：按比例计算，不低于最低手续费
+    commission = charge('手续费率')
+    gui_fee = charge('规费率')
+    minimum = rate['最低手续费']
+    commission = np.where(
+        combined,
+        np.where(commission < minimum, minimum - gui_fee, commission),
+        np.maximum(commission, minimum)
+    )
+    
+    stamp_tax = np.where(is_sell, charge('印花税率'), 0)
+    transfer_fee = charge('过户费率')
+    platform_fee = rate['平台使用费']
+    settlement_fee = charge('结算费')
+    fx_fee = np.where(fx_market, charge('汇率费'), 0)
+    regulatory_fee = charge('监管费')
+    total_fee = (commission + stamp_tax + transfer_fee + platform_fee + settlement_fee + fx_fee + regulatory_fee
+                 + gui_fee)
+    
+    shape = np.broadcast(amount, commission).shape
+    return [
+        np.broadcast_to(fee, shape).astype(np.int64)
+        for fee in (
+            commission, gui_fee, stamp_tax, transfer_fee, platform_fee, settlement_fee, fx_fee, regulatory_fee,
+            total_fee
+        )
+    ]
+
+
+def compute_trade_fees(trades, schedule, exempt=None, fixed_point=False):
+    """按成交日生效的费率计算每笔交易的各项费用
+    
+    Args:
+        trades: 交易数据，需包含 日期、买卖方向、交易金额，可选 券商、市场、产品类型
+        schedule: normalize_fee_schedule 的结果
+        exempt: 不收取费用的交易的布尔数组，可选
+        fixed_point: 是否按分整数计算，交易金额先取整到分
+    
+    Returns:
+        tuple: (fees, missing)
+        - fees: 与 trades 同索引的费用列，保留2位小数
+        - missing: 没有匹配到费率的 (券商, 市场, 产品类型) 及交易笔数列表
+    """
+    rates, matched = resolve_fee_rates(trades, schedule)
+    keys = _rule_keys(trades)
+    amount = trades['交易金额'].to_numpy(dtype=np.float64)
+    rate = {field: rates[field].to_numpy(dtype=np.float64) for field in RATE_FIELDS}
+    flags = (
+        trades['买卖方向'].isin(SELL_SIDES).to_numpy(),
+        keys['券商'].isin(COMBINED_MINIMUM_BROKERS).to_numpy(),
+        keys['市场'].isin(FX_FEE_MARKETS).to_numpy()
+    )
+    if fixed_point:
+        components = [
+            from_fixed(fee) for fee in _fixed_fee_components(
+                to_fixed(amount), _fixed_rates(rate), rates['取整规则'].to_numpy(), *flags
+            )
+        ]
+    else:
+        components = _fee_components(amount, rate, *flags)
+    fees = pd.DataFrame(dict(zip(FEE_COLUMNS, components)), index=trades.index)
+    
+    charged = np.ones(len(trades), dtype=bool) if exempt is None else ~np.asarray(exempt, dtype=bool)
+    fees[~charged] = 0.0
+    
+    unmatched = keys[charged & ~matched]
+    missing = [(*combo, count) for combo, count in unmatched.value_counts(sort=False).items()]
+    return fees, missing
+
+
+# 券商费用模拟结果的列
+SIMULATION_COLUMNS = ['券商', '月份', '交易笔数', '成交金额'] + FEE_COLUMNS + ['默认费率笔数']
+
+
+def simulate_broker_fees(trades, schedule, brokers=None, exempt=None, fx_rates=None, chunk_size=4000,
+                         fixed_point=False):
+    """假设全部交易都在某个券商成交，按费率配置中每个券商的费率重新计算费用并按月汇总
+    
+    先在 (市场, 产品类型) × 费率时段 × 券商 的小网格上解析费率，每笔交易按组合和成交日所在的时段
+    一次取出全部券商的费率，得到 交易 × 券商 的费率矩阵后按列计算费用，再用矩阵乘法按券商求和。
+    交易按成交日期排序后分块处理，每块只属于一个月份，内存占用与块大小乘以券商数成正比。
+    
+    Args:
+        trades: 交易数据，需包含 日期、买卖方向、交易金额，可选 市场、产品类型
+        schedule: normalize_fee_schedule 的结果
+        brokers: 参与比较的券商列表，默认为费率配置中的全部券商
+        exempt: 不收取费用的交易的布尔数组，可选
+        fx_rates: 与 trades 等长的汇率数组，可选，提供时成交金额和费用按汇率折算后汇总，汇率为空的交易不计入
+        chunk_size: 每块的交易笔数
+        fixed_point: 是否按分整数计算费用，与 compute_trade_fees 的定点模式一致
+    
+    Returns:
+        DataFrame: 见 SIMULATION_COLUMNS，每个券商每个月一行，按券商和月份排序
+    """
+    if brokers is None:
+        brokers = pd.unique(schedule['券商']).tolist()
+    brokers = [str(broker) for broker in brokers]
+    if trades.empty or not brokers:
+        return pd.DataFrame(columns=SIMULATION_COLUMNS)
+    
+    keys = _rule_keys(trades)
+    dates = pd.to_datetime(trades['日期']).astype('datetime64[ns]').to_numpy()
+    
+    # 费率时段的起点：最早日期、各费率的生效日期和失效日期的次日
+    bounds = np.concatenate([
+        schedule.loc[schedule['生效日期'] > EARLIEST, '生效日期'].to_numpy(),
+        (schedule['失效日期'].dropna() + pd.Timedelta(days=1)).to_numpy()
+    ]).astype('datetime64[ns]')
+    period_starts = np.concatenate([[EARLIEST.to_datetime64()], np.unique(bounds)])
+    market_codes, markets = pd.factorize(keys['市场'])
+    product_codes, products = pd.factorize(keys['产品类型'])
+    combo_codes, combos = pd.factorize(market_codes * len(products) + product_codes)
+    n_brokers, n_combos, n_periods = len(brokers), len(combos), len(period_starts)
+    
+    # 在小网格上解析费率，得到 (组合, 时段) × 券商 的费率矩阵
+    grid = pd.DataFrame({
+        '券商': np.tile(brokers, n_combos * n_periods),
+        '市场': np.repeat(np.asarray(markets)[combos // len(products)], n_periods * n_brokers),
+        '产品类型': np.repeat(np.asarray(products)[combos % len(products)], n_periods * n_brokers),
+        '日期': np.tile(np.repeat(period_starts, n_brokers), n_combos)
+    })
+    grid_rates, grid_matched = resolve_fee_rates(grid, schedule)
+    matrix = {field: grid_rates[field].to_numpy(dtype=np.float64).reshape(-1, n_brokers) for field in RATE_FIELDS}
+    matched = grid_matched.reshape(-1, n_brokers)
+    rules = grid_rates['取整规则'].to_numpy().reshape(-1, n_brokers)
+    cells = combo_codes * n_periods + np.searchsorted(period_starts, dates, side='right') - 1
+    
+    amount = trades['交易金额'].to_numpy(dtype=np.float64)
+    if fixed_point:
+        # 金额和费用以分为单位累加，不折算汇率时合计的分数是精确整数
+        amount = to_fixed(amount)
+        matrix = _fixed_rates(matrix)
+    is_sell = trades['买卖方向'].isin(SELL_SIDES).to_numpy()
+    fx_market = keys['市场'].isin(FX_FEE_MARKETS).to_numpy()
+    charged = np.ones(len(trades), dtype=bool) if exempt is None else ~np.asarray(exempt, dtype=bool)
+    scale = np.ones(len(trades)) if fx_rates is None else np.nan_to_num(np.asarray(fx_rates, dtype=np.float64))
+    combined = np.isin(brokers, COMBINED_MINIMUM_BROKERS)[None, :]
+    
+    # 按成交日期排序，在月份变化处和每 chunk_size 笔处分块
+    order = np.argsort(dates, kind='stable')
+    month_codes, month_labels = pd.factorize(dates[order].astype('datetime64[M]'))
+    month_labels = np.datetime_as_string(np.asarray(month_labels, dtype='datetime64[M]'), unit='M')
+    splits = np.union1d(np.flatnonzero(np.diff(month_codes)) + 1, np.arange(chunk_size, len(order), chunk_size))
+    
+    totals = np.zeros((n_brokers, len(month_labels), len(FEE_COLUMNS)))
+    counts = np.zeros(len(month_labels), dtype=np.int64)
+    amounts = np.zeros(len(month_labels))
+    defaults = np.zeros((n_brokers, len(month_labels)), dtype=np.int64)
+    bounds = np.concatenate([[0], splits, [len(order)]]).astype(np.int64)
+    for begin, end in zip(bounds[:-1], bounds[1:]):
+        rows = order[begin:end]
+        month = month_codes[begin]
+        cell = cells[rows]
+        rate = {field: np.take(values, cell, axis=0) for field, values in matrix.items()}
+        if fixed_point:
+            fees = _fixed_fee_components(
+                amount[rows, None], rate, np.take(rules, cell, axis=0), is_sell[rows, None], combined,
+                fx_market[rows, None]
+            )
+        else:
+            fees = _fee_components(amount[rows, None], rate, is_sell[rows, None], combined, fx_market[rows, None])
+        weight = charged[rows] * scale[rows]
+        for column, fee in enumerate(fees):
+            totals[:, month, column] += weight @ fee
+        counts[month] += len(rows)
+        amounts[month] += amount[rows] @ scale[rows]
+        defaults[:, month] += charged[rows].astype(np.int64) @ ~np.take(matched, cell, axis=0)
+    
+    if fixed_point:
+        totals, amounts = totals / 10 ** MONEY_DIGITS, amounts / 10 ** MONEY_DIGITS
+    result = pd.DataFrame({
+        '券商': np.repeat(brokers, len(month_labels)),
+        '月份': np.tile(month_labels, n_brokers),
+        '交易笔数': np.tile(counts, n_brokers),
+        '成交金额': np.round(np.tile(amounts, n_brokers), 2),
+        **{column: np.round(totals[:, :, i].ravel(), 2) for i, column in enumerate(FEE_COLUMNS)},
+        '默认费率笔数': defaults.ravel()
+    })
+    return result.sort_values(['券商', '月份'], kind='stable').reset_index(drop=True)
+
+
+def summarize_broker_fees(simulation, actual_fee=None):
+    """各券商全部交易的费用合计，按总费用从低到高排列
+    
+    Args:
+        simulation: simulate_broker_fees 的结果
+        actual_fee: 实际发生的总费用，可选，提供时计算各券商与实际费用的差额
+    
+    Returns:
+        DataFrame: 券商、交易笔数、成交金额、各项费用、默认费率笔数、费用率(‱)，可选 与实际差额
+    """
+    if simulation is None or simulation.empty:
+        return pd.DataFrame(columns=['券商', '交易笔数', '成交金额'] + FEE_COLUMNS + ['默认费率笔数'])
+    
+    summary = simulation.groupby('券商', sort=False)[
+        ['交易笔数', '成交金额'] + FEE_COLUMNS + ['默认费率笔数']
+    ].sum().reset_index()
+    summary[FEE_COLUMNS + ['成交金额']] = summary[FEE_COLUMNS + ['成交金额']].round(2)
+    amount = summary['成交金额'].where(summary['成交金额'] != 0)
+    summary['费用率(‱)'] = (summary['总费用'] / amount * 10000).round(2)
+    if actual_fee is not None:
+        summary['与实际差额'] = (summary['总费用'] - actual_fee).round(2)
+    return summary.sort_values('总费用', kind='stable').reset_index(drop=True)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+多币种折算
+汇率表整理为 日期 × 币种 的汇率矩阵（汇率曲面），按日期向前填充。折算时用二分查找定位每行
+日期之前最近的汇率日期，再按币种列号一次取出全部汇率，不逐行查找。
+汇率为1单位外币折合的本币金额。
+"""
+
+import numpy as np
+import pandas as pd
+
+from config.settings import BASE_CURRENCY, MARKET_CURRENCIES
+
+# 汇率表的标准列
+FX_COLUMNS = ['日期', '币种', '汇率']
+
+
+def empty_fx_rates():
+    """空的汇率表"""
+    return pd.DataFrame(columns=FX_COLUMNS)
+
+
+def base_column(column):
+    """本币金额列名，例如 '持仓市值(本币)'"""
+    return f"{column}(本币)"
+
+
+def money_column(df, column):
+    """汇总金额时使用的列：有本币列时使用本币列，否则使用原币列
+    
+    Args:
+        df: 数据
+        column: 原币金额列名
+    
+    Returns:
+        str: 列名
+    """
+    converted = base_column(column)
+    return converted if df is not None and converted in df.columns else column
+
+
+def market_currency(markets):
+    """市场对应的计价币种
+    
+    Args:
+        markets: 市场序列
+    
+    Returns:
+        ndarray: 币种代码数组，未配置的市场为本币
+    """
+    return pd.Series(markets, dtype=object).map(MARKET_CURRENCIES).fillna(BASE_CURRENCY).to_numpy()
+
+
+class RateSurface:
+    """汇率曲面，按日期和币种查询截至该日期的最新汇率"""
+    
+    def __init__(self, fx_rates, base_currency=BASE_CURRENCY):
+        """由汇率表构建汇率曲面
+        
+        同一天同一币种有多条记录时取最后一条；某币种第一条汇率之前的日期使用第一条汇率。
+        
+        Args:
+            fx_rates: 汇率表，需包含 日期、币种、汇率
+            base_currency: 本币代码，本币汇率恒为1
+        """
+        rates = pd.DataFrame({
+            '日期': pd.to_datetime(fx_rates['日期']).to_numpy().astype('datetime64[D]'),
+            '币种': fx_rates['币种'].astype(str).str.strip().str.upper().to_numpy(),
+            '汇率': pd.to_numeric(fx_rates['汇率'], errors='coerce').to_numpy()
+        }).dropna()
+        rates = rates[rates['币种'] != base_currency]
+        
+        surface = rates.pivot_table(index='日期', columns='币种', values='汇率', aggfunc='last').sort_index()
+        surface = surface.ffill().bfill()
+        
+        self.base_currency = base_currency
+        self.dates = surface.index.to_numpy().astype('datetime64[D]')
+        self.columns = {currency: i for i, currency in enumerate(surface.columns)}
+        self.values = surface.to_numpy(dtype=np.float64)
+    
+    @property
+    def currencies(self):
+        """有汇率的币种列表（不含本币）"""
+        return list(self.columns)
+    
+    def missing(self, currencies):
+        """没有汇率的外币
+        
+        Args:
+            currencies: 币种序列
+        
+        Returns:
+            list: 排序后的币种列表
+        """
+        return sorted(set(currencies) - set(self.columns) - {self.base_currency})
+    
+    def lookup(self, dates, currencies):
+        """按日期和币种查询汇率
+        
+        Args:
+            dates: 日期序列
+            currencies: 币种序列，与 dates 等长
+        
+        Returns:
+            ndarray: 汇率数组，本币为1，没有汇率的外币为NaN
+        """
+        days = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]')
+        currencies = np.asarray(currencies, dtype=object)
+        rates = np.where(currencies == self.base_currency, 1.0, np.nan)
+        if not len(self.dates):
+            return rates
+        
+        # 日期之前（含当天）最近的汇率日期
+        rows = np.clip(np.searchsorted(self.dates, days, side='right') - 1, 0, None)
+        cols = pd.Series(currencies).map(self.columns).to_numpy(dtype=np.float64)
+        known = ~np.isnan(cols)
+        rates[known] = self.values[rows[known], cols[known].astype(np.int64)]
+        return rates
+
+
+def convert_columns(df, rates, columns):
+    """按汇率把金额列折算为本币，追加 '列名(本币)' 列
+    
+    Args:
+        df: 数据
+        rates: 与 df 等长的汇率数组
+        columns: 需要折算的金额列，不存在的列跳过
+    
+    Returns:
+        DataFrame: 追加本币列后的数据
+    """
+    return df.assign(**{
+        base_column(column): np.round(df[column].to_numpy(dtype=np.float64) * rates, 2)
+        for column in columns if column in df.columns
+    })
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+批次成本计算
+按证券维护买入批次，一次遍历交易流同时计算先进先出和后进先出两种成本方法的已实现盈亏，
+用于税务申报和与券商对账。移动加权平均（摊薄成本法）的结果由 core.cost_basis 计算。
+
+批次保存在预分配的数组中：每个证券的批次数不超过其交易笔数，直接使用该证券在交易流中的
+区间作为批次存储区，先进先出从区间头部消耗，后进先出从尾部消耗。
+"""
+
+import numpy as np
+import pandas as pd
+
+from core.cost_basis import SELL_SIDES, compiled_kernel, day_end_mask, sort_trade_stream, trade_quantities
+
+# 成本方法: (方法代码, 中文名称)，顺序与内核中的方法序号一致
+COST_METHODS = (('fifo', '先进先出'), ('lifo', '后进先出'))
+
+
+def method_column(method):
+    """成本方法对应的当日已实现盈亏列名
+    
+    Args:
+        method: 方法代码，'fifo' 或 'lifo'
+    
+    Returns:
+        str: 列名，例如 '当日已实现盈亏(先进先出)'
+    """
+    return f"当日已实现盈亏({dict(COST_METHODS)[method]})"
+
+
+# 盈亏分析中追加的列，位于 当日已实现盈亏 之后
+METHOD_COLUMNS = [method_column(method) for method, _ in COST_METHODS]
+
+
+def _walk_lots(price, qty, fees, is_buy, offsets, day_start, lot_qty, lot_cost, heads, tails, day_realized,
+               out_day_realized):
+    """批次成本内核，方法0为先进先出、方法1为后进先出
+    
+    每个证券的批次存放在 offsets[g]:offsets[g+1] 区间内，heads/tails 为各方法当前批次的起止位置。
+    卖出数量超过持仓（超卖）以及无持仓时的卖出，与摊薄成本法的处理保持一致：无持仓时卖出不处理；
+    超卖后的买入先补足负持仓，补仓期间的买入成本计入持仓转正时新建的批次。
+    
+    Args:
+        price, qty, fees, is_buy: 逐笔成交价格、成交数量、总费用、是否买入
+        offsets: 各证券交易区间的起始位置，长度为证券数加一
+        day_start: 是否为该证券当日第一笔交易
+        lot_qty, lot_cost: 各方法的批次剩余数量和剩余成本（含费用），工作数组
+        heads, tails, day_realized: 各方法的工作变量
+        out_day_realized: 输出，各方法逐笔的当日累计已实现盈亏
+    """
+    methods = len(heads)
+    for group in range(len(offsets) - 1):
+        start = offsets[group]
+        position = 0
+        pending_cost = 0.0
+        for m in range(methods):
+            heads[m] = start
+            tails[m] = start
+            day_realized[m] = 0.0
+        
+        for i in range(start, offsets[group + 1]):
+            if day_start[i]:
+                for m in range(methods):
+                    day_realized[m] = 0.0
+            
+            quantity = qty[i]
+            if is_buy[i]:
+                # 买入：持仓为正时新建批次，否则成本暂存到持仓转正时
+                buy_cost = price[i] * quantity + fees[i] + pending_cost
+                if position + quantity > 0:
+                    lot_size = position + quantity if position < 0 else quantity
+                    for m in range(methods):
+                        lot_qty[m][tails[m]] = lot_size
+                        lot_cost[m][tails[m]] = buy_cost
+                        tails[m] += 1
+                    pending_cost = 0.0
+                else:
+                    pending_cost = buy_cost
+                position = position + quantity
+            elif position > 0:
+                # 卖出：按方法顺序消耗批次，超卖部分没有对应批次
+                matched = quantity if quantity < position else position
+                proceeds = price[i] * quantity - fees[i]
+                for m in range(methods):
+                    cost = 0.0
+                    left = matched
+                    while left > 0 and heads[m] < tails[m]:
+                        k = heads[m] if m == 0 else tails[m] - 1
+                        lot = lot_qty[m][k]
+                        if lot <= left:
+                            # 整个批次卖出
+                            cost += lot_cost[m][k]
+                            left = left - lot
+                            if m == 0:
+                                heads[m] += 1
+                            else:
+                                tails[m] -= 1
+                        else:
+                            # 批次部分卖出，按数量比例结转成本
+                            part = lot_cost[m][k] * left / lot
+                            cost += part
+                            lot_cost[m][k] -= part
+                            lot_qty[m][k] = lot - left
+                            left = 0
+                    day_realized[m] = day_realized[m] + (proceeds - cost)
+                position = position - quantity
+                if position <= 0:
+                    # 清仓或超卖，剩余的小数误差批次一并清除
+                    for m in range(methods):
+                        heads[m] = start
+                        tails[m] = start
+            
+            for m in range(methods):
+                out_day_realized[m][i] = day_realized[m]
+
+
+def walk_lots(price, qty, fees, is_buy, offsets, day_start):
+    """对已按证券分组、组内按时间排序的逐笔交易数组计算各成本方法的已实现盈亏
+    
+    Args:
+        price: 成交价格数组
+        qty: 成交数量数组
+        fees: 总费用数组
+        is_buy: 是否买入（布尔数组）
+        offsets: 各证券交易区间的起始位置，长度为证券数加一
+        day_start: 是否为该证券当日第一笔交易（布尔数组）
+    
+    Returns:
+        dict: {方法代码: 逐笔的当日累计已实现盈亏数组}
+    """
+    n = len(price)
+    methods = len(COST_METHODS)
+    qty_dtype = np.int64 if np.issubdtype(np.asarray(qty).dtype, np.integer) else np.float64
+    
+    price = np.ascontiguousarray(price, dtype=np.float64)
+    qty = np.ascontiguousarray(qty, dtype=qty_dtype)
+    fees = np.ascontiguousarray(fees, dtype=np.float64)
+    is_buy = np.ascontiguousarray(is_buy, dtype=np.bool_)
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+    day_start = np.ascontiguousarray(day_start, dtype=np.bool_)
+    
+    kernel = compiled_kernel(_walk_lots)
+    if kernel is not None:
+        out_day_realized = np.zeros((methods, n))
+        kernel(price, qty, fees, is_buy, offsets, day_start,
+               np.zeros((methods, n), dtype=qty_dtype), np.zeros((methods, n)),
+               np.zeros(methods, dtype=np.int64), np.zeros(methods, dtype=np.int64),
+               np.zeros(methods), out_day_realized)
+    else:
+        # 纯Python循环：在列表上逐项访问比NumPy标量快得多
+        out_day_realized = [[0.0] * n for _ in range(methods)]
+        _walk_lots(price.tolist(), qty.tolist(), fees.tolist(), is_buy.tolist(), offsets.tolist(),
+                   day_start.tolist(), [[0] * n for _ in range(methods)], [[0.0] * n for _ in range(methods)],
+                   [0] * methods, [0] * methods, [0.0] * methods, out_day_realized)
+    
+    return {
+        method: np.asarray(values, dtype=np.float64)
+        for (method, _), values in zip(COST_METHODS, out_day_realized)
+    }
+
+
+def compute_lot_pnl(trades_df):
+    """按先进先出和后进先出方法计算每个证券每个交易日的已实现盈亏
+    
+    批次状态依赖全部历史交易，需传入完整的交易数据。
+    
+    Args:
+        trades_df: 交易数据，需包含 日期、证券代码、成交价格、成交数量、总费用、买卖方向
+    
+    Returns:
+        DataFrame: 日期（datetime.date）、证券代码以及 METHOD_COLUMNS 各列，每个证券每个交易日一行
+    """
+    trades, _, offsets, day_start = sort_trade_stream(trades_df)
+    
+    result = walk_lots(
+        trades['成交价格'].to_numpy(dtype=np.float64),
+        trade_quantities(trades),
+        trades['总费用'].to_numpy(dtype=np.float64),
+        ~trades['买卖方向'].isin(SELL_SIDES).to_numpy(),
+        offsets,
+        day_start
+    )
+    
+    day_end = day_end_mask(day_start)
+    daily = trades[day_end]
+    return pd.DataFrame({
+        '日期': daily['日期'].dt.date,
+        '证券代码': daily['证券代码'],
+        **{method_column(method): values[day_end] for method, values in result.items()}
+    }).reset_index(drop=True)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+定点金额
+金额以分（0.01）、价格以0.0001、费率以1e-8为单位表示为 int64 整数。费用由整数乘法和带取整规则的
+整数除法得到，累计值按分求和，不产生浮点累计误差，结果可与券商对账单逐分核对。
+只在生成结果表时换算为带小数的金额。
+"""
+
+import numpy as np
+import pandas as pd
+
+from config.settings import MONEY_CONFIG
+
+# 金额、价格和费率的小数位数
+MONEY_DIGITS = 2
+PRICE_DIGITS = 4
+RATE_DIGITS = 8
+
+# 取整规则及其代码，均按绝对值取整，负数与对应正数的结果互为相反数
+ROUNDING_RULES = {
+    '四舍五入': 0,  # 半分进位
+    '银行家舍入': 1,  # 半分时取偶数
+    '进位': 2,  # 不足1分按1分
+    '舍去': 3  # 不足1分舍去
+}
+
+# 默认取整规则
+DEFAULT_ROUNDING = MONEY_CONFIG['rounding']
+
+
+def rounding_codes(rules):
+    """取整规则名称转换为代码
+    
+    Args:
+        rules: 取整规则名称序列，空值使用默认取整规则
+    
+    Returns:
+        ndarray: 取整规则代码数组
+    
+    Raises:
+        ValueError: 存在未知的取整规则
+    """
+    names = pd.Series(rules, dtype=object).fillna(DEFAULT_ROUNDING).astype(str).str.strip()
+    names = names.where(names != '', DEFAULT_ROUNDING)
+    unknown = sorted(set(names) - set(ROUNDING_RULES))
+    if unknown:
+        raise ValueError(f"未知的取整规则: {unknown}，可选 {list(ROUNDING_RULES)}")
+    return names.map(ROUNDING_RULES).to_numpy(dtype=np.int8)
+
+
+def _round_up(quotient, half, inexact, rules):
+    """按取整规则判断是否进一
+    
+    Args:
+        quotient: 截断后的整数部分（绝对值）
+        half: 余数与半个单位比较的符号，-1 小于、0 等于、1 大于
+        inexact: 余数是否不为0
+        rules: 取整规则代码，标量或可广播的数组
+    
+    Returns:
+        ndarray: 需要进一的布尔数组
+    """
+    rules = np.asarray(rules)
+    return np.select(
+        [rules == ROUNDING_RULES['四舍五入'], rules == ROUNDING_RULES['银行家舍入'], rules == ROUNDING_RULES['进位']],
+        [half >= 0, (half > 0) | ((half == 0) & (quotient % 2 == 1)), inexact],
+        default=False
+    )
+
+
+def to_fixed(values, digits=MONEY_DIGITS, rules=ROUNDING_RULES[DEFAULT_ROUNDING]):
+    """带小数的金额转换为定点整数
+    
+    先在1e-6个单位上吸收二进制表示误差，使 20.735 这类十进制金额按 20.735 而不是 20.73499… 取整。
+    空值按0处理。
+    
+    Args:
+        values: 金额数组
+        digits: 小数位数，例如 MONEY_DIGITS 得到以分为单位的整数
+        rules: 取整规则代码，标量或可广播的数组
+    
+    Returns:
+        ndarray: int64 定点整数数组
+    """
+    scaled = np.round(np.nan_to_num(np.asarray(values, dtype=np.float64)) * 10 ** digits, 6)
+    magnitude = np.abs(scaled)
+    whole = np.floor(magnitude)
+    fraction = magnitude - whole
+    up = _round_up(whole, np.sign(fraction - 0.5), fraction > 0, rules)
+    return (np.sign(scaled) * (whole + up)).astype(np.int64)
+
+
+def div_round(numerator, denominator, rules=ROUNDING_RULES[DEFAULT_ROUNDING]):
+    """定点整数除法，按取整规则处理余数，结果精确
+    
+    Args:
+        numerator: int64 被除数数组
+        denominator: 正整数除数
+        rules: 取整规则代码，标量或可广播的数组
+    
+    Returns:
+        ndarray: int64 商
+    """
+    numerator = np.asarray(numerator, dtype=np.int64)
+    quotient, remainder = np.divmod(np.abs(numerator), denominator)
+    up = _round_up(quotient, np.sign(2 * remainder - denominator), remainder > 0, rules)
+    return np.sign(numerator) * (quotient + up)
+
+
+def from_fixed(values, digits=MONEY_DIGITS):
+    """定点整数换算为带小数的金额，结果为最接近该十进制数的浮点数
+    
+    Args:
+        values: int64 定点整数数组
+        digits: 小数位数
+    
+    Returns:
+        ndarray: 浮点金额数组
+    """
+    return np.asarray(values, dtype=np.int64) / 10 ** digits
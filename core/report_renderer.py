@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+复盘报告渲染器
+将复盘分析结果按预编译的模板逐段写入缓冲区或文件，支持Markdown和HTML两种格式
+"""
+
+import html
+import io
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+# 支持的输出格式
+OUTPUT_FORMATS = ('markdown', 'html')
+
+# ==================== 模板 ====================
+# 固定内容的段落与数据无关，每种格式只转换一次
+
+SECTION_MARKET_HEAD = (
+    "## 一、市场整体环境复盘\n\n"
+    "### 指数与量能分析\n\n"
+)
+
+TEMPLATE_MARKET_STATUS = "今日市场整体呈{status}态势。\n\n"
+
+SECTION_MARKET_BODY = (
+    "主要指数表现：\n"
+    "- 上证指数：需关注5/10/20/60日均线趋势\n"
+    "- 深证成指：关注量能变化（增量/缩量）\n"
+    "- 创业板指：观察K线形态\n\n"
+    "市场量能分析：当前市场量能处于中等水平，需关注是否有放量突破或缩量调整迹象。\n\n"
+    "### 市场情绪与赚钱效应\n\n"
+    "涨跌停情况：\n"
+    "- 涨停家数：需统计（剔除新股和一字板）\n"
+    "- 跌停家数：需统计\n"
+    "- 涨跌超6%个股数量：需评估\n\n"
+    "连板梯队分析：关注高标连板情况，判断市场炒作持续性。\n\n"
+    "## 二、板块与个股深度分析\n\n"
+    "### 板块轮动与强弱梳理\n\n"
+    "今日领涨板块：需识别当日表现最强的2-3个板块\n"
+    "今日领跌板块：需识别当日表现最弱的2-3个板块\n\n"
+    "板块周期分析：判断主要板块所处阶段（启动、高潮、分歧、退潮）\n\n"
+    "新题材分析：关注新兴题材的涨停原因、资金关注度及持续性逻辑\n\n"
+    "### 个股异动复盘\n\n"
+    "#### 涨停复盘\n\n"
+)
+
+SECTION_LIMIT_UP_NOTE = "需分析涨停股原因（消息/技术/板块联动），研究基本面与资金动向\n\n"
+
+SECTION_STOCKS_BODY = (
+    "#### 跌停复盘\n\n"
+    "排查跌停股诱因（利空/情绪退潮），规避亏钱效应集中领域\n\n"
+    "#### 异动筛选\n\n"
+    "复盘振幅、换手率、成交量前30名个股，捕捉主力动向\n\n"
+    "### 龙头股与标杆跟踪\n\n"
+    "标记空间龙头、连板高标、地天板（情绪转折信号）及空头龙头\n"
+    "对比同梯队个股的晋级概率，筛选次日重点标的\n\n"
+    "## 三、消息面与外围市场联动\n\n"
+    "### 政策与公告解读\n\n"
+    "关注官媒（证监会、人民日报、新华社）及行业政策\n"
+    "关注业绩暴增、资产重组类公告\n"
+    "核查市场传闻真伪及潜在影响\n\n"
+    "### 外盘与大宗商品跟踪\n\n"
+    "美股（尤其是中概股）、美元指数、原油、黄金等走势\n"
+    "分析对A股相关板块（如特斯拉链、资源股）的传导效应\n\n"
+    "## 四、交易执行与自我复盘\n\n"
+    "### 操作回顾与纠错\n\n"
+)
+
+TEMPLATE_TRADE_SUMMARY = (
+    "今日共进行 {交易笔数} 笔交易：\n"
+    "- 买入 {买入笔数} 笔，金额 ¥{买入金额:,.2f}\n"
+    "- 卖出 {卖出笔数} 笔，金额 ¥{卖出金额:,.2f}\n"
+    "- 交易总额 ¥{总交易金额:,.2f}，手续费 ¥{总手续费:,.2f}\n\n"
+)
+
+SECTION_NO_TRADES = "今日无交易记录。\n\n"
+
+TEMPLATE_PNL_SUMMARY = (
+    "盈亏情况分析：\n\n"
+    "- 当日已实现盈亏: ¥{当日已实现盈亏:,.2f}\n"
+    "- 当日未实现盈亏: ¥{当日未实现盈亏:,.2f}\n"
+    "- 当日总盈亏: ¥{当日总盈亏:,.2f}\n\n"
+)
+
+TEMPLATE_DIVIDEND_SUMMARY = (
+    "分红情况：\n\n"
+    "今日共收到 {分红记录数} 笔分红，总金额 ¥{分红总金额:,.2f}。\n\n"
+)
+
+SECTION_PLAN = (
+    "### 模式与心态审视\n\n"
+    "检查当前交易策略是否适配市场风格（如缩量市需回避高位接力）\n"
+    "杜绝患得患失、冲动交易，保持理性交易心态\n\n"
+    "## 五、制定次日交易计划\n\n"
+    "### 多情景推演\n\n"
+    "预判龙头股的走势（涨停/跌停/反包）、板块轮动路径及资金流向\n"
+    "针对不同走势制定应对策略：\n"
+    "- Plan A（主线延续）：\n"
+    "- Plan B（主线分歧）：\n"
+    "- Plan C（市场调整）：\n\n"
+    "### 明确标的与买点\n\n"
+    "重点关注标的：\n"
+    "1. 标的一：买入条件、仓位分配\n"
+    "2. 标的二：买入条件、仓位分配\n"
+    "3. 标的三：买入条件、仓位分配\n\n"
+    "## 六、交易总结\n\n"
+)
+
+SECTION_DETAILS = (
+    "\n\n## 七、专业细节补充\n\n"
+    "### 龙虎榜分析\n\n"
+    "跟踪游资/机构席位动向，重点观察资金介入逻辑\n\n"
+    "### 技术工具\n\n"
+    "自选股分类管理（按板块/情绪核心归类），使用预警系统监控异动\n\n"
+)
+
+HTML_HEAD = (
+    "<!DOCTYPE html>\n<html lang=\"zh-CN\">\n<head>\n<meta charset=\"utf-8\">\n"
+    "<title>{title}</title>\n"
+    "<style>table{{border-collapse:collapse}}th,td{{border:1px solid #ccc;padding:4px 8px}}"
+    "</style>\n</head>\n<body>\n"
+)
+
+HTML_TAIL = "</body>\n</html>\n"
+
+# 表格定义: [(表头, 列名或None, 格式)]，列名为None时整列填充格式字符串本身；
+# 分隔线宽度与原Markdown报告保持一致
+TRADE_TABLE_COLUMNS = [
+    ('证券代码', '证券代码', None),
+    ('证券名称', '证券名称', None),
+    ('成交价格', '成交价格', '{:.4f}'),
+    ('成交数量', '成交数量', None),
+    ('交易金额', '交易金额', '{:,.2f}')
+]
+TRADE_TABLE_WIDTHS = [8, 8, 8, 8, 8, 8]
+
+PNL_TABLE_COLUMNS = [
+    ('证券代码', '证券代码', None),
+    ('证券名称', '证券名称', None),
+    ('持仓数量', '持仓数量', None),
+    ('持仓成本价', '持仓成本价', '{:.4f}'),
+    ('收盘价', '收盘价', '{:.4f}'),
+    ('已实现盈亏', '当日已实现盈亏', '{:,.2f}'),
+    ('未实现盈亏', '当日未实现盈亏', '{:,.2f}'),
+    ('总盈亏', '总盈亏', '{:,.2f}')
+]
+PNL_TABLE_WIDTHS = [8, 8, 8, 10, 6, 10, 10, 6]
+
+DIVIDEND_TABLE_COLUMNS = [
+    ('证券代码', '证券代码', None),
+    ('证券名称', '证券名称', None),
+    ('持有数量', '持有数量', None),
+    ('每股分红', '每股分红', '{:.4f}'),
+    ('总分红金额', '总分红金额', '{:,.2f}'),
+    ('税费', '税费', '{:,.2f}'),
+    ('净分红金额', '净分红金额', '{:,.2f}')
+]
+DIVIDEND_TABLE_WIDTHS = [8, 8, 8, 8, 10, 4, 10]
+
+_ORDERED_ITEM = re.compile(r'^\d+\. ')
+
+
+@lru_cache(maxsize=256)
+def markdown_to_html(text):
+    """将报告使用的Markdown子集（标题、列表、段落）转换为HTML
+    
+    固定段落的转换结果会被缓存，重复渲染时直接复用。
+    
+    Args:
+        text: Markdown文本
+    
+    Returns:
+        str: HTML片段
+    """
+    parts = []
+    paragraph = []
+    list_tag = None
+    
+    def close_paragraph():
+        if paragraph:
+            parts.append("<p>" + "<br>\n".join(paragraph) + "</p>\n")
+            paragraph.clear()
+    
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            parts.append(f"</{list_tag}>\n")
+            list_tag = None
+    
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            close_paragraph()
+            close_list()
+            continue
+        
+        heading = len(stripped) - len(stripped.lstrip('#'))
+        if 0 < heading <= 6 and stripped[heading:heading + 1] == ' ':
+            close_paragraph()
+            close_list()
+            parts.append(f"<h{heading}>{html.escape(stripped[heading + 1:])}</h{heading}>\n")
+            continue
+        
+        if stripped.startswith('- ') or _ORDERED_ITEM.match(stripped):
+            tag = 'ul' if stripped.startswith('- ') else 'ol'
+            item = stripped[2:] if tag == 'ul' else _ORDERED_ITEM.sub('', stripped)
+            close_paragraph()
+            if list_tag != tag:
+                close_list()
+                parts.append(f"<{tag}>\n")
+                list_tag = tag
+            parts.append(f"<li>{html.escape(item)}</li>\n")
+            continue
+        
+        close_list()
+        paragraph.append(html.escape(stripped))
+    
+    close_paragraph()
+    close_list()
+    return "".join(parts)
+
+
+def _format_column(df, column, fmt):
+    """按格式整列转换为字符串"""
+    if column is None:
+        return pd.Series(fmt, index=df.index)
+    values = df[column]
+    if fmt is None:
+        return values.astype(str)
+    return values.map(fmt.format)
+
+
+class ReviewReportRenderer:
+    """复盘报告渲染器类，按段写入输出流"""
+    
+    def __init__(self, output_format='markdown'):
+        """初始化渲染器
+        
+        Args:
+            output_format: 输出格式，'markdown' 或 'html'
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的报告格式: {output_format}")
+        self.output_format = output_format
+    
+    def _text(self, out, text):
+        """写入一段Markdown文本，HTML格式时先转换"""
+        if self.output_format == 'html':
+            text = markdown_to_html(text)
+        out.write(text)
+    
+    def _table(self, out, df, columns, widths):
+        """整列格式化后写入表格，不逐行构造字典
+        
+        Args:
+            out: 输出流
+            df: 表格数据
+            columns: 表格定义 [(表头, 列名或None, 格式)]
+            widths: Markdown分隔线宽度
+        """
+        cells = [_format_column(df, column, fmt) for _, column, fmt in columns]
+        
+        if self.output_format == 'html':
+            cells = [cell.map(html.escape) for cell in cells]
+            rows = cells[0].radd("<tr><td>").str.cat(cells[1:], sep="</td><td>") + "</td></tr>\n"
+            header = "".join(f"<th>{html.escape(name)}</th>" for name, _, _ in columns)
+            out.write(f"<table>\n<thead><tr>{header}</tr></thead>\n<tbody>\n")
+            out.write("".join(rows))
+            out.write("</tbody>\n</table>\n")
+            return
+        
+        rows = cells[0].radd("| ").str.cat(cells[1:], sep=" | ") + " |\n"
+        out.write("| " + " | ".join(name for name, _, _ in columns) + " |\n")
+        out.write("| " + " | ".join('-' * width for width in widths) + " |\n")
+        out.write("".join(rows))
+        out.write("\n")
+    
+    def render(self, analysis, out):
+        """将复盘分析结果写入输出流
+        
+        Args:
+            analysis: 复盘分析结果，明细字段为DataFrame
+            out: 可写的文本流，例如文件或 io.StringIO
+        """
+        title = f"{analysis['日期']} (星期{analysis['星期']}) 交易复盘报告"
+        if self.output_format == 'html':
+            out.write(HTML_HEAD.format(title=html.escape(title)))
+        self._text(out, f"# {title}\n\n")
+        
+        # 一、二、三：市场环境、板块个股、消息面
+        self._text(out, SECTION_MARKET_HEAD)
+        self._text(out, TEMPLATE_MARKET_STATUS.format(status=analysis['市场状态']))
+        self._text(out, SECTION_MARKET_BODY)
+        if analysis['交易笔数'] > 0:
+            self._text(out, SECTION_LIMIT_UP_NOTE)
+        self._text(out, SECTION_STOCKS_BODY)
+        
+        # 四、交易执行与自我复盘
+        self._render_trades(analysis, out)
+        self._render_pnl(analysis, out)
+        self._render_dividends(analysis, out)
+        self._text(out, SECTION_PLAN)
+        
+        # 六、交易总结
+        self._text(out, self._summary(analysis))
+        self._text(out, SECTION_DETAILS)
+        
+        if self.output_format == 'html':
+            out.write(HTML_TAIL)
+    
+    def render_to_string(self, analysis):
+        """渲染为字符串
+        
+        Args:
+            analysis: 复盘分析结果
+        
+        Returns:
+            str: 报告文本
+        """
+        buffer = io.StringIO()
+        self.render(analysis, buffer)
+        return buffer.getvalue()
+    
+    def _render_trades(self, analysis, out):
+        """操作回顾：交易统计和买卖明细"""
+        if analysis['交易笔数'] <= 0:
+            self._text(out, SECTION_NO_TRADES)
+            return
+        
+        self._text(out, TEMPLATE_TRADE_SUMMARY.format(**analysis))
+        
+        for key, label in (('买入股票', '买入'), ('卖出股票', '卖出')):
+            trades = analysis[key]
+            if not trades.empty:
+                self._text(out, f"{label}交易明细：\n\n")
+                self._table(
+                    out, trades,
+                    TRADE_TABLE_COLUMNS + [(f'{label}理由', None, '需补充')],
+                    TRADE_TABLE_WIDTHS
+                )
+    
+    def _render_pnl(self, analysis, out):
+        """盈亏情况和盈亏股票明细"""
+        if analysis['当日总盈亏'] == 0:
+            return
+        
+        self._text(out, TEMPLATE_PNL_SUMMARY.format(**analysis))
+        
+        for key in ('盈利股票', '亏损股票'):
+            stocks = analysis[key]
+            if not stocks.empty:
+                self._text(out, f"{key}明细：\n\n")
+                self._table(out, stocks, PNL_TABLE_COLUMNS, PNL_TABLE_WIDTHS)
+    
+    def _render_dividends(self, analysis, out):
+        """分红情况和分红明细"""
+        if analysis['分红记录数'] <= 0:
+            return
+        
+        self._text(out, TEMPLATE_DIVIDEND_SUMMARY.format(**analysis))
+        self._table(out, analysis['分红股票'], DIVIDEND_TABLE_COLUMNS, DIVIDEND_TABLE_WIDTHS)
+    
+    @staticmethod
+    def _summary(analysis):
+        """根据交易和盈亏情况生成总结段落"""
+        if not (analysis['交易笔数'] > 0 or analysis['当日总盈亏'] != 0):
+            return "今日无交易和盈亏变动，市场观望中。"
+        
+        parts = []
+        total_pnl = analysis['当日总盈亏']
+        
+        # 盈亏情况总结
+        if total_pnl > 0:
+            parts.append(f"今日总体表现良好，盈利 ¥{total_pnl:,.2f}。")
+            winners = analysis['盈利股票']
+            if not winners.empty:
+                top_profit = winners.loc[winners['总盈亏'].idxmax()]
+                parts.append(f"其中 {top_profit['证券名称']}({top_profit['证券代码']}) 表现最佳，")
+                parts.append(f"贡献盈利 ¥{top_profit['总盈亏']:,.2f}。")
+        elif total_pnl < 0:
+            parts.append(f"今日总体表现不佳，亏损 ¥{abs(total_pnl):,.2f}。")
+            losers = analysis['亏损股票']
+            if not losers.empty:
+                top_loss = losers.loc[losers['总盈亏'].idxmin()]
+                parts.append(f"其中 {top_loss['证券名称']}({top_loss['证券代码']}) 表现最差，")
+                parts.append(f"亏损 ¥{abs(top_loss['总盈亏']):,.2f}。")
+        else:
+            parts.append("今日盈亏平衡。")
+        
+        # 交易行为总结
+        if analysis['买入笔数'] > 0 and analysis['卖出笔数'] > 0:
+            parts.append("\n\n今日既有买入也有卖出，交易较为活跃。")
+        elif analysis['买入笔数'] > 0:
+            parts.append("\n\n今日仅有买入操作，增加了仓位。")
+        elif analysis['卖出笔数'] > 0:
+            parts.append("\n\n今日仅有卖出操作，减少了仓位。")
+        
+        # 分红情况总结
+        if analysis['分红记录数'] > 0:
+            parts.append(f"\n\n今日收到分红 ¥{analysis['分红总金额']:,.2f}，增加了现金流。")
+        
+        return "".join(parts)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+回合交易统计
+按先进先出将每个证券的买入批次与卖出配对为回合交易，一次遍历交易流得到每个回合的买入日期、
+卖出日期、持有天数、盈亏、收益率和费用；胜率、平均盈亏和持有期分布在全部回合上向量化计算。
+"""
+
+import numpy as np
+import pandas as pd
+
+from core.cost_basis import SELL_SIDES, compiled_kernel, sort_trade_stream, trade_quantities
+
+# 回合交易表的列
+TRIP_COLUMNS = [
+    '证券代码', '证券名称', '买入日期', '卖出日期', '持有天数', '数量', '买入价格', '卖出价格',
+    '买入成本', '卖出金额', '费用', '盈亏', '收益率(%)'
+]
+
+# 持有期分组: (分组上界天数, 名称)，按自然日计算
+HOLDING_BUCKETS = ((0, '当日'), (5, '1-5天'), (20, '6-20天'), (60, '21-60天'), (250, '61-250天'), (np.inf, '250天以上'))
+
+
+def _match_round_trips(price, qty, fees, is_buy, offsets, lot_qty, lot_cost, lot_fee, lot_entry,
+                       trip_entry, trip_exit, trip_qty, trip_cost, trip_proceeds, trip_fees):
+    """回合配对内核，卖出按先进先出消耗买入批次，每消耗一个批次（或其一部分）记为一个回合
+    
+    超卖和无持仓时的卖出与摊薄成本法的处理一致：无持仓时卖出不处理，超卖部分没有对应的买入，
+    不计入回合；超卖后补仓期间的买入成本计入持仓转正时新建的批次。
+    回合数不超过交易笔数，输出数组长度与交易数相同。
+    
+    Args:
+        price, qty, fees, is_buy: 逐笔成交价格、成交数量、总费用、是否买入
+        offsets: 各证券交易区间的起始位置，长度为证券数加一
+        lot_qty, lot_cost, lot_fee, lot_entry: 批次剩余数量、剩余成本（含费用）、剩余买入费用、建仓交易序号，工作数组
+        trip_*: 输出，各回合的买入交易序号、卖出交易序号、数量、买入成本、卖出金额（扣除费用）、费用
+    
+    Returns:
+        int: 回合数
+    """
+    trips = 0
+    for group in range(len(offsets) - 1):
+        start = offsets[group]
+        head = start
+        tail = start
+        position = 0
+        pending_cost = 0.0
+        pending_fee = 0.0
+        
+        for i in range(start, offsets[group + 1]):
+            quantity = qty[i]
+            if is_buy[i]:
+                buy_cost = price[i] * quantity + fees[i] + pending_cost
+                buy_fee = fees[i] + pending_fee
+                if position + quantity > 0:
+                    lot_qty[tail] = position + quantity if position < 0 else quantity
+                    lot_cost[tail] = buy_cost
+                    lot_fee[tail] = buy_fee
+                    lot_entry[tail] = i
+                    tail += 1
+                    pending_cost = 0.0
+                    pending_fee = 0.0
+                else:
+                    pending_cost = buy_cost
+                    pending_fee = buy_fee
+                position = position + quantity
+            elif position > 0:
+                left = quantity if quantity < position else position
+                proceeds = price[i] * quantity - fees[i]
+                while left > 0 and head < tail:
+                    lot = lot_qty[head]
+                    take = lot if lot <= left else left
+                    if take == lot:
+                        cost = lot_cost[head]
+                        entry_fee = lot_fee[head]
+                    else:
+                        cost = lot_cost[head] * take / lot
+                        entry_fee = lot_fee[head] * take / lot
+                        lot_cost[head] -= cost
+                        lot_fee[head] -= entry_fee
+                    lot_qty[head] = lot - take
+                    
+                    trip_entry[trips] = lot_entry[head]
+                    trip_exit[trips] = i
+                    trip_qty[trips] = take
+                    trip_cost[trips] = cost
+                    trip_proceeds[trips] = proceeds * take / quantity
+                    trip_fees[trips] = entry_fee + fees[i] * take / quantity
+                    trips += 1
+                    
+                    if take == lot:
+                        head += 1
+                    left = left - take
+                position = position - quantity
+                if position <= 0:
+                    head = start
+                    tail = start
+    return trips
+
+
+def match_round_trips(trades_df):
+    """按先进先出把买入和卖出配对为回合交易
+    
+    Args:
+        trades_df: 交易数据，需包含 日期、证券代码、证券名称、成交价格、成交数量、总费用、买卖方向
+    
+    Returns:
+        DataFrame: 回合交易，列见 TRIP_COLUMNS，按卖出日期和证券代码排序
+    """
+    trades, _, offsets, _ = sort_trade_stream(trades_df)
+    n = len(trades)
+    
+    price = trades['成交价格'].to_numpy(dtype=np.float64)
+    qty = trade_quantities(trades)
+    qty_dtype = np.int64 if np.issubdtype(qty.dtype, np.integer) else np.float64
+    qty = np.ascontiguousarray(qty, dtype=qty_dtype)
+    fees = trades['总费用'].to_numpy(dtype=np.float64)
+    is_buy = ~trades['买卖方向'].isin(SELL_SIDES).to_numpy()
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+    
+    kernel = compiled_kernel(_match_round_trips)
+    if kernel is not None:
+        outputs = [np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64), np.zeros(n, dtype=qty_dtype),
+                   np.zeros(n), np.zeros(n), np.zeros(n)]
+        count = kernel(price, qty, fees, is_buy, offsets,
+                       np.zeros(n, dtype=qty_dtype), np.zeros(n), np.zeros(n), np.zeros(n, dtype=np.int64),
+                       *outputs)
+    else:
+        # 纯Python循环：在列表上逐项访问比NumPy标量快得多
+        outputs = [[0] * n, [0] * n, [0] * n, [0.0] * n, [0.0] * n, [0.0] * n]
+        count = _match_round_trips(price.tolist(), qty.tolist(), fees.tolist(), is_buy.tolist(), offsets.tolist(),
+                                   [0] * n, [0.0] * n, [0.0] * n, [0] * n, *outputs)
+    entry, exit_, trip_qty, cost, proceeds, trip_fees = (
+        np.asarray(values[:count], dtype=dtype)
+        for values, dtype in zip(outputs, (np.int64, np.int64, qty_dtype, np.float64, np.float64, np.float64))
+    )
+    
+    entries = trades.iloc[entry]
+    exits = trades.iloc[exit_]
+    entry_dates = entries['日期'].dt.normalize().to_numpy()
+    exit_dates = exits['日期'].dt.normalize().to_numpy()
+    pnl = proceeds - cost
+    
+    trips = pd.DataFrame({
+        '证券代码': exits['证券代码'].to_numpy(),
+        '证券名称': exits['证券名称'].to_numpy() if '证券名称' in exits else '',
+        '买入日期': entry_dates,
+        '卖出日期': exit_dates,
+        '持有天数': (exit_dates - entry_dates) // np.timedelta64(1, 'D'),
+        '数量': trip_qty,
+        '买入价格': entries['成交价格'].to_numpy(),
+        '卖出价格': exits['成交价格'].to_numpy(),
+        '买入成本': np.round(cost, 2),
+        '卖出金额': np.round(proceeds, 2),
+        '费用': np.round(trip_fees, 2),
+        '盈亏': np.round(pnl, 2),
+        '收益率(%)': np.round(np.divide(pnl, cost, out=np.zeros_like(pnl), where=cost > 0) * 100, 2)
+    }, columns=TRIP_COLUMNS)
+    return trips.sort_values(['卖出日期', '证券代码'], kind='stable').reset_index(drop=True)
+
+
+def _trip_stats(trips, keys):
+    """按分组键汇总回合统计"""
+    pnl = trips['盈亏']
+    grouped = trips.assign(
+        _win=pnl > 0,
+        _loss=pnl < 0,
+        _win_pnl=pnl.where(pnl > 0),
+        _loss_pnl=pnl.where(pnl < 0)
+    ).groupby(keys, observed=False)
+    
+    stats = grouped.agg(
+        回合数=('盈亏', 'size'),
+        盈利回合=('_win', 'sum'),
+        亏损回合=('_loss', 'sum'),
+        平均盈利=('_win_pnl', 'mean'),
+        平均亏损=('_loss_pnl', 'mean'),
+        总盈亏=('盈亏', 'sum'),
+        总费用=('费用', 'sum'),
+        平均收益率=('收益率(%)', 'mean'),
+        平均持有天数=('持有天数', 'mean'),
+        中位持有天数=('持有天数', 'median'),
+        最长持有天数=('持有天数', 'max')
+    ).reset_index()
+    
+    stats['胜率(%)'] = (stats['盈利回合'] / stats['回合数'].where(stats['回合数'] > 0) * 100).fillna(0).round(2)
+    stats['盈亏比'] = (stats['平均盈利'] / stats['平均亏损'].abs()).round(2)
+    stats[['平均盈利', '平均亏损']] = stats[['平均盈利', '平均亏损']].fillna(0).round(2)
+    stats[['总盈亏', '总费用']] = stats[['总盈亏', '总费用']].round(2)
+    stats['平均收益率'] = stats['平均收益率'].round(2)
+    stats[['平均持有天数', '中位持有天数']] = stats[['平均持有天数', '中位持有天数']].round(1)
+    return stats.rename(columns={'平均收益率': '平均收益率(%)'})
+
+
+def summarize_round_trips(trips):
+    """按证券汇总回合统计，最后一行为全部回合的合计
+    
+    Args:
+        trips: match_round_trips 返回的回合交易
+    
+    Returns:
+        DataFrame: 证券代码、证券名称、回合数、胜率(%)、平均盈利、平均亏损、盈亏比、总盈亏、持有天数统计等
+    """
+    columns = [
+        '证券代码', '证券名称', '回合数', '盈利回合', '亏损回合', '胜率(%)', '平均盈利', '平均亏损', '盈亏比',
+        '总盈亏', '总费用', '平均收益率(%)', '平均持有天数', '中位持有天数', '最长持有天数'
+    ]
+    if trips.empty:
+        return pd.DataFrame(columns=columns)
+    
+    by_symbol = _trip_stats(trips, ['证券代码', '证券名称']).sort_values('总盈亏', ascending=False)
+    total = _trip_stats(trips.assign(证券代码='合计', 证券名称='全部'), ['证券代码', '证券名称'])
+    return pd.concat([by_symbol, total], ignore_index=True)[columns]
+
+
+def holding_distribution(trips):
+    """按持有期分组统计回合数、胜率和收益
+    
+    Args:
+        trips: match_round_trips 返回的回合交易
+    
+    Returns:
+        DataFrame: 持有期、回合数、胜率(%)、平均收益率(%)、总盈亏，每个持有期分组一行
+    """
+    bounds = [-np.inf] + [upper for upper, _ in HOLDING_BUCKETS]
+    labels = [label for _, label in HOLDING_BUCKETS]
+    buckets = pd.cut(trips['持有天数'], bins=bounds, labels=labels)
+    
+    stats = _trip_stats(trips.assign(持有期=buckets), ['持有期'])
+    stats['持有期'] = stats['持有期'].astype(str)
+    return stats[['持有期', '回合数', '胜率(%)', '平均收益率(%)', '总盈亏']]
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易数据本地存储
+使用SQLite保存交易数据、费率配置、收盘价格、证券信息、分红记录、公司行动、汇率和每日盈亏，
+Excel只作为导入导出格式。按（证券代码, 日期）建立索引，追加一天的交易只需插入新行。
+"""
+
+import os
+import sqlite3
+import logging
+
+import pandas as pd
+
+from config.settings import SHEET_NAMES, DEFAULT_DB_FILE
+
+logger = logging.getLogger('trade_store')
+
+# 表名与Excel工作表名称的对应关系
+TABLES = {
+    'trades': SHEET_NAMES['TRADES'],
+    'rates': SHEET_NAMES['RATES'],
+    'prices': SHEET_NAMES['PRICES'],
+    'securities': SHEET_NAMES['SECURITIES'],
+    'dividends': SHEET_NAMES['DIVIDENDS'],
+    'corporate_actions': SHEET_NAMES['CORPORATE_ACTIONS'],
+    'fx_rates': SHEET_NAMES['FX_RATES'],
+    'holidays': SHEET_NAMES['HOLIDAYS'],
+    'daily_pnl': SHEET_NAMES['PNL']
+}
+
+# 导入Excel时必需的表，其余工作表缺失时跳过
+REQUIRED_TABLES = ('trades', 'rates', 'prices')
+
+# 包含日期列的表，读取时解析为日期时间类型
+DATE_TABLES = ('trades', 'prices', 'dividends', 'corporate_actions', 'fx_rates', 'holidays', 'daily_pnl')
+
+
+class TradeStore:
+    """交易数据存储类，基于SQLite"""
+    
+    def __init__(self, db_path=None):
+        """初始化存储
+        
+        Args:
+            db_path: 数据库文件路径，默认使用 DEFAULT_DB_FILE
+        """
+        self.db_path = db_path or DEFAULT_DB_FILE
+    
+    def _connect(self):
+        """打开数据库连接"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return sqlite3.connect(self.db_path)
+    
+    @staticmethod
+    def _table_exists(conn, table):
+        """表是否存在"""
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        return row is not None
+    
+    @staticmethod
+    def _table_columns(conn, table):
+        """表的列名列表"""
+        return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+    
+    def _create_indexes(self, conn, table):
+        """为包含证券代码和日期的表建立 (证券代码, 日期) 索引"""
+        columns = self._table_columns(conn, table)
+        if '证券代码' in columns and '日期' in columns:
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{table}_code_date" ON "{table}" ("证券代码", "日期")'
+            )
+        elif '日期' in columns:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_date" ON "{table}" ("日期")')
+    
+    @staticmethod
+    def _prepare(df):
+        """写入前统一格式：证券代码为字符串，日期为ISO格式文本"""
+        df = df.copy()
+        if '证券代码' in df.columns:
+            df['证券代码'] = df['证券代码'].astype(str)
+        if '日期' in df.columns:
+            df['日期'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d %H:%M:%S')
+        return df
+    
+    def write_table(self, table, df):
+        """用数据整体替换一张表
+        
+        Args:
+            table: 表名，见 TABLES
+            df: 数据
+        
+        Returns:
+            bool: 是否写入成功
+        """
+        try:
+            with self._connect() as conn:
+                self._prepare(df).to_sql(table, conn, if_exists='replace', index=False)
+                self._create_indexes(conn, table)
+            logger.info(f"已写入表 {table}，共 {len(df)} 行")
+            return True
+        except Exception as e:
+            logger.error(f"写入表 {table} 失败: {e}")
+            return False
+    
+    def append_rows(self, table, df):
+        """向表中追加数据，已有数据不变
+        
+        Args:
+            table: 表名，见 TABLES
+            df: 新增的数据，列需与表一致
+        
+        Returns:
+            bool: 是否追加成功
+        """
+        if df is None or df.empty:
+            return True
+        
+        try:
+            with self._connect() as conn:
+                if self._table_exists(conn, table):
+                    missing = set(self._table_columns(conn, table)) - set(df.columns)
+                    extra = set(df.columns) - set(self._table_columns(conn, table))
+                    if extra:
+                        raise ValueError(f"存在表中没有的列: {sorted(extra)}")
+                    if missing:
+                        logger.warning(f"追加到表 {table} 的数据缺少列 {sorted(missing)}，将写入空值")
+                self._prepare(df).to_sql(table, conn, if_exists='append', index=False)
+                self._create_indexes(conn, table)
+            logger.info(f"已向表 {table} 追加 {len(df)} 行")
+            return True
+        except Exception as e:
+            logger.error(f"追加数据到表 {table} 失败: {e}")
+            return False
+    
+    def read_table(self, table, start_date=None, end_date=None, symbols=None):
+        """读取一张表，可按日期范围和证券代码筛选（使用索引）
+        
+        Args:
+            table: 表名，见 TABLES
+            start_date: 开始日期（包含）
+            end_date: 结束日期（包含）
+            symbols: 证券代码列表
+        
+        Returns:
+            DataFrame: 表数据，表不存在时返回None
+        """
+        with self._connect() as conn:
+            if not self._table_exists(conn, table):
+                return None
+            
+            conditions = []
+            params = []
+            if start_date is not None:
+                conditions.append('"日期" >= ?')
+                params.append(pd.Timestamp(start_date).strftime('%Y-%m-%d'))
+            if end_date is not None:
+                conditions.append('"日期" < ?')
+                params.append((pd.Timestamp(end_date) + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+            if symbols:
+                conditions.append(f'"证券代码" IN ({", ".join("?" * len(symbols))})')
+                params.extend(str(symbol) for symbol in symbols)
+            
+            sql = f'SELECT * FROM "{table}"'
+            if conditions:
+                sql += ' WHERE ' + ' AND '.join(conditions)
+            
+            df = pd.read_sql_query(sql, conn, params=params)
+        
+        if '证券代码' in df.columns:
+            df['证券代码'] = df['证券代码'].astype(str)
+        if table in DATE_TABLES and '日期' in df.columns:
+            df['日期'] = pd.to_datetime(df['日期'])
+        return df
+    
+    def import_excel(self, input_file):
+        """从Excel工作簿导入所有数据，替换已有数据
+        
+        Args:
+            input_file: Excel文件路径
+        
+        Returns:
+            bool: 是否导入成功
+        """
+        try:
+            with pd.ExcelFile(input_file) as xls:
+                for table, sheet_name in TABLES.items():
+                    if sheet_name not in xls.sheet_names:
+                        if table in REQUIRED_TABLES:
+                            logger.error(f"Excel文件缺少工作表 '{sheet_name}'")
+                            return False
+                        continue
+                    
+                    df = pd.read_excel(xls, sheet_name=sheet_name, dtype={'证券代码': str})
+                    if not self.write_table(table, df):
+                        return False
+            
+            logger.info(f"已将 {input_file} 导入到 {self.db_path}")
+            return True
+        except Exception as e:
+            logger.error(f"导入Excel失败: {e}")
+            return False
+    
+    def export_excel(self, output_file):
+        """将所有表导出为Excel工作簿，每张表一个工作表
+        
+        Args:
+            output_file: Excel文件路径
+        
+        Returns:
+            bool: 是否导出成功
+        """
+        try:
+            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+                for table, sheet_name in TABLES.items():
+                    df = self.read_table(table)
+                    if df is not None:
+                        df.to_excel(writer, sheet_name=sheet_name, index=False)
+            
+            logger.info(f"已将 {self.db_path} 导出到 {output_file}")
+            return True
+        except Exception as e:
+            logger.error(f"导出Excel失败: {e}")
+            return False
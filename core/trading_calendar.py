@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+交易日历
+按市场在本地生成交易日：周一至周五，去掉按规则计算的固定节假日，再去掉休市日表中的日期。
+农历节假日（春节、清明、端午、中秋等）和临时休市无法按规则推算，需在休市日表中列出。
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, EasterMonday, GoodFriday, Holiday, USLaborDay, USMartinLutherKingJr,
+    USMemorialDay, USPresidentsDay, USThanksgivingDay, nearest_workday, sunday_to_monday
+)
+
+# 休市日表的标准列，市场为空时对所有市场生效
+HOLIDAY_COLUMNS = ['日期', '市场', '说明']
+
+
+class _ChinaExchangeCalendar(AbstractHolidayCalendar):
+    """上交所、深交所的公历节假日"""
+    rules = [
+        Holiday('元旦', month=1, day=1),
+        Holiday('劳动节', month=5, day=1),
+        *[Holiday(f'国庆节{day}', month=10, day=day) for day in range(1, 8)]
+    ]
+
+
+class _HongKongExchangeCalendar(AbstractHolidayCalendar):
+    """港交所的公历和复活节假日，周日的假日顺延到周一"""
+    rules = [
+        Holiday('元旦', month=1, day=1, observance=sunday_to_monday),
+        GoodFriday,
+        EasterMonday,
+        Holiday('劳动节', month=5, day=1, observance=sunday_to_monday),
+        Holiday('香港特别行政区成立纪念日', month=7, day=1, observance=sunday_to_monday),
+        Holiday('国庆节', month=10, day=1, observance=sunday_to_monday),
+        Holiday('圣诞节', month=12, day=25, observance=sunday_to_monday),
+        Holiday('圣诞节翌日', month=12, day=26, observance=sunday_to_monday)
+    ]
+
+
+class _NewYorkExchangeCalendar(AbstractHolidayCalendar):
+    """纽约证券交易所的节假日"""
+    rules = [
+        Holiday('New Year', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday)
+    ]
+
+
+# 市场对应的节假日规则，未列出的市场没有交易日历
+MARKET_CALENDARS = {
+    '上交所': _ChinaExchangeCalendar,
+    '深交所': _ChinaExchangeCalendar,
+    '港交所': _HongKongExchangeCalendar,
+    '美股': _NewYorkExchangeCalendar
+}
+
+
+def empty_holidays():
+    """空的休市日表"""
+    return pd.DataFrame(columns=HOLIDAY_COLUMNS)
+
+
+class TradingCalendar:
+    """各市场的交易日历，按 (市场, 起止日期) 缓存交易日数组"""
+    
+    def __init__(self, holidays=None):
+        """初始化交易日历
+        
+        Args:
+            holidays: 休市日表，需包含 日期，可选 市场（为空时对所有市场生效）
+        """
+        self._extra = {}
+        if holidays is not None and not holidays.empty:
+            dates = pd.to_datetime(holidays['日期']).to_numpy().astype('datetime64[D]')
+            markets = holidays['市场'] if '市场' in holidays.columns else pd.Series(np.nan, index=holidays.index)
+            markets = markets.fillna('').astype(str).str.strip().to_numpy()
+            for market in MARKET_CALENDARS:
+                self._extra[market] = np.unique(dates[(markets == market) | (markets == '')])
+        self._cache = {}
+    
+    @staticmethod
+    def has_calendar(market):
+        """市场是否有交易日历"""
+        return market in MARKET_CALENDARS
+    
+    def sessions(self, market, start, end):
+        """市场在日期范围内的交易日
+        
+        Args:
+            market: 市场名称，见 MARKET_CALENDARS
+            start: 开始日期（包含）
+            end: 结束日期（包含）
+        
+        Returns:
+            ndarray: 升序的 datetime64[D] 交易日数组
+        """
+        key = (market, pd.Timestamp(start).date(), pd.Timestamp(end).date())
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        
+        weekdays = pd.bdate_range(key[1], key[2]).to_numpy().astype('datetime64[D]')
+        holidays = MARKET_CALENDARS[market]().holidays(key[1], key[2]).to_numpy().astype('datetime64[D]')
+        holidays = np.union1d(holidays, self._extra.get(market, np.array([], dtype='datetime64[D]')))
+        sessions = weekdays[~np.isin(weekdays, holidays)]
+        self._cache[key] = sessions
+        return sessions
+    
+    def is_session(self, market, date):
+        """某一天是否为市场的交易日，没有交易日历的市场均视为交易日"""
+        if not self.has_calendar(market):
+            return True
+        day = np.datetime64(pd.Timestamp(date).date(), 'D')
+        return bool(len(self.sessions(market, day, day)))
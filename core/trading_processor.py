@@ -9,20 +9,26 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
+import hashlib
 import logging
 
 # 导入配置
-from config.settings import LOG_CONFIG, SHEET_NAMES, DEFAULT_RATES
-
-# 配置日志
-logging.basicConfig(
-    level=getattr(logging, LOG_CONFIG['level']),
-    format=LOG_CONFIG['format'],
-    handlers=[
-        logging.FileHandler(LOG_CONFIG['file'], encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+from config.settings import SHEET_NAMES, DEFAULT_RATES, MONEY_CONFIG
+from utils.run_report import RunReport, frame_rows, timed_stage
+from core.corporate_actions import RIGHTS_SIDE, apply_corporate_actions, empty_corporate_actions
+from core.cost_basis import compute_cost_basis
+from core.dividends import compute_dividend_entitlements, dividend_cash_events, empty_dividends
+from core.fee_schedule import (
+    FEE_COLUMNS, RULE_KEYS, SIMULATION_COLUMNS, compute_trade_fees, normalize_fee_schedule, simulate_broker_fees,
+    summarize_broker_fees
 )
+from core.fx import RateSurface, base_column, convert_columns, empty_fx_rates, market_currency, money_column
+from core.lot_engine import METHOD_COLUMNS, compute_lot_pnl
+from core.money import MONEY_DIGITS, PRICE_DIGITS, from_fixed, to_fixed
+from core.round_trips import TRIP_COLUMNS, holding_distribution, match_round_trips, summarize_round_trips
+from core.trading_calendar import TradingCalendar, empty_holidays
+
+# 日志处理器由入口程序通过 config.settings.setup_logging 配置
 logger = logging.getLogger('trading_processor')
 
 class TradingProcessor:
@@ -34,14 +40,47 @@ class TradingProcessor:
         self.rates_df = None
         self.prices_df = None
         self.securities_df = None  # 新增：证券代码信息
-        self.dividend_df = None  # 分红记录
-        self.fee_rates = {}
+        self.dividend_df = None  # 分红记录（按持仓补全持有数量和分红金额后）
+        self.dividend_schedule = None  # 加载的分红计划，每股分红按除息日前的持仓计算
+        self.corporate_actions_df = None  # 公司行动（拆股、合股、送转股、配股）
+        self.fx_rates_df = None  # 汇率表（1单位外币折合的本币金额）
+        self.rate_surface = None  # 汇率曲面，有汇率表时金额同时按本币折算
+        self.holidays_df = None  # 休市日表，补充交易日历中无法按规则推算的休市日
+        self.trading_calendar = TradingCalendar()  # 各市场的交易日历，决定每日盈亏的日期轴
+        self.fee_schedule = None  # 分时段费率表，每笔交易按成交日匹配生效的费率
+        self.fixed_point = MONEY_CONFIG['fixed_point']  # 是否按分整数计算费用和盈亏
         self.positions = {}
         self.daily_pnl = None
+        self.source_hash = None  # 源文件内容哈希
+        self.data_version = 0  # 数据版本号，数据变化时递增，用于缓存校验
+        self._date_indexes = {}  # 按日期分区的索引: {数据名称: (数据版本号, 原数据, 排序后的数据, 日期数组)}
+        self._pnl_state = None  # 盈亏计算的结束状态: (最后日期, {证券代码: 持仓})，用于增量计算
+        self.run_report = RunReport()  # 各阶段的耗时、处理行数和内存峰值
+    
+    @property
+    def data_tag(self):
+        """数据标识：源文件哈希加数据版本号，可用作ETag等缓存键"""
+        return f"{self.source_hash or 'none'}-{self.data_version}"
+    
+    @property
+    def last_pnl_date(self):
+        """已计算盈亏的最后日期，尚未计算时为None"""
+        return self._pnl_state[0] if self._pnl_state else None
+    
+    def _file_digest(self, input_file):
+        """计算输入文件的sha1哈希，非文件路径时返回None"""
+        if not isinstance(input_file, (str, os.PathLike)) or not os.path.isfile(input_file):
+            return None
+        digest = hashlib.sha1()
+        with open(input_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
     
-    def load_data(self, input_file, trades_sheet='交易数据', rates_sheet='费率配置', prices_sheet='收盘价格', securities_sheet='证券信息', dividends_sheet='分红记录'):
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
+    def load_data(self, input_file, trades_sheet='交易数据', rates_sheet='费率配置', prices_sheet='收盘价格', securities_sheet='证券信息', dividends_sheet='分红记录', actions_sheet='公司行动', fx_sheet='汇率', holidays_sheet='休市日'):
         """
-        从单个Excel文件的不同工作表加载交易数据、费率配置、收盘价格、证券信息和分红记录
+        从单个Excel文件的不同工作表加载交易数据、费率配置、收盘价格、证券信息、分红记录、公司行动、汇率和休市日
         
         Args:
             input_file: 输入Excel文件路径
@@ -50,7 +89,10 @@ class TradingProcessor:
             prices_sheet: 收盘价格工作表名称
             securities_sheet: 证券信息工作表名称
             dividends_sheet: 分红记录工作表名称
-            
+            actions_sheet: 公司行动工作表名称
+            fx_sheet: 汇率工作表名称
+            holidays_sheet: 休市日工作表名称
+        
         Returns:
             是否成功加载数据
         """
@@ -78,21 +120,127 @@ class TradingProcessor:
             # 加载分红记录，指定证券代码为字符串类型
             self.dividend_df = pd.read_excel(input_file, sheet_name=dividends_sheet, dtype={'证券代码': str})
             logger.info(f"成功从工作表 '{dividends_sheet}' 加载 {len(self.dividend_df)} 条分红记录")
-
-            # 数据预处理
-            self._preprocess_data()
             
-            # 处理费率配置
-            self._process_fee_rates()
+            # 尝试加载公司行动（可选）
+            try:
+                self.corporate_actions_df = pd.read_excel(input_file, sheet_name=actions_sheet, dtype={'证券代码': str})
+                logger.info(f"成功从工作表 '{actions_sheet}' 加载 {len(self.corporate_actions_df)} 条公司行动")
+            except Exception as e:
+                logger.info(f"未找到公司行动工作表 '{actions_sheet}'，不做复权: {e}")
+                self.corporate_actions_df = empty_corporate_actions()
             
-            # 处理证券信息
-            self._process_securities_info()
+            # 尝试加载汇率（可选）
+            try:
+                self.fx_rates_df = pd.read_excel(input_file, sheet_name=fx_sheet)
+                logger.info(f"成功从工作表 '{fx_sheet}' 加载 {len(self.fx_rates_df)} 条汇率记录")
+            except Exception as e:
+                logger.info(f"未找到汇率工作表 '{fx_sheet}'，金额按原币统计: {e}")
+                self.fx_rates_df = empty_fx_rates()
+            
+            # 尝试加载休市日（可选）
+            try:
+                self.holidays_df = pd.read_excel(input_file, sheet_name=holidays_sheet)
+                logger.info(f"成功从工作表 '{holidays_sheet}' 加载 {len(self.holidays_df)} 条休市日")
+            except Exception as e:
+                logger.info(f"未找到休市日工作表 '{holidays_sheet}'，交易日历只使用内置规则: {e}")
+                self.holidays_df = empty_holidays()
             
+            self._prepare_loaded_data()
+            
+            self.source_hash = self._file_digest(input_file)
+            self.data_version += 1
             return True
         except Exception as e:
             logger.error(f"加载数据失败: {e}")
             return False
     
+    def _prepare_loaded_data(self):
+        """加载后的统一处理：数据预处理、公司行动复权、汇率曲面、交易日历、费率配置和证券信息"""
+        # 数据预处理
+        self._preprocess_data()
+        
+        # 按公司行动复权
+        self._apply_corporate_actions()
+        
+        # 构建汇率曲面
+        self.rate_surface = None
+        if self.fx_rates_df is not None and not self.fx_rates_df.empty:
+            self.rate_surface = RateSurface(self.fx_rates_df)
+        
+        # 构建交易日历
+        self.trading_calendar = TradingCalendar(self.holidays_df)
+        
+        # 处理费率配置
+        self._process_fee_rates()
+        
+        # 处理证券信息
+        self._process_securities_info()
+    
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
+    def load_from_store(self, db_path=None):
+        """从本地数据库加载交易数据、费率配置、收盘价格、证券信息和分红记录
+        
+        Args:
+            db_path: 数据库文件路径，默认使用 DEFAULT_DB_FILE
+        
+        Returns:
+            bool: 是否成功加载数据
+        """
+        from .trade_store import TradeStore
+        
+        try:
+            store = TradeStore(db_path)
+            tables = {
+                table: store.read_table(table)
+                for table in ('trades', 'rates', 'prices', 'securities', 'dividends', 'corporate_actions', 'fx_rates',
+                          'holidays')
+            }
+            
+            missing = [table for table in ('trades', 'rates', 'prices') if tables[table] is None]
+            if missing:
+                logger.error(f"数据库 {store.db_path} 中缺少表: {missing}")
+                return False
+            
+            self.trades_df = tables['trades']
+            self.rates_df = tables['rates']
+            self.prices_df = tables['prices']
+            self.securities_df = tables['securities']
+            self.dividend_df = tables['dividends'] if tables['dividends'] is not None else empty_dividends()
+            self.corporate_actions_df = (tables['corporate_actions'] if tables['corporate_actions'] is not None
+                                         else empty_corporate_actions())
+            self.fx_rates_df = tables['fx_rates'] if tables['fx_rates'] is not None else empty_fx_rates()
+            self.holidays_df = tables['holidays'] if tables['holidays'] is not None else empty_holidays()
+            logger.info(f"成功从数据库 {store.db_path} 加载 {len(self.trades_df)} 条交易记录、"
+                        f"{len(self.prices_df)} 条收盘价格记录")
+            
+            self._prepare_loaded_data()
+            
+            self.source_hash = self._file_digest(store.db_path)
+            self.data_version += 1
+            return True
+        except Exception as e:
+            logger.error(f"从数据库加载数据失败: {e}")
+            return False
+    
+    @timed_stage(rows=lambda self, result: frame_rows(self.daily_pnl))
+    def save_to_store(self, db_path=None):
+        """将计算得到的每日盈亏写入本地数据库
+        
+        Args:
+            db_path: 数据库文件路径，默认使用 DEFAULT_DB_FILE
+        
+        Returns:
+            bool: 是否写入成功
+        """
+        from .trade_store import TradeStore
+        
+        if self.daily_pnl is None:
+            logger.warning("没有每日盈亏数据可写入")
+            return False
+        
+        return TradeStore(db_path).write_table('daily_pnl', self.daily_pnl)
+    
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
     def _preprocess_data(self):
         """数据预处理"""
         # 确保日期格式正确
@@ -111,10 +259,28 @@ class TradingProcessor:
         self.prices_df = self.prices_df.sort_values(['日期', '证券代码']).reset_index(drop=True)
         self.securities_df = self.securities_df.sort_values('证券代码').reset_index(drop=True)
         self.dividend_df = self.dividend_df.sort_values(['日期', '证券代码']).reset_index(drop=True)
+        self.dividend_schedule = self.dividend_df.copy()
         
         # 根据证券代码自动填充交易数据中的证券名称和市场信息
         self._fill_security_info()
     
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
+    def _apply_corporate_actions(self):
+        """按公司行动对交易数据、收盘价格和分红计划做前复权，并生成配股认购记录"""
+        if self.corporate_actions_df is None or self.corporate_actions_df.empty:
+            return
+        
+        self.trades_df, self.prices_df, self.dividend_schedule = apply_corporate_actions(
+            self.corporate_actions_df, self.trades_df, self.prices_df, self.dividend_schedule
+        )
+        self.dividend_df = self.dividend_schedule.copy()
+        
+        adjusted = int((self.trades_df['复权因子'] != 1).sum())
+        rights = int((self.trades_df['买卖方向'] == RIGHTS_SIDE).sum())
+        logger.info(f"公司行动复权完成: {len(self.corporate_actions_df)} 条公司行动，"
+                    f"复权 {adjusted} 笔交易，生成 {rights} 笔配股认购")
+    
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
     def _fill_security_info(self):
         """根据证券代码自动填充交易数据中的证券名称和市场信息"""
         if self.securities_df is None or self.trades_df is None:
@@ -185,29 +351,11 @@ class TradingProcessor:
         self.prices_df['收盘价'] = pd.to_numeric(self.prices_df['收盘价'], errors='coerce').fillna(0)
     
     def _process_fee_rates(self):
-        """处理费率配置，转换为嵌套字典格式"""
-        # 将费率数据转换为嵌套字典格式: {券商: {市场: {产品类型: {费率信息}}}}
-        for _, row in self.rates_df.iterrows():
-            broker = row['券商']
-            market = row['市场']
-            product_type = row['产品类型']
-            
-            if broker not in self.fee_rates:
-                self.fee_rates[broker] = {}
-            if market not in self.fee_rates[broker]:
-                self.fee_rates[broker][market] = {}
-            
-            self.fee_rates[broker][market][product_type] = {
-                '手续费率': row['手续费率'],
-                '规费率': row['规费率'],
-                '印花税率': row['印花税率'],
-                '过户费率': row['过户费率'],
-                '最低手续费': row['最低手续费'],
-                '平台使用费': row['平台使用费'],
-                '结算费': row['结算费'],
-                '汇率费': row['汇率费'],
-                '监管费': row['监管费']
-            }
+        """处理费率配置，整理为按生效日期排序的分时段费率表"""
+        self.fee_schedule = normalize_fee_schedule(self.rates_df)
+        periods = self.fee_schedule.groupby(RULE_KEYS).size()
+        if (periods > 1).any():
+            logger.info(f"费率配置包含 {int((periods > 1).sum())} 个分时段费率组合")
     
     def _process_securities_info(self):
         """处理证券信息，如果没有提供则自动生成"""
@@ -245,6 +393,9 @@ class TradingProcessor:
     def update_securities_info_file(self, input_file, securities_sheet='证券信息'):
         """将去重后的证券信息重新写入原文件
         
+        工作表已存在时只替换该工作表的XML部件，其他工作表原样保留；
+        不存在时读取并重写整个工作簿以添加该工作表。
+        
         Args:
             input_file: 输入Excel文件路径
             securities_sheet: 证券信息工作表名称
@@ -253,7 +404,13 @@ class TradingProcessor:
             logger.warning("没有证券信息数据可写入")
             return False
         
+        from utils.xlsx_patch import replace_sheet_data
+        
         try:
+            if replace_sheet_data(input_file, securities_sheet, self.securities_df):
+                logger.info(f"已将去重后的证券信息写入文件: {input_file}")
+                return True
+            
             # 读取原文件的所有工作表
             with pd.ExcelFile(input_file) as xls:
                 sheet_names = xls.sheet_names
@@ -484,83 +641,75 @@ class TradingProcessor:
         else:
             return '股票'  # 默认为股票
     
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
     def calculate_fees(self):
         """计算交易费用"""
         if self.trades_df is None:
             logger.error("请先加载交易数据")
             return False
         
-        # 计算交易金额
-        self.trades_df['交易金额'] = self.trades_df['成交价格'] * self.trades_df['成交数量']
+        # 计算交易金额，定点模式下取整到分
+        amount = self.trades_df['成交价格'] * self.trades_df['成交数量']
+        if self.fixed_point:
+            amount = pd.Series(from_fixed(to_fixed(amount)), index=amount.index)
+        self.trades_df['交易金额'] = amount
+        
+        # 按成交日生效的费率一次计算全部费用，配股认购不收取交易费用
+        fees, missing = compute_trade_fees(self.trades_df, self.fee_schedule,
+                                           exempt=self.trades_df['买卖方向'] == RIGHTS_SIDE,
+                                           fixed_point=self.fixed_point)
+        for broker, market, product_type, count in missing:
+            logger.warning(f"未找到券商 {broker} 市场 {market} 产品类型 {product_type} 在成交日生效的费率设置，"
+                           f"{count} 笔交易使用默认费率")
+        self.trades_df[FEE_COLUMNS] = fees
+        
+        # 有汇率表时把交易金额和费用按成交日汇率折算为本币
+        if self.rate_surface is not None:
+            markets = self.trades_df['市场'] if '市场' in self.trades_df.columns else pd.Series('', index=self.trades_df.index)
+            self.trades_df = self._to_base_currency(self.trades_df, market_currency(markets), ['交易金额', '总费用'])
+        
+        self.data_version += 1
+        logger.info("交易费用计算完成")
+        return True
+    
+    def _to_base_currency(self, df, currencies, columns):
+        """按日期和币种从汇率曲面取汇率，追加 币种、汇率 和本币金额列
         
-        # 初始化费用列
-        fee_columns = ['手续费', '规费', '印花税', '过户费', '平台使用费', '结算费', '汇率费', '监管费', '总费用']
-        for col in fee_columns:
-            self.trades_df[col] = 0.0
+        Args:
+            df: 需包含 日期 列的数据
+            currencies: 与 df 等长的币种数组
+            columns: 需要折算的金额列
         
-        # 计算每笔交易的费用
-        for idx, trade in self.trades_df.iterrows():
-            # 安全获取字段值，如果不存在则使用默认值
-            broker = trade.get('券商', '默认券商')
-            market = trade.get('市场', '默认市场')
-            product_type = trade.get('产品类型', '股票')
-            amount = trade['交易金额']
-            is_sell = trade['买卖方向'] in ['卖出', '卖', 'SELL', 'S']
-            
-            # 获取费率设置
-            if (broker in self.fee_rates and 
-                market in self.fee_rates[broker] and 
-                product_type in self.fee_rates[broker][market]):
-                rates = self.fee_rates[broker][market][product_type]
-            else:
-                logger.warning(f"未找到券商 {broker} 市场 {market} 产品类型 {product_type} 的费率设置，使用默认费率")
-                rates = {
-                    '手续费率': 0.0003,
-                    '规费率': 0,
-                    '印花税率': 0.001 if product_type == '股票' else 0,
-                    '过户费率': 0.00002 if product_type == '股票' else 0,
-                    '最低手续费': 5,
-                    '平台使用费': 0,
-                    '结算费': 0,
-                    '汇率费': 0,
-                    '监管费': 0
-                }
-            
-            # 计算各项费用
-            if broker == '国泰君安':            # 这里的逻辑是根据君安app测算出来的
-                commission = amount * rates['手续费率']
-                gui_fee = amount * rates['规费率']
-
-                # 如果低于最低手续费，那么手续费+规费是5（君安的规则）
-                if commission < rates['最低手续费']:
-                    commission = rates['最低手续费'] - gui_fee
-            else:
-                commission = max(amount * rates['手续费率'], rates['最低手续费'])
-                gui_fee = amount * rates['规费率']
-            
-            stamp_tax = amount * rates['印花税率'] if is_sell else 0
-            transfer_fee = amount * rates['过户费率']
-            platform_fee = rates['平台使用费']
-            settlement_fee = amount * rates['结算费']
-            fx_fee = amount * rates['汇率费'] if market in ['港交所', '美股'] else 0
-            regulatory_fee = amount * rates['监管费']
-            
-            total_fee = commission + stamp_tax + transfer_fee + platform_fee + settlement_fee + fx_fee + regulatory_fee+gui_fee
-            
-            # 更新交易记录中的费用，保留2位小数
-            self.trades_df.at[idx, '手续费'] = round(commission, 2)
-            self.trades_df.at[idx, '规费'] = round(gui_fee, 2)
-            self.trades_df.at[idx, '印花税'] = round(stamp_tax, 2)
-            self.trades_df.at[idx, '过户费'] = round(transfer_fee, 2)
-            self.trades_df.at[idx, '平台使用费'] = round(platform_fee, 2)
-            self.trades_df.at[idx, '结算费'] = round(settlement_fee, 2)
-            self.trades_df.at[idx, '汇率费'] = round(fx_fee, 2)
-            self.trades_df.at[idx, '监管费'] = round(regulatory_fee, 2)
-            self.trades_df.at[idx, '总费用'] = round(total_fee, 2)
+        Returns:
+            DataFrame: 追加列后的数据
+        """
+        missing = self.rate_surface.missing(currencies)
+        if missing:
+            logger.warning(f"缺少币种 {missing} 的汇率，对应的本币金额为空")
+        rates = self.rate_surface.lookup(df['日期'], currencies)
+        return convert_columns(df.assign(币种=currencies, 汇率=rates), rates, columns)
+    
+    def _symbol_markets(self):
+        """各证券的市场，按交易数据中最后一笔交易的市场确定
         
-        logger.info("交易费用计算完成")
-        return True
+        Returns:
+            dict: {证券代码: 市场}
+        """
+        if '市场' not in self.trades_df.columns:
+            return {}
+        latest = self.trades_df.drop_duplicates('证券代码', keep='last')
+        return dict(zip(latest['证券代码'], latest['市场']))
     
+    def _symbol_currencies(self):
+        """各证券的计价币种，按交易数据中最后一笔交易的市场确定
+        
+        Returns:
+            dict: {证券代码: 币种}
+        """
+        markets = self._symbol_markets()
+        return dict(zip(markets, market_currency(list(markets.values()))))
+    
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
     def update_positions(self):
         """根据交易记录更新持仓情况"""
         if self.trades_df is None:
@@ -624,7 +773,8 @@ class TradingProcessor:
         
         logger.info(f"持仓更新完成，共 {len(self.positions)} 只证券")
         return True
-
+    
+    @timed_stage(rows=lambda self, result: frame_rows(result))
     def get_current_positions(self):
         """获取当前持仓数据 - 每支股票的最新持仓汇总"""
         if self.daily_pnl is None or self.daily_pnl.empty:
@@ -710,13 +860,13 @@ class TradingProcessor:
                 
                 # 买入统计
                 total_buy_volume = buy_trades['成交数量'].sum()
-                total_buy_amount = (buy_trades['成交价格'] * buy_trades['成交数量']).sum()
+                total_buy_amount = buy_trades['交易金额'].sum()
                 avg_buy_price = total_buy_amount / total_buy_volume if total_buy_volume > 0 else 0
                 total_buy_fees = buy_trades['总费用'].sum()
                 
                 # 卖出统计
                 total_sell_volume = sell_trades['成交数量'].sum()
-                total_sell_amount = (sell_trades['成交价格'] * sell_trades['成交数量']).sum()
+                total_sell_amount = sell_trades['交易金额'].sum()
                 avg_sell_price = total_sell_amount / total_sell_volume if total_sell_volume > 0 else 0
                 total_sell_fees = sell_trades['总费用'].sum()
                 
@@ -731,7 +881,7 @@ class TradingProcessor:
                     last_trade_date = None
                     holding_days = 0
                 
-                positions_data.append({
+                position = {
                     '证券代码': latest_record['证券代码'],
                     '证券名称': latest_record['证券名称'],
                     '交易所': latest_record['交易所'],
@@ -752,7 +902,19 @@ class TradingProcessor:
                     '首次交易日期': first_trade_date.strftime('%Y-%m-%d') if first_trade_date else '',
                     '最后交易日期': last_trade_date.strftime('%Y-%m-%d') if last_trade_date else '',
                     '持有天数': holding_days
-                })
+                }
+                if base_column('总盈亏') in latest_record:
+                    # 本币金额，已实现盈亏为逐日折算后的累计值
+                    position.update({
+                        '币种': latest_record['币种'],
+                        base_column('持仓市值'): latest_record[base_column('持仓市值')],
+                        base_column('持仓成本总额'): latest_record[base_column('持仓成本总额')],
+                        base_column('已实现盈亏'): latest_record[base_column('累计已实现盈亏')],
+                        base_column('未实现盈亏'): latest_record[base_column('当日未实现盈亏')],
+                        base_column('总盈亏'): latest_record[base_column('总盈亏')],
+                        base_column('总手续费'): round(symbol_trades[base_column('总费用')].sum(), 2)
+                    })
+                positions_data.append(position)
         
         # 按总盈亏从大到小排序
         positions_df = pd.DataFrame(positions_data)
@@ -762,6 +924,192 @@ class TradingProcessor:
         logger.info(f"当前持仓数据生成完成，共 {len(positions_df)} 只股票")
         return positions_df
     
+    def get_dividend_records(self):
+        """获取分红记录，按日期倒序排列
+        
+        Returns:
+            DataFrame: 分红记录
+        """
+        if self.dividend_df is None or self.dividend_df.empty:
+            return pd.DataFrame()
+        
+        return self.dividend_df.sort_values('日期', ascending=False).reset_index(drop=True)
+    
+    @timed_stage(rows=lambda self, result: frame_rows(self.dividend_df))
+    def get_dividend_summary(self):
+        """获取分红汇总信息
+        
+        Returns:
+            dict: 包含总记录数、总分红金额、总税费和净分红金额的字典
+        """
+        summary = {'总记录数': 0, '总分红金额': 0, '总税费': 0, '净分红金额': 0}
+        if self.dividend_df is None or self.dividend_df.empty:
+            return summary
+        
+        summary['总记录数'] = len(self.dividend_df)
+        if '总分红金额' in self.dividend_df.columns:
+            summary['总分红金额'] = round(float(self.dividend_df['总分红金额'].sum()), 2)
+        if '税费' in self.dividend_df.columns:
+            summary['总税费'] = round(float(self.dividend_df['税费'].sum()), 2)
+        if '净分红金额' in self.dividend_df.columns:
+            summary['净分红金额'] = round(float(self.dividend_df['净分红金额'].sum()), 2)
+        
+        return summary
+    
+    @timed_stage(rows=lambda self, result: frame_rows(self.dividend_schedule))
+    def calculate_dividends(self):
+        """按分红计划计算分红权益
+        
+        持有数量为空的分红记录按除息日前一个交易日收盘后的持仓计算持有数量和分红金额，
+        结果保存到 dividend_df，净分红金额在盈亏计算中冲减持仓成本。
+        
+        Returns:
+            bool: 是否成功计算
+        """
+        try:
+            if self.dividend_schedule is None or self.dividend_schedule.empty:
+                self.dividend_df = empty_dividends()
+                return True
+            
+            # 除息日前的持仓只取决于交易，按交易单独递推一次
+            _, positions = compute_cost_basis(self.trades_df)
+            self.dividend_df = compute_dividend_entitlements(self.dividend_schedule, positions)
+            logger.info(f"分红权益计算完成，共 {len(self.dividend_df)} 条分红记录")
+            return True
+        except Exception as e:
+            logger.error(f"计算分红权益失败: {e}")
+            return False
+    
+    def add_dividend_record(self, date, symbol, name, shares, dividend_per_share, tax=0, remark=''):
+        """添加一条分红记录并重新计算分红权益和每日盈亏
+        
+        Args:
+            date: 除息日
+            symbol: 证券代码
+            name: 证券名称，为空时按持仓补全
+            shares: 持有数量，为0时按除息日前的持仓计算
+            dividend_per_share: 每股分红
+            tax: 税费金额
+            remark: 备注
+        
+        Returns:
+            bool: 是否添加成功
+        """
+        if self.trades_df is None:
+            logger.error("请先加载交易数据")
+            return False
+        
+        try:
+            record = {
+                '日期': pd.Timestamp(date),
+                '证券代码': str(symbol).strip(),
+                '证券名称': name or np.nan,
+                '持有数量': shares if shares else np.nan,
+                '每股分红': float(dividend_per_share),
+                '税费': float(tax) if tax else np.nan
+            }
+            if remark:
+                record['备注'] = remark
+            
+            schedule = self.dividend_schedule if self.dividend_schedule is not None else empty_dividends()
+            self.dividend_schedule = pd.concat(
+                [schedule, pd.DataFrame([record])], ignore_index=True
+            ).sort_values(['日期', '证券代码'], kind='stable').reset_index(drop=True)
+            
+            if not self.calculate_dividends():
+                return False
+            if self.daily_pnl is not None and not self.calculate_daily_pnl():
+                return False
+            self.data_version += 1
+            
+            logger.info(f"已添加 {record['证券代码']} 在 {record['日期'].date()} 的分红记录")
+            return True
+        except Exception as e:
+            logger.error(f"添加分红记录失败: {e}")
+            return False
+    
+    # 支持按日期索引的数据: {数据名称: 属性名}
+    DATE_INDEXED_FRAMES = {
+        'trades': 'trades_df',
+        'daily_pnl': 'daily_pnl',
+        'dividends': 'dividend_df'
+    }
+    
+    def _get_date_index(self, name):
+        """获取按日期排序的数据和对应的日期数组，数据版本变化或数据被替换后重新构建
+        
+        已按日期排序的数据直接使用，不复制；否则按日期稳定排序一次。
+        
+        Args:
+            name: 数据名称，见 DATE_INDEXED_FRAMES
+        
+        Returns:
+            tuple: (按日期排序的数据, datetime64[D]日期数组)，数据为空时返回 (None, None)
+        """
+        source = getattr(self, self.DATE_INDEXED_FRAMES[name])
+        cached = self._date_indexes.get(name)
+        if cached is not None and cached[0] == self.data_version and cached[1] is source:
+            return cached[2], cached[3]
+        
+        df = source
+        if df is None or df.empty or '日期' not in df.columns:
+            return None, None
+        
+        days = pd.to_datetime(df['日期']).to_numpy().astype('datetime64[D]')
+        if len(days) > 1 and (days[1:] < days[:-1]).any():
+            order = np.argsort(days, kind='stable')
+            df = df.iloc[order]
+            days = days[order]
+        
+        self._date_indexes[name] = (self.data_version, source, df, days)
+        return df, days
+    
+    def get_records_between(self, name, start_date, end_date):
+        """获取日期范围内的记录，二分查找行范围后返回切片，不扫描整列
+        
+        Args:
+            name: 数据名称，'trades'、'daily_pnl' 或 'dividends'
+            start_date: 开始日期（包含）
+            end_date: 结束日期（包含）
+        
+        Returns:
+            DataFrame: 日期范围内的记录
+        """
+        df, days = self._get_date_index(name)
+        if df is None:
+            return pd.DataFrame()
+        
+        start = np.searchsorted(days, np.datetime64(pd.Timestamp(start_date).date(), 'D'), side='left')
+        end = np.searchsorted(days, np.datetime64(pd.Timestamp(end_date).date(), 'D'), side='right')
+        return df.iloc[start:end]
+    
+    def get_records_by_date(self, name, date):
+        """获取某一天的记录
+        
+        Args:
+            name: 数据名称，'trades'、'daily_pnl' 或 'dividends'
+            date: 日期
+        
+        Returns:
+            DataFrame: 当天的记录
+        """
+        return self.get_records_between(name, date, date)
+    
+    def get_record_dates(self, name):
+        """获取有记录的日期
+        
+        Args:
+            name: 数据名称，'trades'、'daily_pnl' 或 'dividends'
+        
+        Returns:
+            list: 升序排列的datetime.date列表
+        """
+        _, days = self._get_date_index(name)
+        if days is None:
+            return []
+        return np.unique(days).astype(object).tolist()
+    
+    @timed_stage(rows=lambda self, result: frame_rows(result))
     def get_stock_historical_pnl(self):
         """
         获取每支股票的历史盈亏数据，按盈亏额从大到小排列
@@ -784,7 +1132,7 @@ class TradingProcessor:
                 self.daily_pnl = pd.DataFrame(pnl_data)
                 
                 # 按日期和证券代码排序
-                self.daily_pnl = self.daily_pnl.sort_values(['日期', '证券代码'])
+                self.daily_pnl = self._convert_pnl(self.daily_pnl.sort_values(['日期', '证券代码']))
             
             # 如果每日盈亏数据为空，返回空DataFrame
             if self.daily_pnl.empty:
@@ -811,13 +1159,13 @@ class TradingProcessor:
                 
                 # 买入统计
                 total_buy_volume = buy_trades['成交数量'].sum()
-                total_buy_amount = (buy_trades['成交价格'] * buy_trades['成交数量']).sum()
+                total_buy_amount = buy_trades['交易金额'].sum()
                 avg_buy_price = total_buy_amount / total_buy_volume if total_buy_volume > 0 else 0
                 total_buy_fees = buy_trades['总费用'].sum()
                 
                 # 卖出统计
                 total_sell_volume = sell_trades['成交数量'].sum()
-                total_sell_amount = (sell_trades['成交价格'] * sell_trades['成交数量']).sum()
+                total_sell_amount = sell_trades['交易金额'].sum()
                 avg_sell_price = total_sell_amount / total_sell_volume if total_sell_volume > 0 else 0
                 total_sell_fees = sell_trades['总费用'].sum()
                 
@@ -846,7 +1194,7 @@ class TradingProcessor:
                     holding_days = 0
                     
                 # 添加到股票历史盈亏数据
-                stock_pnl_data.append({
+                stock_pnl = {
                     '证券代码': symbol,
                     '证券名称': latest_record['证券名称'],
                     '交易所': latest_record['交易所'],
@@ -871,8 +1219,18 @@ class TradingProcessor:
                     '首次交易日期': first_trade_date.strftime('%Y-%m-%d') if first_trade_date else '',
                     '最后交易日期': last_trade_date.strftime('%Y-%m-%d') if last_trade_date else '',
                     '持有天数': holding_days
-                })
-        
+                }
+                if base_column('总盈亏') in latest_record:
+                    stock_pnl.update({
+                        '币种': latest_record['币种'],
+                        base_column('当前市值'): latest_record[base_column('持仓市值')],
+                        base_column('已实现盈亏'): latest_record[base_column('累计已实现盈亏')],
+                        base_column('未实现盈亏'): latest_record[base_column('当日未实现盈亏')],
+                        base_column('总盈亏'): latest_record[base_column('总盈亏')],
+                        base_column('总手续费'): round(symbol_trades[base_column('总费用')].sum(), 2)
+                    })
+                stock_pnl_data.append(stock_pnl)
+            
             # 转换为DataFrame并按总盈亏从大到小排序
             stock_pnl_df = pd.DataFrame(stock_pnl_data)
             if not stock_pnl_df.empty:
@@ -884,15 +1242,260 @@ class TradingProcessor:
             logger.error(f"生成股票历史盈亏数据失败: {e}")
             return pd.DataFrame()
     
-    def calculate_pnl_core(self):
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
+    def get_round_trips(self):
+        """
+        获取回合交易明细，按先进先出把买入和卖出配对，每个回合包含买入日期、卖出日期、
+        持有天数、盈亏、收益率和费用
+        
+        Returns:
+            DataFrame: 回合交易明细，按卖出日期排序
+        """
+        if self.trades_df is None or self.trades_df.empty or '总费用' not in self.trades_df.columns:
+            return pd.DataFrame(columns=TRIP_COLUMNS)
+        
+        try:
+            trips = match_round_trips(self.trades_df)
+            logger.info(f"回合交易配对完成，共 {len(trips)} 个回合")
+            return trips
+        except Exception as e:
+            logger.error(f"回合交易配对失败: {e}")
+            return pd.DataFrame(columns=TRIP_COLUMNS)
+    
+    @timed_stage(rows=lambda self, result: frame_rows(result[0]))
+    def get_round_trip_summary(self, trips=None):
+        """
+        获取回合交易统计：每个证券以及全部回合的胜率、平均盈亏、盈亏比和持有天数，以及持有期分布
+        
+        Args:
+            trips: 回合交易明细，默认重新配对
+        
+        Returns:
+            tuple: (summary_df, distribution_df)
+            - summary_df: 按证券汇总的回合统计，最后一行为合计
+            - distribution_df: 各持有期分组的回合数、胜率和收益
+        """
+        if trips is None:
+            trips = self.get_round_trips()
+        return summarize_round_trips(trips), holding_distribution(trips)
+    
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
+    def get_broker_fee_simulation(self, brokers=None):
+        """
+        假设全部交易都在同一个券商成交，按费率配置中每个券商在成交日生效的费率重新计算费用，
+        按券商和月份汇总
+        
+        Args:
+            brokers: 参与比较的券商列表，默认为费率配置中的全部券商
+        
+        Returns:
+            DataFrame: 每个券商每个月的交易笔数、成交金额、各项费用和使用默认费率的交易笔数；
+            有汇率表时金额按成交日汇率折算为本币
+        """
+        if self.trades_df is None or self.trades_df.empty or self.fee_schedule is None:
+            return pd.DataFrame(columns=SIMULATION_COLUMNS)
+        
+        try:
+            trades = self.trades_df
+            if '交易金额' not in trades.columns:
+                trades = trades.assign(交易金额=trades['成交价格'] * trades['成交数量'])
+            
+            fx_rates = None
+            if self.rate_surface is not None:
+                markets = trades['市场'] if '市场' in trades.columns else pd.Series('', index=trades.index)
+                currencies = market_currency(markets)
+                missing = self.rate_surface.missing(currencies)
+                if missing:
+                    logger.warning(f"缺少币种 {missing} 的汇率，对应的交易不计入券商费用模拟")
+                fx_rates = self.rate_surface.lookup(trades['日期'], currencies)
+            
+            simulation = simulate_broker_fees(trades, self.fee_schedule, brokers,
+                                              exempt=trades['买卖方向'] == RIGHTS_SIDE, fx_rates=fx_rates,
+                                              fixed_point=self.fixed_point)
+            logger.info(f"券商费用模拟完成: {len(trades)} 笔交易 × {simulation['券商'].nunique()} 个券商")
+            return simulation
+        except Exception as e:
+            logger.error(f"券商费用模拟失败: {e}")
+            return pd.DataFrame(columns=SIMULATION_COLUMNS)
+    
+    def get_broker_fee_comparison(self, simulation=None):
+        """
+        获取各券商全部交易的费用合计，按总费用从低到高排列，并给出与实际费用的差额
+        
+        Args:
+            simulation: 券商费用模拟结果，默认重新模拟
+        
+        Returns:
+            DataFrame: 各券商的交易笔数、成交金额、各项费用、费用率和与实际差额
+        """
+        if simulation is None:
+            simulation = self.get_broker_fee_simulation()
+        
+        actual_fee = None
+        if self.trades_df is not None and '总费用' in self.trades_df.columns:
+            actual_fee = self.trades_df[money_column(self.trades_df, '总费用')].sum()
+        return summarize_broker_fees(simulation, actual_fee)
+    
+    def _pnl_axis(self, data_dates, daily_state, start_after=None):
+        """每个证券的盈亏日期轴
+        
+        有交易日历的市场取该证券第一笔交易之后、数据最后日期之前的交易日；没有交易日历的市场
+        沿用全部交易和价格日期。有成交或分红的日期即使落在休市日也总会计入。
+        收盘价落在休市日时不参与估值，按市场记录警告，便于检查休市日表或价格数据。
+        
+        Args:
+            data_dates: 全部交易和价格日期的有序列表
+            daily_state: compute_cost_basis 得到的每日收盘状态
+            start_after: 增量计算时只保留该日期之后的日期
+        
+        Returns:
+            dict: {证券代码: 升序的日期列表（datetime.date）}
+        """
+        if not data_dates:
+            return {}
+        
+        data_days = np.array(data_dates, dtype='datetime64[D]')
+        first_trade = self.trades_df.groupby('证券代码')['日期'].min()
+        events = {
+            symbol: dates.to_numpy(dtype='datetime64[D]')
+            for symbol, dates in pd.to_datetime(daily_state['日期']).groupby(daily_state['证券代码'])
+        }
+        markets = self._symbol_markets()
+        prices = self.prices_df[self.prices_df['收盘价'] > 0]
+        closes = {
+            symbol: dates.to_numpy(dtype='datetime64[D]')
+            for symbol, dates in prices['日期'].groupby(prices['证券代码'])
+        }
+        
+        axis = {}
+        skipped = {}
+        for symbol in first_trade.index:
+            start = np.datetime64(first_trade[symbol].date(), 'D')
+            market = markets.get(symbol)
+            if self.trading_calendar.has_calendar(market):
+                days = self.trading_calendar.sessions(market, data_days[0], data_days[-1])
+            else:
+                days = data_days
+            days = np.union1d(days[days >= start], events.get(symbol, np.array([], dtype='datetime64[D]')))
+            if start_after is not None:
+                days = days[days > np.datetime64(start_after, 'D')]
+            axis[symbol] = days.astype(object).tolist()
+            
+            # 持仓期间落在休市日的收盘价
+            if self.trading_calendar.has_calendar(market) and symbol in closes:
+                close_days = closes[symbol]
+                close_days = close_days[close_days >= start]
+                if start_after is not None:
+                    close_days = close_days[close_days > np.datetime64(start_after, 'D')]
+                close_days = close_days[~np.isin(close_days, days)]
+                if len(close_days):
+                    skipped.setdefault(market, []).append(close_days)
+        
+        for market, close_days in skipped.items():
+            close_days = np.concatenate(close_days)
+            examples = ', '.join(str(day) for day in np.unique(close_days)[:3])
+            logger.warning(f"市场 {market} 有 {len(close_days)} 条收盘价位于交易日历的休市日（如 {examples}），"
+                           f"未用于计算每日盈亏；如这些日期实际开市，请检查休市日表或价格数据")
+        return axis
+    
+    def _axis_closes(self, axis):
+        """日期轴上每天用于计算市值的价格
+        
+        当天有收盘价时使用收盘价，否则使用当天最后一笔成交价；都没有时沿用之前最近一天的价格，
+        价格缺失的交易日不会按0计算市值。通过按证券分组的 merge_asof 一次匹配，不逐日查找。
+        
+        Args:
+            axis: _pnl_axis 的结果
+        
+        Returns:
+            dict: {证券代码: 与日期轴等长的价格数组}，之前没有任何价格时为0
+        """
+        prices = self.prices_df[self.prices_df['收盘价'] > 0]
+        trades = self.trades_df
+        marks = pd.concat([
+            pd.DataFrame({'日期': prices['日期'].dt.normalize(), '证券代码': prices['证券代码'],
+                          '价格': prices['收盘价'].astype(float)}),
+            trades.groupby(['证券代码', trades['日期'].dt.normalize()], sort=False)['成交价格'].last()
+                  .astype(float).rename('价格').reset_index()
+        ], ignore_index=True).drop_duplicates(['证券代码', '日期'], keep='first')
+        marks['日期'] = marks['日期'].astype('datetime64[ns]')
+        
+        symbols = list(axis)
+        lengths = [len(axis[symbol]) for symbol in symbols]
+        left = pd.DataFrame({
+            '日期': pd.to_datetime([date for symbol in symbols for date in axis[symbol]]).astype('datetime64[ns]'),
+            '证券代码': np.repeat(np.array(symbols, dtype=object), lengths),
+            '_行': np.arange(sum(lengths))
+        }).sort_values('日期', kind='stable')
+        matched = pd.merge_asof(left, marks.sort_values('日期', kind='stable'), on='日期', by='证券代码',
+                                direction='backward')
+        
+        values = np.zeros(len(left))
+        values[matched['_行'].to_numpy()] = matched['价格'].fillna(0.0).to_numpy()
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        return {symbol: values[offsets[i]:offsets[i + 1]] for i, symbol in enumerate(symbols)}
+    
+    # 本币持仓状态在持仓记录中的字段
+    BASE_STATE_FIELDS = ('持仓成本', '持仓成本总额', '累计已实现盈亏')
+    
+    def _base_cost_basis(self, trades, dividends, initial_positions=None):
+        """按本币金额再做一次摊薄成本递推
+        
+        每笔成交价格和费用按成交当天的汇率、分红按除息日的汇率折算为本币，持仓成本总额因此是买入时的历史本币成本，
+        已实现盈亏 = 卖出当天汇率下的本币收入 - 历史本币成本。没有汇率表时不计算。
+        
+        Args:
+            trades: 参与递推的交易数据
+            dividends: 分红现金事件
+            initial_positions: 增量计算时的初始持仓，本币状态取自其中的 '持仓成本(本币)' 等字段
+        
+        Returns:
+            dict: {(证券代码, 日期): 本币收盘状态}，没有汇率表时为空
+        """
+        if self.rate_surface is None:
+            return {}
+        
+        currencies = self._symbol_currencies()
+        base_currency = self.rate_surface.base_currency
+        rates = self.rate_surface.lookup(trades['日期'], trades['证券代码'].map(currencies).fillna(base_currency))
+        trades = trades.assign(
+            成交价格=trades['成交价格'].to_numpy(dtype=np.float64) * rates,
+            总费用=trades['总费用'].to_numpy(dtype=np.float64) * rates
+        )
+        if dividends is not None and not dividends.empty:
+            dividend_rates = self.rate_surface.lookup(
+                dividends['日期'], dividends['证券代码'].map(currencies).fillna(base_currency)
+            )
+            dividends = dividends.assign(净分红金额=dividends['净分红金额'].to_numpy(dtype=np.float64) * dividend_rates)
+        
+        base_positions = None
+        if initial_positions:
+            base_positions = {
+                symbol: {
+                    '持仓数量': position['持仓数量'],
+                    **{field: position.get(base_column(field), 0) for field in self.BASE_STATE_FIELDS}
+                }
+                for symbol, position in initial_positions.items()
+            }
+        _, daily_state = compute_cost_basis(trades, base_positions, dividends)
+        return {(state['证券代码'], state['日期']): state for state in daily_state.to_dict('records')}
+    
+    @timed_stage(rows=lambda self, result: len(result[1]) if result and result[1] is not None else None)
+    def calculate_pnl_core(self, start_after=None, initial_positions=None):
         """
         核心盈亏计算方法，使用统一的摊薄成本法
         
         计算方法：
-        1. 按日期和证券代码处理交易
-        2. 使用摊薄成本法计算每日已实现盈亏和未实现盈亏
+        1. 每个证券按所属市场的交易日历逐日处理交易，有成交或分红的日期总会计入；
+           当天没有收盘价时沿用之前最近的价格
+        2. 使用摊薄成本法计算每日已实现盈亏和未实现盈亏，同时按先进先出、后进先出方法计算当日已实现盈亏；
+           除息日的净分红冲减持仓成本，无持仓时计入已实现盈亏
         3. 记录每日持仓和盈亏数据
         
+        Args:
+            start_after: 增量计算时只计算该日期之后的日期
+            initial_positions: 增量计算时 start_after 当天结束时的持仓 {证券代码: 持仓}
+        
         Returns:
             tuple: (daily_positions, daily_pnl_data, all_dates)
             - daily_positions: 每个证券每天的持仓情况 {证券代码: {日期: {'持仓数量': 数量, '持仓成本': 成本价, ...}}}
@@ -906,7 +1509,10 @@ class TradingProcessor:
         # 获取所有交易日期和价格日期
         trade_dates = set(self.trades_df['日期'].dt.date)
         price_dates = set(self.prices_df['日期'].dt.date)
-        all_dates = sorted(trade_dates.union(price_dates))
+        data_dates = sorted(trade_dates.union(price_dates))
+        all_dates = data_dates
+        if start_after is not None:
+            all_dates = [date for date in all_dates if date > start_after]
         
         # 创建每日盈亏数据列表
         pnl_data = []
@@ -915,131 +1521,93 @@ class TradingProcessor:
         # 格式: {证券代码: {日期: {'持仓数量': 数量, '持仓成本': 成本价, '持仓成本总额': 成本总额, ...}}}
         daily_positions = {}
         
-        # 记录已实现盈亏
-        # 格式: {证券代码: {日期: 已实现盈亏}}
-        realized_pnl = {}
-        
-        # 初始化字典
-        for symbol in set(self.trades_df['证券代码']):
+        # 逐笔交易和分红的摊薄成本递推在数组上一次完成，得到每个证券每个交易日收盘后的状态
+        trades = self.trades_df
+        if start_after is not None:
+            trades = trades[trades['日期'].dt.date > start_after]
+        dividends = dividend_cash_events(self.dividend_df, start_after)
+        with self.run_report.stage('cost_basis') as record:
+            _, daily_state = compute_cost_basis(trades, initial_positions, dividends)
+            record['rows'] = len(trades)
+        day_states = {
+            (state['证券代码'], state['日期']): state for state in daily_state.to_dict('records')
+        }
+        
+        # 有汇率表时另按本币金额递推，得到历史本币成本和本币已实现盈亏
+        with self.run_report.stage('base_cost_basis') as record:
+            base_day_states = self._base_cost_basis(trades, dividends, initial_positions)
+            record['rows'] = len(trades) if base_day_states else 0
+        base_fields = [base_column(field) for field in self.BASE_STATE_FIELDS] if self.rate_surface is not None else []
+        
+        # 先进先出、后进先出的已实现盈亏，批次状态依赖全部历史交易，始终按完整交易数据计算
+        with self.run_report.stage('lot_costs') as record:
+            lot_pnl = compute_lot_pnl(self.trades_df)
+            record['rows'] = len(self.trades_df)
+        lot_day_pnl = {
+            (row['证券代码'], row['日期']): row for row in lot_pnl.to_dict('records')
+        }
+        
+        # 每个证券只遍历所属市场的交易日，收盘价沿日期轴向前填充
+        with self.run_report.stage('session_axis') as record:
+            axis = self._pnl_axis(data_dates, daily_state, start_after)
+            closes = self._axis_closes(axis)
+            record['rows'] = sum(len(days) for days in axis.values())
+        
+        # 按证券逐个交易日处理，更新持仓
+        for symbol, days in axis.items():
             daily_positions[symbol] = {}
-            realized_pnl[symbol] = {}
-            for date in all_dates:
-                realized_pnl[symbol][date] = 0
-        
-        # 按日期处理交易，更新持仓
-        for date in all_dates:
-            # 获取当日所有交易
-            day_trades = self.trades_df[self.trades_df['日期'].dt.date == date]
-            
-            # 处理每个证券
-            for symbol in set(self.trades_df['证券代码']):
-                # 获取前一天的持仓情况
-                prev_dates = [d for d in daily_positions[symbol].keys() if d < date]
-                if prev_dates:
-                    prev_date = max(prev_dates)
-                    prev_position = daily_positions[symbol][prev_date].copy()
-                else:
-                    # 如果没有前一天的持仓记录，初始化为0
-                    prev_position = {
-                        '持仓数量': 0,
-                        '持仓成本': 0,
-                        '持仓成本总额': 0,
-                        '证券名称': '',
-                        '市场': '',
-                        '产品类型': '',
-                        '累计已实现盈亏': 0  # 添加累计已实现盈亏字段
-                    }
-                
-                # 初始化当日持仓为前一天的持仓
-                current_position = prev_position.copy()
+            if initial_positions and symbol in initial_positions:
+                position = initial_positions[symbol].copy()
+                daily_positions[symbol][start_after] = position
+            else:
+                # 没有之前的持仓记录时初始化为0
+                position = {
+                    '持仓数量': 0,
+                    '持仓成本': 0,
+                    '持仓成本总额': 0,
+                    '证券名称': '',
+                    '市场': '',
+                    '产品类型': '',
+                    '累计已实现盈亏': 0,  # 添加累计已实现盈亏字段
+                    **dict.fromkeys(base_fields, 0)
+                }
+            security_info = self.get_security_info(symbol)
+            
+            for date, close_price in zip(days, closes[symbol]):
+                # 初始化当日持仓为前一个交易日的持仓
+                current_position = position.copy()
                 
                 # 当日已实现盈亏
                 day_realized_pnl = 0
                 
-                # 处理当日该证券的所有交易
-                symbol_trades = day_trades[day_trades['证券代码'] == symbol]
-                for _, trade in symbol_trades.iterrows():
-                    price = trade['成交价格']
-                    quantity = trade['成交数量']
-                    is_buy = trade['买卖方向'] not in ['卖出', '卖', 'SELL', 'S']
-                    fees = trade['总费用']
-                    
-                    # 更新证券基本信息
-                    current_position['证券名称'] = trade['证券名称']
-                    current_position['市场'] = trade.get('市场', '默认市场')
-                    current_position['产品类型'] = trade.get('产品类型', '股票')
-                    
-                    if is_buy:
-                        # 买入，增加持仓
-                        old_qty = current_position['持仓数量']
-                        old_cost_total = current_position['持仓成本总额']
-                        
-                        # 新增成本 = 买入金额 + 手续费
-                        new_cost_total = price * quantity + fees
-                        
-                        # 更新持仓数量和成本总额
-                        current_position['持仓数量'] = old_qty + quantity
-                        current_position['持仓成本总额'] = old_cost_total + new_cost_total
-                        
-                        # 更新平均成本价
-                        if current_position['持仓数量'] > 0:
-                            current_position['持仓成本'] = current_position['持仓成本总额'] / current_position['持仓数量']
-                        else:
-                            current_position['持仓成本'] = 0
-                    else:
-                        # 卖出，减少持仓并计算已实现盈亏
-                        old_qty = current_position['持仓数量']
-                        old_cost_total = current_position['持仓成本总额']
-                        old_cost_price = current_position['持仓成本']
-                        
-                        if old_qty > 0:
-                            # 计算卖出部分的成本
-                            sell_cost_ratio = min(quantity / old_qty, 1.0)  # 确保比例不超过1
-                            sell_cost = old_cost_total * sell_cost_ratio
-                            
-                            # 计算卖出金额（减去手续费）
-                            sell_amount = price * quantity - fees
-                            
-                            # 计算已实现盈亏 = 卖出金额 - 卖出部分的成本
-                            trade_realized_pnl = sell_amount - sell_cost
-                            
-                            # 累加到当日已实现盈亏
-                            day_realized_pnl += trade_realized_pnl
-                            
-                            # 更新持仓
-                            current_position['持仓数量'] = old_qty - quantity  
-                            
-                            # 更新成本总额（减去卖出部分的成本）
-                            if current_position['持仓数量'] > 0:
-                                # 卖出部分持仓时，成本总额按比例减少，但成本价保持不变
-                                current_position['持仓成本总额'] = old_cost_total * (1 - sell_cost_ratio)
-                                # 卖出时成本价不变
-                            else:
-                                # 全部卖出，清零成本
-                                current_position['持仓成本'] = 0
-                                current_position['持仓成本总额'] = 0
-                
-                # 记录当日已实现盈亏
-                realized_pnl[symbol][date] = day_realized_pnl
+                # 当日有交易或分红时取收盘后的状态，证券信息只从成交记录中取
+                day_state = day_states.get((symbol, date))
+                day_dividend = 0
+                if day_state is not None:
+                    traded = day_state['成交笔数'] > 0
+                    fields = ('证券名称', '市场', '产品类型') if traded else ()
+                    for field in fields + ('持仓数量', '持仓成本', '持仓成本总额'):
+                        current_position[field] = day_state[field]
+                    day_realized_pnl = day_state['当日已实现盈亏']
+                    day_dividend = day_state['当日分红']
                 
                 # 更新累计已实现盈亏
-                current_position['累计已实现盈亏'] = current_position.get('累计已实现盈亏', 0) + day_realized_pnl
+                if day_state is not None:
+                    current_position['累计已实现盈亏'] = day_state['累计已实现盈亏']
+                else:
+                    current_position['累计已实现盈亏'] = current_position.get('累计已实现盈亏', 0) + day_realized_pnl
+                
+                # 本币状态
+                base_day_realized = 0
+                base_state = base_day_states.get((symbol, date))
+                if base_state is not None:
+                    for field in self.BASE_STATE_FIELDS:
+                        current_position[base_column(field)] = base_state[field]
+                    base_day_realized = base_state['当日已实现盈亏']
                 
                 # 更新当日持仓情况
                 daily_positions[symbol][date] = current_position
-                
-                # 获取当日收盘价
-                price_rows = self.prices_df[(self.prices_df['日期'].dt.date == date) & 
-                                           (self.prices_df['证券代码'] == symbol)]
-                
-                close_price = 0
-                if not price_rows.empty and price_rows['收盘价'].values[0] > 0:
-                    close_price = price_rows['收盘价'].values[0]
-                else:
-                    # 如果没有收盘价或收盘价为0，尝试使用当日交易价格
-                    if not symbol_trades.empty:
-                        # 使用当日最后一笔交易的价格
-                        close_price = symbol_trades.iloc[-1]['成交价格']
+                position = current_position
                 
                 # 计算未实现盈亏
                 qty = current_position['持仓数量']
@@ -1058,8 +1626,7 @@ class TradingProcessor:
                 
                 # 添加到盈亏数据
                 if qty > 0 or day_realized_pnl != 0:  # 只记录有持仓或有盈亏的日期
-                    # 获取证券信息
-                    security_info = self.get_security_info(symbol)
+                    lot_day = lot_day_pnl.get((symbol, date), {})
                     
                     pnl_data.append({
                         '日期': date,
@@ -1067,17 +1634,32 @@ class TradingProcessor:
                         '证券名称': current_position['证券名称'],
                         '交易所': security_info['交易所'],
                         '持仓数量': qty,
-                        '持仓成本价': round(cost_price, 4),
-                        '持仓成本总额': round(cost_total, 2),
-                        '收盘价': round(close_price, 4),
-                        '持仓市值': round(market_value, 2),
-                        '当日已实现盈亏': round(day_realized_pnl, 2),
-                        '累计已实现盈亏': round(current_position['累计已实现盈亏'], 2),
-                        '当日未实现盈亏': round(unrealized_pnl, 2),
-                        '未实现盈亏比例(%)': round(unrealized_pnl_ratio, 2),
-                        '总盈亏': round(total_pnl, 2)
+                        '持仓成本价': cost_price,
+                        '持仓成本总额': cost_total,
+                        '收盘价': close_price,
+                        '持仓市值': market_value,
+                        '当日已实现盈亏': day_realized_pnl,
+                        **{column: lot_day.get(column, 0) for column in METHOD_COLUMNS},
+                        '当日分红': day_dividend,
+                        '累计已实现盈亏': current_position['累计已实现盈亏'],
+                        '当日未实现盈亏': unrealized_pnl,
+                        '未实现盈亏比例(%)': unrealized_pnl_ratio,
+                        '总盈亏': total_pnl,
+                        **({
+                            base_column('持仓成本总额'): current_position.get(base_column('持仓成本总额'), 0),
+                            base_column('当日已实现盈亏'): base_day_realized,
+                            base_column('累计已实现盈亏'): current_position.get(base_column('累计已实现盈亏'), 0)
+                        } if base_fields else {})
                     })
         
+        # 统一取整：默认逐项保留小数；定点模式下按分整数计算，各金额列之间逐分吻合
+        if self.fixed_point:
+            pnl_data = self._fixed_point_pnl(pnl_data, self.daily_pnl if start_after is not None else None)
+        else:
+            for row in pnl_data:
+                for column, digits in self.PNL_DIGITS.items():
+                    row[column] = round(row[column], digits)
+        
         # 更新最终持仓到 self.positions
         for symbol, dates in daily_positions.items():
             if dates:
@@ -1094,8 +1676,99 @@ class TradingProcessor:
                         '每日价格': {}
                     }
         
+        # 记录结束状态，新数据到达时从这里继续计算
+        if all_dates:
+            self._pnl_state = (all_dates[-1], {
+                symbol: dates[max(dates.keys())] for symbol, dates in daily_positions.items() if dates
+            })
+        
         return daily_positions, pnl_data, all_dates
     
+    # 每日盈亏中需要取整的列及保留的小数位数
+    PNL_DIGITS = {
+        '持仓成本价': 4, '持仓成本总额': 2, '收盘价': 4, '持仓市值': 2, '当日已实现盈亏': 2,
+        **dict.fromkeys(METHOD_COLUMNS, 2),
+        '当日分红': 2, '累计已实现盈亏': 2, '当日未实现盈亏': 2, '未实现盈亏比例(%)': 2, '总盈亏': 2
+    }
+    
+    def _fixed_point_pnl(self, pnl_data, previous=None):
+        """按定点整数计算每日盈亏的金额列
+        
+        价格取整到0.0001，金额以分为单位：持仓市值 = 持仓数量 × 收盘价，未实现盈亏 = 持仓市值 - 持仓成本总额，
+        累计已实现盈亏为逐日已实现盈亏的累计，总盈亏 = 累计已实现盈亏 + 未实现盈亏，全部按列一次计算。
+        
+        Args:
+            pnl_data: 未取整的每日盈亏列表，按证券分组，组内按日期排序
+            previous: 增量计算时已有的每日盈亏，从其中各证券最后的累计已实现盈亏继续累计
+        
+        Returns:
+            list: 取整后的每日盈亏列表
+        """
+        if not pnl_data:
+            return pnl_data
+        
+        pnl = pd.DataFrame(pnl_data)
+        qty = pnl['持仓数量'].to_numpy(dtype=np.float64)
+        close = to_fixed(pnl['收盘价'], PRICE_DIGITS)
+        cost_total = to_fixed(pnl['持仓成本总额'])
+        market_value = to_fixed(qty * close / 10 ** (PRICE_DIGITS - MONEY_DIGITS), 0)
+        realized = to_fixed(pnl['当日已实现盈亏'])
+        
+        start = 0
+        if previous is not None and not previous.empty:
+            start = to_fixed(pnl['证券代码'].map(previous.groupby('证券代码')['累计已实现盈亏'].last()))
+        cumulative = pd.Series(realized, index=pnl.index).groupby(pnl['证券代码']).cumsum().to_numpy() + start
+        unrealized = np.where(qty > 0, market_value - cost_total, 0)
+        ratio = np.divide(unrealized * 100, cost_total, out=np.zeros(len(pnl)), where=cost_total > 0)
+        
+        for column in METHOD_COLUMNS + ['当日分红']:
+            pnl[column] = from_fixed(to_fixed(pnl[column]))
+        pnl['持仓成本价'] = from_fixed(to_fixed(pnl['持仓成本价'], PRICE_DIGITS), PRICE_DIGITS)
+        pnl['持仓成本总额'] = from_fixed(cost_total)
+        pnl['收盘价'] = from_fixed(close, PRICE_DIGITS)
+        pnl['持仓市值'] = from_fixed(market_value)
+        pnl['当日已实现盈亏'] = from_fixed(realized)
+        pnl['累计已实现盈亏'] = from_fixed(cumulative)
+        pnl['当日未实现盈亏'] = from_fixed(unrealized)
+        pnl['未实现盈亏比例(%)'] = np.round(ratio, 2)
+        pnl['总盈亏'] = from_fixed(cumulative + unrealized)
+        return pnl.to_dict('records')
+    
+    def _convert_pnl(self, pnl_df):
+        """把每日盈亏折算为本币
+        
+        持仓市值按当天汇率折算；持仓成本总额和已实现盈亏取本币递推得到的历史本币金额（见 _base_cost_basis），
+        未实现盈亏 = 本币持仓市值 - 历史本币成本，同时包含价格和汇率变化的影响。没有汇率表时原样返回。
+        
+        Args:
+            pnl_df: 按日期和证券代码排序的每日盈亏，有汇率表时含 calculate_pnl_core 追加的本币状态列
+        
+        Returns:
+            DataFrame: 追加 币种、汇率 和本币金额列后的每日盈亏
+        """
+        if self.rate_surface is None or pnl_df.empty:
+            return pnl_df
+        
+        # 本币状态列移到币种、汇率之后
+        state_columns = [base_column(column) for column in ('持仓成本总额', '当日已实现盈亏', '累计已实现盈亏')]
+        states = pnl_df[state_columns].astype(np.float64)
+        pnl_df = pnl_df.drop(columns=state_columns)
+        
+        currencies = pnl_df['证券代码'].map(self._symbol_currencies()).fillna(self.rate_surface.base_currency)
+        pnl_df = self._to_base_currency(pnl_df, currencies.to_numpy(), ['持仓市值'])
+        market_value = pnl_df['持仓市值'].to_numpy(dtype=np.float64) * pnl_df['汇率'].to_numpy(dtype=np.float64)
+        cost_total = states[base_column('持仓成本总额')].to_numpy()
+        unrealized = np.where(pnl_df['持仓数量'].to_numpy(dtype=np.float64) > 0, market_value - cost_total, 0.0)
+        cumulative = states[base_column('累计已实现盈亏')].to_numpy()
+        return pnl_df.assign(**{
+            base_column('持仓成本总额'): np.round(cost_total, 2),
+            base_column('当日已实现盈亏'): np.round(states[base_column('当日已实现盈亏')].to_numpy(), 2),
+            base_column('当日未实现盈亏'): np.round(unrealized, 2),
+            base_column('累计已实现盈亏'): np.round(cumulative, 2),
+            base_column('总盈亏'): np.round(cumulative + unrealized, 2)
+        })
+    
+    @timed_stage(rows=lambda self, result: frame_rows(self.daily_pnl))
     def calculate_daily_pnl(self):
         """
         计算每日盈亏，使用统一的摊薄成本法
@@ -1118,7 +1791,8 @@ class TradingProcessor:
             self.daily_pnl = pd.DataFrame(pnl_data)
             
             # 按日期和证券代码排序
-            self.daily_pnl = self.daily_pnl.sort_values(['日期', '证券代码'])
+            self.daily_pnl = self._convert_pnl(self.daily_pnl.sort_values(['日期', '证券代码']))
+            self.data_version += 1
             
             logger.info("每日盈亏计算完成，使用摊薄成本法")
             return True
@@ -1126,6 +1800,7 @@ class TradingProcessor:
             logger.error(f"计算每日盈亏失败: {e}")
             return False
     
+    @timed_stage(rows=lambda self, result: frame_rows(self.trades_df))
     def process_data(self):
         """处理数据并生成分析结果"""
         # 计算交易费用
@@ -1136,6 +1811,10 @@ class TradingProcessor:
         if not self.update_positions():
             return False
         
+        # 按持仓计算分红权益
+        if not self.calculate_dividends():
+            return False
+        
         # 将持仓数据同步到日志
         logger.info("持仓成本价格情况:")
         for symbol, position in self.positions.items():
@@ -1154,6 +1833,140 @@ class TradingProcessor:
         
         return True
     
+    # 计算得到的交易列，比较新旧交易记录时忽略
+    DERIVED_TRADE_COLUMNS = ['交易金额', '手续费', '规费', '印花税', '过户费', '平台使用费', '结算费', '汇率费', '监管费', '总费用']
+    
+    @staticmethod
+    def _new_rows(old_df, new_df, columns):
+        """找出新数据中多出来的行（按行内容比较，允许重复行）
+        
+        Args:
+            old_df: 已处理的数据
+            new_df: 重新加载的数据
+            columns: 参与比较的列
+        
+        Returns:
+            Series: 新数据中新增行的布尔掩码，旧数据中有行被修改或删除时返回None
+        """
+        old_hashes = pd.util.hash_pandas_object(old_df[columns], index=False)
+        new_hashes = pd.util.hash_pandas_object(new_df[columns], index=False)
+        
+        # 相同内容的行按出现次数编号，超出旧数据次数的即为新增
+        new_occurrence = new_hashes.groupby(new_hashes).cumcount()
+        old_counts = old_hashes.value_counts()
+        is_new = new_occurrence.to_numpy() >= new_hashes.map(old_counts).fillna(0).to_numpy()
+        
+        if len(new_df) - is_new.sum() != len(old_df):
+            return None
+        return pd.Series(is_new, index=new_df.index)
+    
+    def merge_new_data(self, other):
+        """合并同一账户重新导出的数据，能增量计算时只处理新增的交易和价格
+        
+        当旧的交易和价格记录都未改变、费率和证券信息一致、且新增记录都晚于
+        已计算的最后日期时，只为新增交易计算费用，并从上次的持仓状态继续计算
+        新日期的盈亏；否则使用新数据完整重新计算。
+        
+        新文件的全部交易和价格都晚于已计算的最后日期时视为增量导出（只包含新增记录），
+        全部记录追加到已有数据；增量导出中为空的工作表视为未变化。增量导出没有历史记录，
+        不能完整重新计算，配置变化时返回None并保留已有数据。
+        
+        Args:
+            other: 已调用 load_data 加载新导出文件的 TradingProcessor
+        
+        Returns:
+            str: 'unchanged'、'incremental' 或 'full'，处理失败时返回None
+        """
+        def full_recompute():
+            for attr in ('trades_df', 'rates_df', 'prices_df', 'securities_df', 'dividend_df', 'dividend_schedule',
+                         'corporate_actions_df', 'fx_rates_df', 'rate_surface', 'holidays_df', 'trading_calendar',
+                         'fee_schedule', 'source_hash'):
+                setattr(self, attr, getattr(other, attr))
+            self.positions = {}
+            self.daily_pnl = None
+            self._pnl_state = None
+            self.data_version += 1
+            return 'full' if self.process_data() else None
+        
+        if self._pnl_state is None or self.daily_pnl is None or self.trades_df is None:
+            return full_recompute()
+        
+        last_date, last_positions = self._pnl_state
+        dates = pd.concat([other.trades_df['日期'], other.prices_df['日期']])
+        delta = not dates.empty and bool((dates.dt.date > last_date).all())
+        
+        def same(left, right):
+            if delta and (right is None or right.empty):
+                return True
+            if left is None or right is None:
+                return left is right
+            return left.equals(right)
+        
+        def recompute(reason):
+            if delta:
+                logger.error(f"{reason}，但新文件是只包含新增记录的增量导出，无法完整重新计算，保留已有数据")
+                return None
+            logger.info(f"{reason}，完整重新计算")
+            return full_recompute()
+        
+        if not (same(self.rates_df, other.rates_df) and same(self.securities_df, other.securities_df)
+                and same(self.fx_rates_df, other.fx_rates_df) and same(self.holidays_df, other.holidays_df)):
+            return recompute("费率、证券信息、汇率或休市日已变化")
+        
+        # 分红会改变持仓成本和之后每天的盈亏，公司行动会改变之前全部交易的复权
+        if not (same(self.dividend_schedule, other.dividend_schedule)
+                and same(self.corporate_actions_df, other.corporate_actions_df)):
+            return recompute("分红记录或公司行动已变化")
+        
+        if delta:
+            logger.info("新文件只包含上次计算之后的记录，作为增量导出追加")
+            new_trades = other.trades_df
+            new_prices = other.prices_df
+        else:
+            trade_columns = [col for col in other.trades_df.columns
+                             if col in self.trades_df.columns and col not in self.DERIVED_TRADE_COLUMNS]
+            new_trade_mask = self._new_rows(self.trades_df, other.trades_df, trade_columns)
+            new_price_mask = self._new_rows(self.prices_df, other.prices_df, list(other.prices_df.columns))
+            if new_trade_mask is None or new_price_mask is None:
+                return recompute("已有交易或价格记录被修改")
+            
+            new_trades = other.trades_df[new_trade_mask]
+            new_prices = other.prices_df[new_price_mask]
+            if (new_trades['日期'].dt.date <= last_date).any() or (new_prices['日期'].dt.date <= last_date).any():
+                return recompute("新增记录早于已计算的日期")
+        
+        self.source_hash = other.source_hash
+        
+        if new_trades.empty and new_prices.empty:
+            return 'unchanged'
+        
+        # 只为新增交易计算费用并更新持仓
+        old_trades = self.trades_df
+        self.trades_df = new_trades.reset_index(drop=True)
+        if not self.calculate_fees() or not self.update_positions():
+            self.trades_df = old_trades
+            return None
+        self.trades_df = pd.concat([old_trades, self.trades_df], ignore_index=True)
+        self.prices_df = pd.concat([self.prices_df, new_prices], ignore_index=True)
+        
+        # 新增交易可能改变之后除息日的持有数量
+        if not self.calculate_dividends():
+            return None
+        
+        # 从上次的持仓状态继续计算新日期的盈亏
+        _, pnl_data, _ = self.calculate_pnl_core(start_after=last_date, initial_positions=last_positions)
+        if pnl_data is None:
+            return None
+        
+        if pnl_data:
+            new_pnl = self._convert_pnl(pd.DataFrame(pnl_data).sort_values(['日期', '证券代码']))
+            self.daily_pnl = pd.concat([self.daily_pnl, new_pnl], ignore_index=True)
+        self.data_version += 1
+        
+        logger.info(f"增量处理完成: 新增 {len(new_trades)} 笔交易、{len(new_prices)} 条价格记录")
+        return 'incremental'
+    
+    @timed_stage()
     def _format_sheet(self, writer, sheet_name, sheet_type='default'):
         """统一格式化工作表，美化输出
         
@@ -1248,7 +2061,8 @@ class TradingProcessor:
                                     cell.font = Font(color='006600', bold=True)
                 
                 # 格式化金额列
-                money_cols = ['成交价格', '成交数量', '交易金额', '手续费', '规费', '印花税', '过户费', '总费用']
+                money_cols = ['成交价格', '成交数量', '交易金额', '手续费', '规费', '印花税', '过户费', '总费用',
+                              base_column('交易金额'), base_column('总费用')]
                 for col_name in money_cols:
                     if col_name in column_indices:
                         col_idx = column_indices[col_name]
@@ -1316,7 +2130,8 @@ class TradingProcessor:
                             pass
                 
                 # 格式化金额列
-                money_cols = ['持仓市值', '持仓成本总额', '累计买入金额', '累计卖出金额']
+                money_cols = ['持仓市值', '持仓成本总额', '累计买入金额', '累计卖出金额', '买入成本', '卖出金额', '费用', '总费用', '当日分红']
+                money_cols += [base_column(col) for col in ('持仓市值', '持仓成本总额', '当前市值', '总手续费')]
                 for col_name in money_cols:
                     if col_name in column_indices:
                         col_idx = column_indices[col_name]
@@ -1326,7 +2141,7 @@ class TradingProcessor:
                             cell.number_format = '#,##0.00'
                 
                 # 格式化价格列
-                price_cols = ['持仓成本价', '当前价格', '收盘价', '平均买入价', '平均卖出价']
+                price_cols = ['持仓成本价', '当前价格', '收盘价', '平均买入价', '平均卖出价', '买入价格', '卖出价格']
                 for col_name in price_cols:
                     if col_name in column_indices:
                         col_idx = column_indices[col_name]
@@ -1336,7 +2151,7 @@ class TradingProcessor:
                             cell.number_format = '#,##0.0000'
                 
                 # 格式化日期列
-                date_cols = ['日期', '首次交易日期', '最后交易日期']
+                date_cols = ['日期', '首次交易日期', '最后交易日期', '买入日期', '卖出日期']
                 for col_name in date_cols:
                     if col_name in column_indices:
                         col_idx = column_indices[col_name]
@@ -1516,6 +2331,7 @@ class TradingProcessor:
         except Exception as e:
             logger.warning(f"工作表 '{sheet_name}' 格式化失败: {e}")
     
+    @timed_stage(rows=lambda self, result: frame_rows(self.daily_pnl))
     def save_results(self, output_file):
         """
             保存分析结果到单个Excel文件的不同工作表
@@ -1543,6 +2359,16 @@ class TradingProcessor:
             stock_pnl_df = self.get_stock_historical_pnl()
             has_stock_pnl_data = not stock_pnl_df.empty
             
+            # 生成回合交易明细和统计
+            round_trips_df = self.get_round_trips()
+            trip_summary_df, _ = self.get_round_trip_summary(round_trips_df)
+            has_round_trip_data = not round_trips_df.empty
+            
+            # 按各券商费率模拟全部交易的费用
+            fee_simulation_df = self.get_broker_fee_simulation()
+            fee_comparison_df = self.get_broker_fee_comparison(fee_simulation_df)
+            has_fee_simulation_data = not fee_simulation_df.empty
+            
             # 检查是否有证券信息数据
             has_securities_data = self.securities_df is not None and not self.securities_df.empty
             
@@ -1586,6 +2412,22 @@ class TradingProcessor:
                 else:
                     logger.warning("没有股票历史盈亏数据可保存")
                 
+                # 保存回合交易明细和统计
+                if has_round_trip_data:
+                    round_trips_df.to_excel(writer, sheet_name='回合交易', index=False)
+                    self._format_sheet(writer, '回合交易', sheet_type='stock_pnl')
+                    trip_summary_df.to_excel(writer, sheet_name='回合统计', index=False)
+                    self._format_sheet(writer, '回合统计', sheet_type='stock_pnl')
+                    logger.info("回合交易已保存到工作表 '回合交易' 和 '回合统计'")
+                
+                # 保存券商费用比较和月度明细
+                if has_fee_simulation_data:
+                    fee_comparison_df.to_excel(writer, sheet_name='券商费用比较', index=False)
+                    self._format_sheet(writer, '券商费用比较', sheet_type='stock_pnl')
+                    fee_simulation_df.to_excel(writer, sheet_name='券商月度费用', index=False)
+                    self._format_sheet(writer, '券商月度费用', sheet_type='stock_pnl')
+                    logger.info("券商费用模拟已保存到工作表 '券商费用比较' 和 '券商月度费用'")
+                
                 # 保存分红记录
                 sorted_dividends_df = self.dividend_df.sort_values('日期', ascending=False).reset_index(drop=True)
                 sorted_dividends_df.to_excel(writer, sheet_name='分红记录', index=False)
@@ -1598,6 +2440,39 @@ class TradingProcessor:
         except Exception as e:
             logger.error(f"保存结果失败: {e}")
             return False
+    
+    @timed_stage()
+    def save_snapshot(self, output_file, since=None):
+        """
+            保存轻量的持仓快照：当前持仓、股票历史盈亏和新日期的每日盈亏，不格式化单元格
+            
+            完整报告的大部分耗时在逐个单元格设置格式，监控目录增量刷新时只写快照，几秒内即可完成。
+            
+            Args:
+                output_file: 输出Excel文件路径
+                since: 只保存该日期之后的每日盈亏，为None时保存全部
+            
+            Returns:
+                是否成功保存快照
+        """
+        try:
+            daily_pnl = self.daily_pnl if self.daily_pnl is not None else pd.DataFrame()
+            if since is not None and not daily_pnl.empty:
+                daily_pnl = daily_pnl[daily_pnl['日期'] > since]
+            
+            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+                self.get_current_positions().to_excel(writer, sheet_name='持仓数据', index=False)
+                self.get_stock_historical_pnl().to_excel(writer, sheet_name='股票历史盈亏', index=False)
+                if not daily_pnl.empty:
+                    daily_pnl.sort_values(['日期', '证券代码'], ascending=[False, True]).to_excel(
+                        writer, sheet_name='新增盈亏', index=False
+                    )
+            
+            logger.info(f"持仓快照已保存到: {output_file}")
+            return True
+        except Exception as e:
+            logger.error(f"保存持仓快照失败: {e}")
+            return False
 
 
 def main():
@@ -1646,4 +2521,6 @@ def main():
 
 
 if __name__ == "__main__":
+    from config.settings import setup_logging
+    setup_logging()
     main()
\ No newline at end of file
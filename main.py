@@ -7,53 +7,415 @@
 import sys
 import os
 import argparse
+import fnmatch
+import time
 from datetime import datetime
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from core.trading_processor import TradingProcessor
-from core.trading_review import TradingReview
+# pandas等重量级模块只在执行具体命令时导入，--help 和批量工作进程启动不加载
+from config.settings import BATCH_CONFIG, DEFAULT_DB_FILE, ensure_directories, setup_logging
+from utils.run_report import peak_memory_mb
 
 
-def process_trading_data(input_file, output_file=None):
-    """处理交易数据"""
-    processor = TradingProcessor()
+def default_output_file(input_file, output_dir="reports"):
+    """根据输入文件名生成分析结果文件路径"""
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(output_dir, f"{base_name}_分析结果_{datetime.now().strftime('%Y%m%d')}.xlsx")
+
+
+def account_id(path):
+    """券商导出文件所属的账户：文件名中第一个下划线之前的部分
     
-    if not processor.load_data(input_file):
-        print("❌ 数据加载失败")
-        return False
+    例如 华泰_20250105.xlsx 和 华泰_20250106.xlsx 属于账户 华泰，没有下划线时整个文件名即账户。
+    """
+    return os.path.splitext(os.path.basename(path))[0].split('_', 1)[0]
+
+
+def default_snapshot_file(account, output_dir="reports"):
+    """账户持仓快照的文件路径"""
+    return os.path.join(output_dir, f"{account}_持仓快照_{datetime.now().strftime('%Y%m%d')}.xlsx")
+
+
+def run_processing(input_file, output_file=None, db_path=None, processor=None):
+    """加载、计算并保存一个交易数据文件
     
-    if not processor.calculate_fees():
-        print("❌ 费用计算失败")
-        return False
+    Args:
+        input_file: 输入Excel文件路径，从数据库加载时可为None
+        output_file: 输出文件路径，为None时保存到reports目录
+        db_path: 数据库文件路径，指定时从数据库加载，并将每日盈亏写回数据库
+        processor: 使用的处理器，为None时新建；传入时调用方可在之后读取其运行报告
     
-    if not processor.calculate_pnl():
-        print("❌ 盈亏计算失败")
-        return False
+    Returns:
+        tuple: (是否成功, 输出文件路径或错误信息)
+    """
+    if processor is None:
+        from core.trading_processor import TradingProcessor
+        processor = TradingProcessor()
+    
+    loaded = processor.load_from_store(db_path) if db_path else processor.load_data(input_file)
+    if not loaded:
+        return False, "数据加载失败"
+    
+    # 计算费用、持仓和每日盈亏
+    if not processor.process_data():
+        return False, "盈亏计算失败"
+    
+    if db_path and not processor.save_to_store(db_path):
+        return False, "每日盈亏写入数据库失败"
     
     # 生成输出文件名
     if not output_file:
-        base_name = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = f"reports/{base_name}_分析结果_{datetime.now().strftime('%Y%m%d')}.xlsx"
+        output_file = default_output_file(input_file or db_path)
     
     # 确保输出目录存在
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
     
-    if processor.save_results(output_file):
-        print(f"✅ 分析结果已保存到: {output_file}")
-        return True
+    if not processor.save_results(output_file):
+        return False, "结果保存失败"
+    
+    return True, output_file
+
+
+def process_trading_data(input_file, output_file=None, db_path=None, show_stages=False):
+    """处理交易数据
+    
+    Args:
+        show_stages: 是否输出各阶段的耗时、行数和内存峰值
+    """
+    from core.trading_processor import TradingProcessor
+    
+    if not input_file and not db_path:
+        print("❌ 请指定输入Excel文件或使用 --db 从数据库加载")
+        return False
+    
+    processor = TradingProcessor()
+    ok, message = run_processing(input_file, output_file, db_path, processor)
+    
+    if ok:
+        print(f"✅ 分析结果已保存到: {message}")
     else:
-        print("❌ 结果保存失败")
+        print(f"❌ {message}")
+    
+    if show_stages:
+        print("\n⏱️ 各阶段运行统计:")
+        print(processor.run_report.format_text())
+    return ok
+
+
+def collect_batch_jobs(source, output_dir=None):
+    """收集批量处理的文件列表
+    
+    source 为目录时处理其中所有 .xlsx 文件（跳过 BATCH_CONFIG 中排除的文件）；
+    为清单文件时每行一个任务，格式为 "输入文件[,输出文件]"，# 开头的行为注释，
+    相对路径相对于清单文件所在目录。
+    
+    Args:
+        source: 目录或清单文件路径
+        output_dir: 输出目录，为None时目录模式输出到reports目录
+    
+    Returns:
+        list: [(输入文件, 输出文件), ...]
+    """
+    jobs = []
+    
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if not name.lower().endswith('.xlsx'):
+                continue
+            if any(fnmatch.fnmatch(name, pattern) for pattern in BATCH_CONFIG['exclude_patterns']):
+                continue
+            input_file = os.path.join(source, name)
+            jobs.append((input_file, default_output_file(input_file, output_dir or "reports")))
+        return jobs
+    
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            
+            parts = [part.strip() for part in line.split(',')]
+            input_file = os.path.join(base_dir, parts[0])
+            if len(parts) > 1 and parts[1]:
+                output_file = os.path.join(base_dir, parts[1])
+            else:
+                output_file = default_output_file(input_file, output_dir or "reports")
+            jobs.append((input_file, output_file))
+    
+    return jobs
+
+
+def _init_batch_worker(memory_limit_mb):
+    """批量处理工作进程初始化：设置内存上限，降低日志级别
+    
+    内存上限通过 RLIMIT_AS 设置，超出时当前文件以 MemoryError 失败，
+    工作进程继续处理后续文件。仅在支持 resource 模块的系统上生效。
+    """
+    import logging
+    
+    # 工作进程只输出警告和错误，进度由汇总信息展示
+    for name in ('trading_processor', 'trading_review'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = int(memory_limit_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            print(f"⚠️ 无法设置工作进程内存上限: {e}")
+
+
+def _run_batch_job(input_file, output_file):
+    """在工作进程中处理一个文件，返回处理结果"""
+    start_time = time.perf_counter()
+    try:
+        ok, message = run_processing(input_file, output_file)
+    except MemoryError:
+        ok, message = False, "超出内存上限"
+    except Exception as e:
+        ok, message = False, f"处理出错: {e}"
+    
+    return {
+        'input': input_file,
+        'ok': ok,
+        'message': message,
+        'seconds': time.perf_counter() - start_time,
+        'peak_mb': peak_memory_mb(),
+        'pid': os.getpid()
+    }
+
+
+def batch_process(source, output_dir=None, workers=None, memory_limit_mb=None, max_tasks_per_child=None):
+    """使用进程池批量处理多个账户的交易数据文件
+    
+    工作进程在整个批次中复用，pandas和openpyxl只在每个进程中导入一次。
+    
+    Args:
+        source: 目录或清单文件路径
+        output_dir: 输出目录
+        workers: 工作进程数
+        memory_limit_mb: 每个工作进程的内存上限(MB)
+        max_tasks_per_child: 每个工作进程处理多少个文件后重启
+    
+    Returns:
+        bool: 所有文件是否都处理成功
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    if not os.path.exists(source):
+        print(f"❌ 路径不存在: {source}")
+        return False
+    
+    jobs = collect_batch_jobs(source, output_dir)
+    if not jobs:
+        print(f"❌ 没有找到需要处理的文件: {source}")
+        return False
+    
+    workers = workers or BATCH_CONFIG['workers'] or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    memory_limit_mb = memory_limit_mb or BATCH_CONFIG['memory_limit_mb']
+    max_tasks_per_child = max_tasks_per_child or BATCH_CONFIG['max_tasks_per_child']
+    
+    print(f"🚀 开始批量处理 {len(jobs)} 个文件，工作进程 {workers} 个")
+    
+    pool_options = {'max_workers': workers, 'initializer': _init_batch_worker, 'initargs': (memory_limit_mb,)}
+    if max_tasks_per_child:
+        pool_options['max_tasks_per_child'] = max_tasks_per_child
+    
+    start_time = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(**pool_options) as executor:
+        futures = {executor.submit(_run_batch_job, input_file, output_file): input_file
+                   for input_file, output_file in jobs}
+        
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # 工作进程异常退出（例如被系统终止）
+                result = {'input': futures[future], 'ok': False, 'message': f"工作进程异常: {e}",
+                          'seconds': 0.0, 'peak_mb': None, 'pid': None}
+            results.append(result)
+            
+            status = "✅" if result['ok'] else "❌"
+            print(f"{status} [{len(results)}/{len(jobs)}] {os.path.basename(result['input'])} "
+                  f"{result['seconds']:.2f}s")
+    
+    elapsed = time.perf_counter() - start_time
+    print_batch_summary(results, elapsed, memory_limit_mb)
+    return all(result['ok'] for result in results)
+
+
+def print_batch_summary(results, elapsed, memory_limit_mb=None):
+    """输出批量处理的耗时和失败汇总"""
+    succeeded = [result for result in results if result['ok']]
+    failed = [result for result in results if not result['ok']]
+    seconds = sorted(result['seconds'] for result in results)
+    peaks = [result['peak_mb'] for result in results if result['peak_mb'] is not None]
+    
+    print("\n📋 批量处理汇总")
+    print(f"   文件总数: {len(results)}，成功: {len(succeeded)}，失败: {len(failed)}")
+    print(f"   总耗时: {elapsed:.2f}s，工作进程: {len({result['pid'] for result in results if result['pid']})} 个")
+    if seconds:
+        print(f"   单文件耗时: 平均 {sum(seconds) / len(seconds):.2f}s，"
+              f"中位 {seconds[len(seconds) // 2]:.2f}s，最长 {seconds[-1]:.2f}s")
+    if peaks:
+        print(f"   工作进程内存峰值: {max(peaks):.0f} MB")
+    
+    if failed:
+        print("\n❌ 失败文件:")
+        for result in sorted(failed, key=lambda r: r['input']):
+            print(f"   {result['input']}: {result['message']}")
+        if memory_limit_mb:
+            # 处理器内部会捕获MemoryError，失败原因可能显示为加载或计算失败
+            print(f"   工作进程内存上限为 {memory_limit_mb} MB，失败也可能由内存不足引起")
+
+
+def manage_store(action, path, db_path=None, table='trades'):
+    """管理本地交易数据库：导入、导出Excel，追加记录
+    
+    Args:
+        action: 'import'、'export' 或 'append'
+        path: Excel文件路径
+        db_path: 数据库文件路径
+        table: 追加记录的表名
+    
+    Returns:
+        bool: 是否成功
+    """
+    import pandas as pd
+    from core.trade_store import TradeStore, TABLES
+    
+    store = TradeStore(db_path)
+    
+    if action == 'import':
+        ok = store.import_excel(path)
+        print(f"✅ 已导入 {path} 到 {store.db_path}" if ok else "❌ 导入失败")
+        return ok
+    
+    if action == 'export':
+        ok = store.export_excel(path)
+        print(f"✅ 已导出 {store.db_path} 到 {path}" if ok else "❌ 导出失败")
+        return ok
+    
+    # 追加记录：优先读取与表对应的工作表，否则读取第一个工作表
+    with pd.ExcelFile(path) as xls:
+        sheet_name = TABLES[table] if TABLES[table] in xls.sheet_names else xls.sheet_names[0]
+        df = pd.read_excel(xls, sheet_name=sheet_name, dtype={'证券代码': str})
+    
+    ok = store.append_rows(table, df)
+    print(f"✅ 已向 {table} 追加 {len(df)} 条记录" if ok else "❌ 追加失败")
+    return ok
+
+
+def watch_folder(directory, output_dir=None, debounce=2.0, poll_interval=1.0, process_existing=True,
+                 full_report=False):
+    """监控目录，新的券商导出文件写入完成后自动处理并刷新分析结果
+    
+    文件按文件名前缀归属账户（见 account_id），每个账户的处理器保存在内存中。账户再次导出时，
+    无论是包含全部历史的完整导出，还是只包含新增记录的增量导出，都只对新增的交易和价格做增量计算；
+    处理失败时保留账户之前的数据。
+    
+    完整计算后保存完整报告；增量刷新只保存持仓快照（当前持仓、股票历史盈亏和新日期的每日盈亏），
+    不重写和格式化整个工作簿。
+    
+    Args:
+        directory: 监控的目录
+        output_dir: 输出目录，默认reports
+        debounce: 文件保持不变多少秒后视为写入完成
+        poll_interval: 轮询间隔（秒）
+        process_existing: 启动时是否处理目录中已存在的文件
+        full_report: 增量刷新时是否也保存完整报告
+    
+    Returns:
+        bool: 是否正常退出
+    """
+    from core.trading_processor import TradingProcessor
+    from utils.folder_watcher import FolderWatcher
+    
+    if not os.path.isdir(directory):
+        print(f"❌ 目录不存在: {directory}")
         return False
+    
+    # 每个账户的已处理状态: {账户: TradingProcessor}
+    accounts = {}
+    
+    def handle(path):
+        start_time = time.perf_counter()
+        name = os.path.basename(path)
+        account = account_id(path)
+        
+        loaded = TradingProcessor()
+        if not loaded.load_data(path):
+            print(f"❌ {name} 数据加载失败")
+            return
+        
+        processor = accounts.get(account)
+        last_date = None
+        if processor is None:
+            mode = 'full' if loaded.process_data() else None
+            if mode:
+                accounts[account] = loaded
+            processor = loaded
+        else:
+            # 合并失败时处理器仍保留之前的数据
+            last_date = processor.last_pnl_date
+            mode = processor.merge_new_data(loaded)
+        
+        if mode is None:
+            kept = "，保留账户之前的数据" if account in accounts else ""
+            print(f"❌ {name} 处理失败{kept}")
+            return
+        
+        if mode == 'unchanged':
+            print(f"⏭️  {name} 没有新的交易和价格记录")
+            return
+        
+        reports_dir = output_dir or "reports"
+        os.makedirs(reports_dir, exist_ok=True)
+        if mode == 'incremental' and not full_report:
+            output_file = default_snapshot_file(account, reports_dir)
+            saved = processor.save_snapshot(output_file, since=last_date)
+        else:
+            output_file = default_output_file(account, reports_dir)
+            saved = processor.save_results(output_file)
+        if not saved:
+            print(f"❌ {name} 结果保存失败")
+            return
+        
+        label = '增量' if mode == 'incremental' else '完整'
+        print(f"✅ {name}（账户 {account}）{label}处理完成，耗时 {time.perf_counter() - start_time:.2f}s -> {output_file}")
+    
+    watcher = FolderWatcher(
+        directory,
+        exclude_patterns=BATCH_CONFIG['exclude_patterns'],
+        debounce=debounce,
+        poll_interval=poll_interval
+    )
+    print(f"👀 正在监控目录 {directory}（{watcher.mode}），按 Ctrl+C 停止")
+    
+    try:
+        watcher.run(handle, process_existing=process_existing)
+    except KeyboardInterrupt:
+        print("\n👋 已停止监控")
+    return True
 
 
-def generate_review(date_str=None):
-    """生成交易复盘报告"""
+def generate_review(date_str=None, start_str=None, end_str=None, data_file="data/交易数据.xlsx",
+                    output_format='markdown'):
+    """生成交易复盘报告
+    
+    指定 start_str/end_str 时批量生成日期范围内每个交易日的报告，数据只加载一次。
+    """
+    from core.trading_review import TradingReview
+    
     review = TradingReview()
     
     # 加载数据
-    data_file = "data/交易数据.xlsx"
     if not os.path.exists(data_file):
         print(f"❌ 数据文件不存在: {data_file}")
         return False
@@ -62,6 +424,25 @@ def generate_review(date_str=None):
         print("❌ 数据加载失败")
         return False
     
+    # 批量生成日期范围内的复盘报告
+    if start_str or end_str:
+        try:
+            start_date = datetime.strptime(start_str, '%Y-%m-%d').date() if start_str else datetime.min.date()
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else datetime.now().date()
+        except ValueError:
+            print("❌ 日期格式错误，请使用 YYYY-MM-DD 格式")
+            return False
+        
+        start_time = time.perf_counter()
+        report_files = review.save_review_reports(start_date, end_date, output_dir="reports",
+                                                  output_format=output_format)
+        if report_files is None:
+            print("❌ 复盘报告生成失败")
+            return False
+        
+        print(f"✅ 已生成 {len(report_files)} 份复盘报告到 reports/，耗时 {time.perf_counter() - start_time:.2f} 秒")
+        return True
+    
     # 设置复盘日期
     if date_str:
         try:
@@ -72,10 +453,11 @@ def generate_review(date_str=None):
             return False
     
     # 生成复盘报告
-    report_file = f"reports/trading_review_{review.review_date.strftime('%Y%m%d')}.md"
+    extension = '.html' if output_format == 'html' else '.md'
+    report_file = f"reports/trading_review_{review.review_date.strftime('%Y%m%d')}{extension}"
     os.makedirs("reports", exist_ok=True)
     
-    if review.generate_review_report(report_file):
+    if review.save_review_report(report_file, output_format):
         print(f"✅ 复盘报告已生成: {report_file}")
         return True
     else:
@@ -98,34 +480,132 @@ def start_dashboard():
         return True
 
 
+def run_profiled(command, profiler='cprofile', output_file=None):
+    """在性能分析器中执行命令
+    
+    Args:
+        command: 无参数的命令函数
+        profiler: 'cprofile' 或 'pyinstrument'（需要安装pyinstrument，未安装时使用cProfile）
+        output_file: 分析结果文件，cProfile保存为.prof统计文件，pyinstrument保存为HTML；
+            为None时输出耗时最多的调用
+    
+    Returns:
+        命令的返回值
+    """
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("⚠️ 未安装pyinstrument，改用cProfile")
+            profiler = 'cprofile'
+    
+    if profiler == 'pyinstrument':
+        profile = Profiler()
+        profile.start()
+        try:
+            return command()
+        finally:
+            profile.stop()
+            if output_file:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    f.write(profile.output_html())
+                print(f"📊 性能分析结果已保存到: {output_file}")
+            else:
+                print(profile.output_text(unicode=True))
+    
+    import cProfile
+    import pstats
+    
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(command)
+    finally:
+        if output_file:
+            profile.dump_stats(output_file)
+            print(f"📊 性能分析结果已保存到: {output_file}（可用 python -m pstats 或 snakeviz 查看）")
+        else:
+            pstats.Stats(profile).sort_stats('cumulative').print_stats(30)
+
+
+def run_command(args, parser):
+    """执行子命令"""
+    if args.command == 'process':
+        return process_trading_data(args.input, args.output, args.db, show_stages=args.profile)
+    elif args.command == 'db':
+        return manage_store(args.action, args.path, args.db_path, args.table)
+    elif args.command == 'review':
+        return generate_review(args.date, args.start, args.end, args.input, args.format)
+    elif args.command == 'batch':
+        return batch_process(args.source, args.output_dir, args.workers, args.memory_mb, args.max_tasks_per_child)
+    elif args.command == 'watch':
+        return watch_folder(args.directory, args.output_dir, args.debounce, args.interval, not args.skip_existing,
+                            args.full_report)
+    elif args.command == 'dashboard':
+        return start_dashboard()
+    else:
+        parser.print_help()
+        return False
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="交易数据分析系统")
+    parser.add_argument('--profile', action='store_true', help='性能分析模式：输出各阶段运行统计和性能分析结果')
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile', help='性能分析器')
+    parser.add_argument('--profile-output', help='性能分析结果保存路径（.prof 或 .html）')
     subparsers = parser.add_subparsers(dest='command', help='可用命令')
     
     # 处理交易数据命令
     process_parser = subparsers.add_parser('process', help='处理交易数据')
-    process_parser.add_argument('input', help='输入Excel文件路径')
+    process_parser.add_argument('input', nargs='?', help='输入Excel文件路径')
     process_parser.add_argument('-o', '--output', help='输出文件路径')
+    process_parser.add_argument('--db', nargs='?', const=DEFAULT_DB_FILE, help='从本地数据库加载（默认 data/trading.db）')
+    
+    # 本地数据库命令
+    db_parser = subparsers.add_parser('db', help='管理本地交易数据库')
+    db_parser.add_argument('action', choices=['import', 'export', 'append'], help='导入Excel、导出Excel或追加记录')
+    db_parser.add_argument('path', help='Excel文件路径')
+    db_parser.add_argument('--db', dest='db_path', default=DEFAULT_DB_FILE, help='数据库文件路径')
+    db_parser.add_argument('-t', '--table', default='trades', choices=['trades', 'prices', 'dividends'],
+                           help='追加记录的表')
     
     # 生成复盘报告命令
     review_parser = subparsers.add_parser('review', help='生成交易复盘报告')
     review_parser.add_argument('-d', '--date', help='复盘日期 (YYYY-MM-DD)')
+    review_parser.add_argument('--from', dest='start', help='批量复盘开始日期 (YYYY-MM-DD)')
+    review_parser.add_argument('--to', dest='end', help='批量复盘结束日期 (YYYY-MM-DD)')
+    review_parser.add_argument('-i', '--input', default='data/交易数据.xlsx', help='交易数据Excel文件路径')
+    review_parser.add_argument('-f', '--format', choices=['markdown', 'html'], default='markdown', help='报告格式')
+    
+    # 批量处理命令
+    batch_parser = subparsers.add_parser('batch', help='批量处理多个账户的交易数据')
+    batch_parser.add_argument('source', help='交易数据文件目录，或每行一个文件的清单文件')
+    batch_parser.add_argument('-o', '--output-dir', help='输出目录（默认reports）')
+    batch_parser.add_argument('-w', '--workers', type=int, help='工作进程数（默认CPU核数）')
+    batch_parser.add_argument('--memory-mb', type=int, help='每个工作进程的内存上限(MB)')
+    batch_parser.add_argument('--max-tasks-per-child', type=int, help='每个工作进程处理多少个文件后重启')
+    
+    # 监控目录命令
+    watch_parser = subparsers.add_parser('watch', help='监控目录，自动处理新的交易数据文件')
+    watch_parser.add_argument('directory', nargs='?', default='data', help='监控的目录（默认data）')
+    watch_parser.add_argument('-o', '--output-dir', help='输出目录（默认reports）')
+    watch_parser.add_argument('--debounce', type=float, default=2.0, help='文件保持不变多少秒后开始处理')
+    watch_parser.add_argument('--interval', type=float, default=1.0, help='轮询间隔（秒）')
+    watch_parser.add_argument('--skip-existing', action='store_true', help='启动时不处理已存在的文件')
+    watch_parser.add_argument('--full-report', action='store_true', help='增量刷新时也重写完整报告（默认只写持仓快照）')
     
     # 启动仪表盘命令
     subparsers.add_parser('dashboard', help='启动可视化仪表盘')
     
     args = parser.parse_args()
     
-    if args.command == 'process':
-        return process_trading_data(args.input, args.output)
-    elif args.command == 'review':
-        return generate_review(args.date)
-    elif args.command == 'dashboard':
-        return start_dashboard()
-    else:
-        parser.print_help()
-        return False
+    if args.command:
+        ensure_directories()
+        setup_logging()
+    
+    if args.profile and args.command:
+        return run_profiled(lambda: run_command(args, parser), args.profiler, args.profile_output)
+    return run_command(args, parser)
 
 
 if __name__ == "__main__":
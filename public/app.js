@@ -248,16 +248,8 @@ async function generateReview() {
     reviewLoading.style.display = 'block';
     
     try {
-        const response = await fetch(`${API_BASE_URL}/api/review`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ 
-                fileId: uploadedFile,
-                date: reviewDate 
-            })
-        });
+        const params = new URLSearchParams({ fileId: uploadedFile, date: reviewDate });
+        const response = await fetch(`${API_BASE_URL}/api/review?${params}`);
         
         const data = await response.json();
         reviewLoading.style.display = 'none';
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serverless函数本地运行脚本
+用WSGI应用包装 api/ 目录下的函数，便于离线测试行为和耗时
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+from flask import Request
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api')
+
+# 可调用的函数名称，对应 api/<名称>.py
+HANDLER_NAMES = ('upload', 'process', 'dashboard', 'review')
+
+# 已加载的函数模块，模拟热实例
+_modules = {}
+
+
+def load_handler(name):
+    """加载函数模块，首次加载时输出冷启动耗时"""
+    if name not in _modules:
+        start = time.perf_counter()
+        spec = importlib.util.spec_from_file_location(f"api_{name}", os.path.join(API_DIR, f"{name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[name] = module
+        print(f"[冷启动] 加载函数 {name} 耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+    return _modules[name]
+
+
+def application(environ, start_response):
+    """WSGI入口，将 /api/<名称> 分发给对应的函数"""
+    request = Request(environ)
+    parts = request.path.strip('/').split('/')
+
+    if len(parts) != 2 or parts[0] != 'api' or parts[1] not in HANDLER_NAMES:
+        return Response('Not Found', status=404)(environ, start_response)
+
+    module = load_handler(parts[1])
+
+    start = time.perf_counter()
+    with module.app.app_context():
+        response = module.app.make_response(module.handler(request))
+    elapsed = (time.perf_counter() - start) * 1000
+
+    response.headers['X-Response-Time'] = f"{elapsed:.1f}ms"
+    print(f"{request.method} {request.path} -> {response.status_code} ({elapsed:.1f} ms)")
+    return response(environ, start_response)
+
+
+def run_check(input_file, review_date=None):
+    """依次调用上传、处理、仪表盘和复盘函数，输出每一步的状态和耗时
+
+    Args:
+        input_file: 交易数据Excel文件路径
+        review_date: 复盘日期 (YYYY-MM-DD)
+
+    Returns:
+        bool: 所有调用是否都成功
+    """
+    client = Client(application)
+
+    def call(label, method, path, **kwargs):
+        start = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{label:<12} {response.status_code}  {elapsed:8.1f} ms")
+        return response
+
+    with open(input_file, 'rb') as f:
+        response = call('上传', 'POST', '/api/upload', data={'file': (f, os.path.basename(input_file))})
+    if response.status_code != 200:
+        print(f"❌ 上传失败: {response.get_data(as_text=True)}")
+        return False
+    file_id = response.get_json()['fileId']
+
+    ok = call('处理', 'POST', '/api/process', json={'fileId': file_id}).status_code == 200
+
+    response = call('仪表盘', 'GET', f'/api/dashboard?fileId={file_id}')
+    ok = ok and response.status_code == 200
+    etag = response.headers.get('ETag')
+    ok = ok and call('仪表盘(缓存)', 'GET', f'/api/dashboard?fileId={file_id}',
+                     headers={'If-None-Match': etag}).status_code == 304
+
+    body = {'fileId': file_id}
+    if review_date:
+        body['date'] = review_date
+    ok = ok and call('复盘', 'POST', '/api/review', json=body).status_code == 200
+    ok = ok and call('复盘(热实例)', 'POST', '/api/review', json=body).status_code == 200
+
+    print("✅ 全部调用成功" if ok else "❌ 存在失败的调用")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serverless函数本地运行")
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=5001, help='监听端口')
+    parser.add_argument('--check', metavar='EXCEL', help='离线依次调用所有函数并输出耗时')
+    parser.add_argument('-d', '--date', help='检查模式下的复盘日期 (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    if args.check:
+        return run_check(args.check, args.date)
+
+    from werkzeug.serving import run_simple
+    run_simple(args.host, args.port, application, use_reloader=False, threaded=True)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
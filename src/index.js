@@ -49,7 +49,7 @@ export default {
         return handleDashboard(request, env);
       }
 
-      if (path === '/api/review' && request.method === 'POST') {
+      if (path === '/api/review' && (request.method === 'GET' || request.method === 'POST')) {
         return handleReview(request, env);
       }
 
@@ -207,7 +207,9 @@ async function handleDashboard(request, env) {
 // 生成复盘报告
 async function handleReview(request, env) {
   try {
-    const { fileId, date } = await request.json();
+    const { fileId, date } = request.method === 'GET'
+      ? Object.fromEntries(new URL(request.url).searchParams)
+      : await request.json();
     
     // 生成示例复盘报告
     const reviewContent = `# 交易复盘报告 - ${date}
@@ -9,15 +9,28 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
-import plotly.express as px
-import plotly.graph_objects as go
+import copy
+import hashlib
+import tempfile
+import uuid
 from datetime import datetime, timedelta
 import sys
-import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.trading_processor import TradingProcessor, DividendRecord
+from config.settings import setup_logging
+from core.trading_processor import TradingProcessor
 from core.trading_review import TradingReview
+from core.fx import money_column
+from utils.lazy_import import lazy_import
+from utils.chart_data import (
+    MAX_CATEGORIES, top_n_with_other, top_bottom_n, downsample_series, resample_totals, weekday_hour_matrix
+)
+
+# plotly在第一次绘图时才导入，上传数据前的页面不需要加载
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+
+setup_logging()
 
 # 设置页面配置
 st.set_page_config(
@@ -71,6 +84,756 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+SELL_DIRECTIONS = ['卖出', '卖', 'SELL', 'S']
+
+# ==================== 缓存函数 ====================
+# 处理器按上传文件的内容哈希缓存为资源，同一文件只加载处理一次；缓存的处理器在会话之间共享，
+# 只作为模板，每个会话使用自己的深拷贝，添加分红等修改不会影响其他会话。
+# 派生表格和图表按会话的数据标识(session_data_tag)缓存，数据变化后自动失效。
+# 以下划线开头的参数不参与缓存键的计算。
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_processor(file_hash, _file_bytes):
+    """加载并处理上传的交易数据
+    
+    Args:
+        file_hash: 上传文件内容的sha1哈希，作为缓存键
+        _file_bytes: 上传文件内容
+    
+    Returns:
+        TradingProcessor: 处理完成的处理器
+    """
+    # 写入临时文件，避免覆盖原始文件
+    fd, temp_file_path = tempfile.mkstemp(suffix='.xlsx')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_file_bytes)
+        
+        processor = TradingProcessor()
+        if not processor.load_data(temp_file_path):
+            raise ValueError("数据加载失败！")
+        if not processor.process_data():
+            raise ValueError("数据处理失败！")
+        return processor
+    finally:
+        try:
+            os.remove(temp_file_path)
+        except OSError:
+            pass
+
+
+def session_data_tag(processor):
+    """会话的数据标识
+    
+    未修改时与文件的数据标识相同，同一文件的会话共享派生数据缓存；会话中修改过数据后加上会话ID，
+    不同会话各自的修改不会命中同一缓存。
+    
+    Args:
+        processor: 会话的处理器
+    
+    Returns:
+        str: 派生数据的缓存键
+    """
+    if processor.data_version == st.session_state.loaded_version:
+        return processor.data_tag
+    return f"{processor.data_tag}-{st.session_state.session_id}"
+
+
+@st.cache_data(show_spinner=False)
+def cached_positions(data_tag, _processor):
+    """当前持仓数据"""
+    return _processor.get_current_positions()
+
+
+@st.cache_data(show_spinner=False)
+def cached_stock_pnl(data_tag, _processor):
+    """股票历史盈亏数据"""
+    return _processor.get_stock_historical_pnl()
+
+
+@st.cache_data(show_spinner=False)
+def cached_round_trips(data_tag, _processor):
+    """回合交易明细"""
+    return _processor.get_round_trips()
+
+
+@st.cache_data(show_spinner=False)
+def cached_round_trip_summary(data_tag, _processor):
+    """回合交易统计和持有期分布"""
+    return _processor.get_round_trip_summary(cached_round_trips(data_tag, _processor))
+
+
+@st.cache_data(show_spinner=False)
+def cached_dividend_records(data_tag, _processor):
+    """分红记录"""
+    return _processor.get_dividend_records()
+
+
+@st.cache_data(show_spinner=False)
+def cached_dividend_summary(data_tag, _processor):
+    """分红汇总"""
+    return _processor.get_dividend_summary()
+
+
+@st.cache_data(show_spinner=False)
+def cached_recent_trades(data_tag, _trades_df):
+    """最近5笔交易的显示表格"""
+    recent_trades = _trades_df.sort_values('日期', ascending=False).head(5)
+    
+    # 格式化显示
+    recent_trades_display = recent_trades.copy()
+    recent_trades_display['日期'] = recent_trades_display['日期'].dt.strftime('%Y-%m-%d')
+    recent_trades_display['成交价格'] = recent_trades_display['成交价格'].map('{:.4f}'.format)
+    recent_trades_display['交易金额'] = recent_trades_display['交易金额'].map('{:,.2f}'.format)
+    recent_trades_display['总费用'] = recent_trades_display['总费用'].map('{:.2f}'.format)
+    
+    # 只显示部分列
+    columns_to_show = ['日期', '证券代码', '证券名称', '买卖方向', '成交价格', '成交数量', '交易金额', '总费用']
+    return recent_trades_display[columns_to_show]
+
+
+@st.cache_data(show_spinner=False)
+def cached_trade_stats(data_tag, _trades_df):
+    """交易统计：买入金额、卖出金额和手续费"""
+    is_sell = _trades_df['买卖方向'].isin(SELL_DIRECTIONS)
+    amount = _trades_df[money_column(_trades_df, '交易金额')]
+    return {
+        '总买入金额': float(amount[~is_sell].sum()),
+        '总卖出金额': float(amount[is_sell].sum()),
+        '总手续费': float(_trades_df[money_column(_trades_df, '总费用')].sum())
+    }
+
+
+@st.cache_data(show_spinner=False)
+def cached_daily_trade_summary(data_tag, _trades_df):
+    """按日期汇总的买入金额、卖出金额和费用"""
+    is_sell = _trades_df['买卖方向'].isin(SELL_DIRECTIONS)
+    amount = _trades_df[money_column(_trades_df, '交易金额')]
+    
+    daily_trades = pd.DataFrame({
+        '日期': _trades_df['日期'].dt.date,
+        '买入金额': amount.where(~is_sell, 0),
+        '卖出金额': amount.where(is_sell, 0),
+        '总费用': _trades_df[money_column(_trades_df, '总费用')]
+    })
+    
+    return daily_trades.groupby('日期').agg({
+        '买入金额': 'sum',
+        '卖出金额': 'sum',
+        '总费用': 'sum'
+    }).reset_index()
+
+
+@st.cache_data(show_spinner=False)
+def cached_positions_display(data_tag, _positions_df):
+    """持仓明细显示表格"""
+    positions_display = _positions_df.copy()
+    
+    # 添加盈亏列（如果没有）
+    if '未实现盈亏' not in positions_display.columns:
+        positions_display['未实现盈亏'] = positions_display['持仓市值'] - positions_display['持仓成本总额']
+    
+    if '盈亏比例(%)' not in positions_display.columns:
+        cost_total = positions_display['持仓成本总额']
+        positions_display['盈亏比例(%)'] = np.where(
+            cost_total > 0, positions_display['未实现盈亏'] / cost_total.where(cost_total > 0, 1) * 100, 0
+        )
+    
+    # 格式化数字列
+    numeric_cols = ['持仓成本价', '当前价格', '平均买入价', '平均卖出价']
+    for col in numeric_cols:
+        if col in positions_display.columns:
+            positions_display[col] = positions_display[col].map('{:.4f}'.format)
+    
+    money_cols = ['持仓市值', '持仓成本总额', '未实现盈亏', '买入手续费', '卖出手续费', '总手续费']
+    for col in money_cols:
+        if col in positions_display.columns:
+            positions_display[col] = positions_display[col].map('{:,.2f}'.format)
+    
+    if '盈亏比例(%)' in positions_display.columns:
+        positions_display['盈亏比例(%)'] = positions_display['盈亏比例(%)'].map('{:.2f}%'.format)
+    
+    # 选择要显示的列
+    columns_to_show = [
+        '证券代码', '证券名称', '持仓数量', '持仓成本价', '当前价格',
+        '持仓市值', '持仓成本总额', '未实现盈亏', '盈亏比例(%)',
+        '交易次数', '持有天数'
+    ]
+    
+    # 确保所有列都存在
+    columns_to_show = [col for col in columns_to_show if col in positions_display.columns]
+    return positions_display[columns_to_show]
+
+
+@st.cache_data(show_spinner=False)
+def cached_stock_pnl_display(data_tag, _stock_pnl_df):
+    """股票盈亏明细显示表格"""
+    pnl_display = _stock_pnl_df.copy()
+    
+    # 格式化数字列
+    price_cols = ['当前成本价', '当前价格', '平均买入价', '平均卖出价']
+    for col in price_cols:
+        if col in pnl_display.columns:
+            pnl_display[col] = pnl_display[col].map('{:.4f}'.format)
+    
+    money_cols = ['当前市值', '已实现盈亏', '未实现盈亏', '总盈亏', '买入手续费', '卖出手续费', '总手续费']
+    for col in money_cols:
+        if col in pnl_display.columns:
+            pnl_display[col] = pnl_display[col].map('{:,.2f}'.format)
+    
+    if '盈亏比例(%)' in pnl_display.columns:
+        pnl_display['盈亏比例(%)'] = pnl_display['盈亏比例(%)'].map('{:.2f}%'.format)
+    
+    # 选择要显示的列
+    columns_to_show = [
+        '证券代码', '证券名称', '当前持仓数量', '当前成本价', '当前价格',
+        '当前市值', '已实现盈亏', '未实现盈亏', '总盈亏', '盈亏比例(%)',
+        '交易次数', '总手续费'
+    ]
+    
+    # 确保所有列都存在
+    columns_to_show = [col for col in columns_to_show if col in pnl_display.columns]
+    return pnl_display[columns_to_show]
+
+
+@st.cache_data(show_spinner=False)
+def cached_round_trips_display(data_tag, _trips):
+    """回合交易明细显示表格，最近平仓的回合在前"""
+    trips_display = _trips.sort_values('卖出日期', ascending=False, kind='stable').copy()
+    
+    for col in ['买入日期', '卖出日期']:
+        trips_display[col] = trips_display[col].dt.strftime('%Y-%m-%d')
+    for col in ['买入价格', '卖出价格']:
+        trips_display[col] = trips_display[col].map('{:.4f}'.format)
+    for col in ['买入成本', '卖出金额', '费用', '盈亏']:
+        trips_display[col] = trips_display[col].map('{:,.2f}'.format)
+    trips_display['收益率(%)'] = trips_display['收益率(%)'].map('{:.2f}%'.format)
+    return trips_display
+
+
+@st.cache_data(show_spinner=False)
+def cached_dividend_display(data_tag, _dividend_records):
+    """分红记录显示表格"""
+    dividend_display = _dividend_records.copy()
+    
+    # 格式化日期列
+    if '日期' in dividend_display.columns:
+        dividend_display['日期'] = pd.to_datetime(dividend_display['日期']).dt.strftime('%Y-%m-%d')
+    
+    # 格式化金额列
+    money_cols = ['每股分红', '总分红金额', '税费', '净分红金额']
+    for col in money_cols:
+        if col in dividend_display.columns:
+            dividend_display[col] = dividend_display[col].map('{:,.4f}'.format)
+    
+    return dividend_display
+
+
+@st.cache_data(show_spinner=False)
+def cached_monthly_dividends(data_tag, _dividend_records, period_col='年月'):
+    """按月汇总的分红金额"""
+    dividend_records = _dividend_records.copy()
+    dividend_records[period_col] = pd.to_datetime(dividend_records['日期']).dt.strftime('%Y-%m')
+    
+    return dividend_records.groupby(period_col).agg({
+        '总分红金额': 'sum',
+        '税费': 'sum',
+        '净分红金额': 'sum'
+    }).reset_index()
+
+
+@st.cache_data(show_spinner=False)
+def cached_review_tables(data_tag, _processor, review_date):
+    """复盘日期的交易、盈亏和分红记录"""
+    review = TradingReview(processor=_processor)
+    review.set_review_date(review_date)
+    
+    return {
+        'trades': review.get_daily_trades(),
+        'pnl': review.get_daily_pnl(),
+        'dividends': review.get_daily_dividends()
+    }
+
+
+@st.cache_data(show_spinner=False)
+def cached_review_report(data_tag, _processor, review_date):
+    """复盘日期的复盘报告"""
+    review = TradingReview(processor=_processor)
+    review.set_review_date(review_date)
+    return review.generate_review_report()
+
+
+# ==================== 按需加载 ====================
+# 各页面和可视化类型声明所需的数据集，切换到该页面时才计算，
+# 计算结果在会话内按数据标识记忆，避免st.cache_data每次返回副本的开销。
+
+# 数据集注册表: {名称: (显示名称, 计算函数)}，计算函数参数为 (data_tag, processor, *参数)
+DATASETS = {
+    'positions': ('持仓数据', cached_positions),
+    'stock_pnl': ('股票历史盈亏', cached_stock_pnl),
+    'round_trips': ('回合交易', cached_round_trips),
+    'round_trip_summary': ('回合统计', cached_round_trip_summary),
+    'dividend_records': ('分红记录', cached_dividend_records),
+    'dividend_summary': ('分红汇总', cached_dividend_summary),
+    'trades': ('交易明细', lambda data_tag, processor: processor.trades_df),
+    'review_tables': ('复盘数据', cached_review_tables),
+    'review_report': ('复盘报告', cached_review_report)
+}
+
+# 页面所需的数据集
+TAB_DATASETS = {
+    "概览": ['positions', 'stock_pnl', 'dividend_summary', 'trades'],
+    "持仓分析": ['positions'],
+    "交易明细": ['trades'],
+    "盈亏分析": ['stock_pnl'],
+    "回合交易": ['round_trips', 'round_trip_summary'],
+    "分红记录": ['dividend_records', 'dividend_summary'],
+    "数据可视化": [],
+    "交易复盘": []
+}
+
+# 可视化类型所需的数据集
+VIZ_DATASETS = {
+    "持仓分析": ['positions'],
+    "盈亏分析": ['stock_pnl'],
+    "交易分析": ['trades'],
+    "分红分析": ['dividend_records']
+}
+
+
+def load_datasets(processor, data_tag, names, params=()):
+    """按需计算数据集，已计算过的直接复用
+    
+    需要计算多个数据集时显示进度条。
+    
+    Args:
+        processor: 交易数据处理器
+        data_tag: 数据标识
+        names: 数据集名称列表
+        params: 传给计算函数的额外参数，例如复盘日期
+    
+    Returns:
+        dict: {数据集名称: 数据}
+    """
+    memo = st.session_state.get('datasets')
+    if memo is None or memo.get('_data_tag') != data_tag:
+        memo = {'_data_tag': data_tag}
+        st.session_state.datasets = memo
+    
+    missing = [name for name in names if (name, params) not in memo]
+    if missing:
+        progress = st.progress(0.0) if len(missing) > 1 else None
+        for i, name in enumerate(missing):
+            label, compute = DATASETS[name]
+            if progress is not None:
+                progress.progress(i / len(missing), text=f"正在计算{label}...")
+                memo[(name, params)] = compute(data_tag, processor, *params)
+            else:
+                with st.spinner(f"正在计算{label}..."):
+                    memo[(name, params)] = compute(data_tag, processor, *params)
+        if progress is not None:
+            progress.empty()
+    
+    return {name: memo[(name, params)] for name in names}
+
+
+# ==================== 图表函数 ====================
+# 图表数据先在服务端聚合，每个图表的点数有上限，与股票数量和交易天数无关
+
+# 重新汇总后的周期名称
+PERIOD_NAMES = {'W-MON': '每周', 'MS': '每月', 'QS': '每季度', 'YS': '每年'}
+
+@st.cache_data(show_spinner=False)
+def fig_positions_value_pie(data_tag, _positions_df):
+    """持仓市值分布饼图（前N只股票，其余合并为"其他"）"""
+    fig = px.pie(
+        top_n_with_other(_positions_df, '证券名称', '持仓市值'),
+        values='持仓市值',
+        names='证券名称',
+        title='持仓市值分布',
+        hole=0.4,
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(height=400)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_profit_loss_pie(data_tag, _stock_pnl_df):
+    """盈亏分布饼图"""
+    pnl_col = money_column(_stock_pnl_df, '总盈亏')
+    profit_stocks = _stock_pnl_df[_stock_pnl_df[pnl_col] > 0]
+    loss_stocks = _stock_pnl_df[_stock_pnl_df[pnl_col] < 0]
+    
+    profit_loss_df = pd.DataFrame([
+        {'类型': '盈利股票', '数量': len(profit_stocks), '金额': profit_stocks[pnl_col].sum()},
+        {'类型': '亏损股票', '数量': len(loss_stocks), '金额': abs(loss_stocks[pnl_col].sum())}
+    ])
+    
+    fig = px.pie(
+        profit_loss_df,
+        values='金额',
+        names='类型',
+        title='盈亏分布',
+        hole=0.4,
+        color_discrete_sequence=['#4CAF50', '#F44336']
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(height=400)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_positions_value_bar(data_tag, _positions_df):
+    """持仓市值分布条形图（前N只股票，其余合并为"其他"）"""
+    positions_sorted = top_n_with_other(_positions_df, '证券名称', '持仓市值')
+    
+    fig = px.bar(
+        positions_sorted,
+        x='证券名称',
+        y='持仓市值',
+        title='持仓市值分布',
+        color='证券名称',
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+    fig.update_layout(xaxis_title="", yaxis_title="市值", height=400)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_signed_bar(data_tag, _df, value_col, title, x_col='证券名称'):
+    """按数值正负着色的排名条形图（只显示两端各N项）"""
+    df_sorted = top_bottom_n(_df, value_col)
+    
+    colors = ['#4CAF50' if x >= 0 else '#F44336' for x in df_sorted[value_col]]
+    
+    fig = px.bar(
+        df_sorted,
+        x=x_col,
+        y=value_col,
+        title=title,
+        color=x_col,
+        color_discrete_sequence=colors
+    )
+    fig.update_layout(xaxis_title="", yaxis_title=value_col, height=400)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_daily_trade_trend(data_tag, _daily_summary):
+    """每日交易金额和费用趋势图，天数过多时按周、月等周期汇总"""
+    _daily_summary, freq = resample_totals(_daily_summary, '日期', ['买入金额', '卖出金额', '总费用'])
+    period_name = PERIOD_NAMES.get(freq, '每日')
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=_daily_summary['日期'],
+        y=_daily_summary['买入金额'],
+        name='买入金额',
+        marker_color='#FF9999'
+    ))
+    
+    fig.add_trace(go.Bar(
+        x=_daily_summary['日期'],
+        y=_daily_summary['卖出金额'],
+        name='卖出金额',
+        marker_color='#99CC99'
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=_daily_summary['日期'],
+        y=_daily_summary['总费用'],
+        name='总费用',
+        marker_color='#666666',
+        yaxis='y2'
+    ))
+    
+    fig.update_layout(
+        title=f'{period_name}交易金额和费用',
+        xaxis_title='日期',
+        yaxis_title='交易金额',
+        yaxis2=dict(
+            title='费用',
+            overlaying='y',
+            side='right'
+        ),
+        barmode='group',
+        height=500
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_monthly_dividend_bar(data_tag, _monthly_dividends):
+    """月度分红趋势图"""
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=_monthly_dividends['年月'],
+        y=_monthly_dividends['净分红金额'],
+        name='净分红金额',
+        marker_color='#4CAF50'
+    ))
+    
+    fig.add_trace(go.Bar(
+        x=_monthly_dividends['年月'],
+        y=_monthly_dividends['税费'],
+        name='税费',
+        marker_color='#F44336'
+    ))
+    
+    fig.update_layout(
+        title='月度分红趋势',
+        xaxis_title='年月',
+        yaxis_title='金额',
+        barmode='stack',
+        height=400
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_dividend_share_pie(data_tag, _dividend_records, title='各股票分红占比', hole=0.4, height=None):
+    """各股票分红占比饼图（前N只股票，其余合并为"其他"）"""
+    stock_dividends = top_n_with_other(_dividend_records, '证券名称', '净分红金额')
+    
+    fig = px.pie(
+        stock_dividends,
+        values='净分红金额',
+        names='证券名称',
+        title=title,
+        hole=hole,
+        color_discrete_sequence=px.colors.sequential.Greens
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    if height:
+        fig.update_layout(height=height)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_positions_treemap(data_tag, _positions_df):
+    """持仓市值树状图（前N只股票，其余合并为"其他"）"""
+    fig = px.treemap(
+        top_n_with_other(_positions_df, '证券名称', '持仓市值'),
+        path=['证券名称'],
+        values='持仓市值',
+        color='持仓市值',
+        color_continuous_scale='Blues',
+        title='持仓市值树状图'
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_grouped_bar(data_tag, _df, sort_col, series, title, yaxis_title):
+    """分组对比条形图
+    
+    Args:
+        series: [(列名, 图例名称, 颜色), ...]
+    """
+    df_sorted = top_n_with_other(_df, '证券名称', sort_col, sum_cols=[col for col, _, _ in series])
+    
+    fig = go.Figure()
+    
+    for col, name, color in series:
+        fig.add_trace(go.Bar(
+            x=df_sorted['证券名称'],
+            y=df_sorted[col],
+            name=name,
+            marker_color=color
+        ))
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title='',
+        yaxis_title=yaxis_title,
+        barmode='group',
+        height=500
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_pnl_waterfall(data_tag, _stock_pnl_df):
+    """前10只股票盈亏瀑布图"""
+    pnl_col = money_column(_stock_pnl_df, '总盈亏')
+    pnl_waterfall = _stock_pnl_df.sort_values(pnl_col, ascending=False).head(10)
+    
+    fig = go.Figure(go.Waterfall(
+        name="盈亏瀑布图",
+        orientation="v",
+        measure=["relative"] * len(pnl_waterfall),
+        x=pnl_waterfall['证券名称'],
+        y=pnl_waterfall[pnl_col],
+        connector={"line": {"color": "rgb(63, 63, 63)"}},
+        increasing={"marker": {"color": "#4CAF50"}},
+        decreasing={"marker": {"color": "#F44336"}}
+    ))
+    
+    fig.update_layout(
+        title="前10只股票盈亏瀑布图",
+        xaxis_title="",
+        yaxis_title="总盈亏",
+        height=500
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_pnl_scatter(data_tag, _stock_pnl_df):
+    """盈亏金额与比例散点图（只显示盈亏绝对值最大的股票）"""
+    max_points = MAX_CATEGORIES * 2
+    if len(_stock_pnl_df) > max_points:
+        _stock_pnl_df = _stock_pnl_df.loc[_stock_pnl_df['总盈亏'].abs().nlargest(max_points).index]
+    
+    fig = px.scatter(
+        _stock_pnl_df,
+        x='总盈亏',
+        y='盈亏比例(%)',
+        size='当前市值',
+        color='证券名称',
+        hover_name='证券名称',
+        title='盈亏金额与比例散点图'
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_holding_distribution(data_tag, _distribution):
+    """持有期分布图：各持有期的回合数和胜率"""
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=_distribution['持有期'],
+        y=_distribution['回合数'],
+        name='回合数',
+        marker_color='#2196F3'
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=_distribution['持有期'],
+        y=_distribution['胜率(%)'],
+        mode='lines+markers',
+        name='胜率(%)',
+        line=dict(color='#4CAF50', width=3),
+        yaxis='y2'
+    ))
+    
+    fig.update_layout(
+        title='持有期分布',
+        xaxis_title='持有期',
+        yaxis_title='回合数',
+        yaxis2=dict(
+            title='胜率(%)',
+            overlaying='y',
+            side='right',
+            range=[0, 100]
+        ),
+        height=400
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_trade_heatmap(data_tag, _trades_df):
+    """交易频率热力图，按星期和小时预先分箱"""
+    trade_counts = weekday_hour_matrix(_trades_df['日期'])
+    
+    # 创建热力图
+    fig = go.Figure(go.Heatmap(
+        z=trade_counts.values,
+        x=trade_counts.columns,
+        y=trade_counts.index,
+        colorscale='Viridis',
+        colorbar=dict(title='交易次数')
+    ))
+    fig.update_layout(title='交易频率热力图', xaxis_title='小时', yaxis_title='星期', height=500)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_monthly_trade_trend(data_tag, _trades_df):
+    """月度交易金额与费用趋势图"""
+    monthly_trades = pd.DataFrame({
+        '月份': pd.to_datetime(_trades_df['日期']).dt.strftime('%Y-%m'),
+        '交易金额': _trades_df[money_column(_trades_df, '交易金额')],
+        '总费用': _trades_df[money_column(_trades_df, '总费用')]
+    }).groupby('月份').agg({
+        '交易金额': 'sum',
+        '总费用': 'sum'
+    }).reset_index()
+    monthly_trades = downsample_series(monthly_trades, '月份', ['交易金额', '总费用'])
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=monthly_trades['月份'],
+        y=monthly_trades['交易金额'],
+        mode='lines+markers',
+        name='交易金额',
+        line=dict(color='#2196F3', width=3)
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=monthly_trades['月份'],
+        y=monthly_trades['总费用'],
+        mode='lines+markers',
+        name='总费用',
+        line=dict(color='#F44336', width=2),
+        yaxis='y2'
+    ))
+    
+    fig.update_layout(
+        title='月度交易金额与费用趋势',
+        xaxis_title='月份',
+        yaxis_title='交易金额',
+        yaxis2=dict(
+            title='费用',
+            overlaying='y',
+            side='right'
+        ),
+        height=500
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def fig_monthly_dividend_line(data_tag, _monthly_dividends):
+    """月度分红金额趋势图"""
+    _monthly_dividends = downsample_series(_monthly_dividends, '月份', ['净分红金额', '税费'])
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=_monthly_dividends['月份'],
+        y=_monthly_dividends['净分红金额'],
+        mode='lines+markers',
+        name='净分红金额',
+        line=dict(color='#4CAF50', width=3)
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=_monthly_dividends['月份'],
+        y=_monthly_dividends['税费'],
+        mode='lines+markers',
+        name='税费',
+        line=dict(color='#F44336', width=2)
+    ))
+    
+    fig.update_layout(
+        title='月度分红金额趋势',
+        xaxis_title='月份',
+        yaxis_title='金额',
+        height=500
+    )
+    return fig
+
+
 # 初始化会话状态
 if 'processor' not in st.session_state:
     st.session_state.processor = None
@@ -78,6 +841,10 @@ if 'data_loaded' not in st.session_state:
     st.session_state.data_loaded = False
 if 'current_tab' not in st.session_state:
     st.session_state.current_tab = "概览"
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'loaded_version' not in st.session_state:
+    st.session_state.loaded_version = None
 
 # 主标题
 st.markdown('<h1 class="main-header">交易数据分析仪表盘</h1>', unsafe_allow_html=True)
@@ -90,44 +857,25 @@ with st.sidebar:
     uploaded_file = st.file_uploader("上传交易数据Excel文件", type=["xlsx"])
     
     if uploaded_file is not None:
-        # 使用临时文件名，避免覆盖原始文件
-        temp_file_path = os.path.join("data", f"temp_upload_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx")
-        
-        # 确保data目录存在
-        os.makedirs("data", exist_ok=True)
-        
-        # 保存上传的文件到临时位置
-        with open(temp_file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        
         # 加载数据
         if st.button("加载数据"):
             with st.spinner("正在加载数据..."):
-                # 创建交易数据处理器
-                processor = TradingProcessor()
-                
-                # 加载数据
-                if processor.load_data(temp_file_path):
-                    # 处理数据
-                    if processor.process_data():
-                        st.session_state.processor = processor
-                        st.session_state.data_loaded = True
-                        st.success("数据加载成功！")
-                    else:
-                        st.error("数据处理失败！")
-                else:
-                    st.error("数据加载失败！")
+                file_bytes = uploaded_file.getvalue()
+                file_hash = hashlib.sha1(file_bytes).hexdigest()
                 
-                # 加载完成后删除临时文件
                 try:
-                    os.remove(temp_file_path)
-                    st.info(f"临时文件已删除，原始文件未被修改")
-                except:
-                    pass
+                    # 同一文件的处理结果已缓存，重复加载直接复用；会话使用深拷贝，重新加载即恢复文件中的数据
+                    st.session_state.processor = copy.deepcopy(load_processor(file_hash, file_bytes))
+                    st.session_state.loaded_version = st.session_state.processor.data_version
+                    st.session_state.data_loaded = True
+                    st.success("数据加载成功！")
+                    st.info("原始文件未被修改")
+                except ValueError as e:
+                    st.error(str(e))
     
     # 导航菜单
     st.header("导航")
-    tabs = ["概览", "持仓分析", "交易明细", "盈亏分析", "分红记录", "数据可视化", "交易复盘"]
+    tabs = ["概览", "持仓分析", "交易明细", "盈亏分析", "回合交易", "分红记录", "数据可视化", "交易复盘"]
     selected_tab = st.radio("选择页面", tabs)
     st.session_state.current_tab = selected_tab
     
@@ -137,11 +885,11 @@ with st.sidebar:
         with st.form("add_dividend_form"):
             col1, col2 = st.columns(2)
             with col1:
-                dividend_date = st.date_input("分红日期", datetime.now())
+                dividend_date = st.date_input("除息日", datetime.now())
                 symbol = st.text_input("证券代码")
                 name = st.text_input("证券名称")
             with col2:
-                shares = st.number_input("持有数量", min_value=0, value=100)
+                shares = st.number_input("持有数量", min_value=0, value=0, help="为0时按除息日前一个交易日的持仓计算")
                 dividend_per_share = st.number_input("每股分红", min_value=0.0, value=0.1, format="%.4f")
                 tax = st.number_input("税费", min_value=0.0, value=0.0, format="%.2f")
             
@@ -155,6 +903,15 @@ with st.sidebar:
                     st.success(f"成功添加 {name}({symbol}) 的分红记录")
                 else:
                     st.error("添加分红记录失败")
+    
+    # 运行统计：数据处理和各页面汇总的阶段耗时
+    if st.session_state.data_loaded:
+        with st.expander("⏱️ 运行统计"):
+            run_report = st.session_state.processor.run_report
+            summary = run_report.to_dict()
+            peak = f"，内存峰值 {summary['peak_mb']:.0f} MB" if summary['peak_mb'] is not None else ""
+            st.caption(f"累计耗时 {summary['total_seconds']:.2f} 秒{peak}")
+            st.dataframe(run_report.to_frame(), hide_index=True)
 
 # 主内容区域
 if not st.session_state.data_loaded:
@@ -162,14 +919,21 @@ if not st.session_state.data_loaded:
 else:
     processor = st.session_state.processor
     
+    # 数据标识，派生数据的缓存键
+    data_tag = session_data_tag(processor)
+    
+    # 只计算当前页面需要的数据集
+    data = load_datasets(processor, data_tag, TAB_DATASETS[st.session_state.current_tab])
+    
     # 概览页面
     if st.session_state.current_tab == "概览":
         st.markdown('<h2 class="sub-header">交易数据概览</h2>', unsafe_allow_html=True)
         
         # 获取数据
-        positions_df = processor.get_current_positions()
-        stock_pnl_df = processor.get_stock_historical_pnl()
-        dividend_summary = processor.get_dividend_summary()
+        positions_df = data['positions']
+        stock_pnl_df = data['stock_pnl']
+        dividend_summary = data['dividend_summary']
+        trades_df = data['trades']
         
         # 创建概览指标
         col1, col2, col3, col4 = st.columns(4)
@@ -181,14 +945,14 @@ else:
             )
         
         with col2:
-            total_market_value = positions_df['持仓市值'].sum() if not positions_df.empty else 0
+            total_market_value = positions_df[money_column(positions_df, '持仓市值')].sum() if not positions_df.empty else 0
             st.metric(
                 label="总持仓市值", 
                 value=f"{total_market_value:,.2f}"
             )
         
         with col3:
-            total_pnl = stock_pnl_df['总盈亏'].sum() if not stock_pnl_df.empty else 0
+            total_pnl = stock_pnl_df[money_column(stock_pnl_df, '总盈亏')].sum() if not stock_pnl_df.empty else 0
             delta = f"{total_pnl/total_market_value*100:.2f}%" if total_market_value > 0 else "0.00%"
             st.metric(
                 label="总盈亏", 
@@ -212,71 +976,31 @@ else:
             
             with col1:
                 # 按市值分布
-                fig = px.pie(
-                    positions_df, 
-                    values='持仓市值', 
-                    names='证券名称',
-                    title='持仓市值分布',
-                    hole=0.4,
-                    color_discrete_sequence=px.colors.qualitative.Pastel
-                )
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig_positions_value_pie(data_tag, positions_df), use_container_width=True)
             
             with col2:
                 # 按盈亏分布
                 if '总盈亏' in stock_pnl_df.columns:
-                    profit_stocks = stock_pnl_df[stock_pnl_df['总盈亏'] > 0]
-                    loss_stocks = stock_pnl_df[stock_pnl_df['总盈亏'] < 0]
-                    
-                    profit_loss_df = pd.DataFrame([
-                        {'类型': '盈利股票', '数量': len(profit_stocks), '金额': profit_stocks['总盈亏'].sum()},
-                        {'类型': '亏损股票', '数量': len(loss_stocks), '金额': abs(loss_stocks['总盈亏'].sum())}
-                    ])
-                    
-                    fig = px.pie(
-                        profit_loss_df, 
-                        values='金额', 
-                        names='类型',
-                        title='盈亏分布',
-                        hole=0.4,
-                        color_discrete_sequence=['#4CAF50', '#F44336']
-                    )
-                    fig.update_traces(textposition='inside', textinfo='percent+label')
-                    fig.update_layout(height=400)
-                    st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(fig_profit_loss_pie(data_tag, stock_pnl_df), use_container_width=True)
         
         # 最近交易
-        if processor.trades_df is not None and not processor.trades_df.empty:
+        if trades_df is not None and not trades_df.empty:
             st.markdown('<h3 class="sub-header">最近交易</h3>', unsafe_allow_html=True)
-            
-            recent_trades = processor.trades_df.sort_values('日期', ascending=False).head(5)
-            
-            # 格式化显示
-            recent_trades_display = recent_trades.copy()
-            recent_trades_display['日期'] = recent_trades_display['日期'].dt.strftime('%Y-%m-%d')
-            recent_trades_display['成交价格'] = recent_trades_display['成交价格'].map('{:.4f}'.format)
-            recent_trades_display['交易金额'] = recent_trades_display['交易金额'].map('{:,.2f}'.format)
-            recent_trades_display['总费用'] = recent_trades_display['总费用'].map('{:.2f}'.format)
-            
-            # 只显示部分列
-            columns_to_show = ['日期', '证券代码', '证券名称', '买卖方向', '成交价格', '成交数量', '交易金额', '总费用']
-            st.dataframe(recent_trades_display[columns_to_show], use_container_width=True)
+            st.dataframe(cached_recent_trades(data_tag, trades_df), use_container_width=True)
     
     # 持仓分析页面
     elif st.session_state.current_tab == "持仓分析":
         st.markdown('<h2 class="sub-header">持仓分析</h2>', unsafe_allow_html=True)
         
         # 获取持仓数据
-        positions_df = processor.get_current_positions()
+        positions_df = data['positions']
         
         if positions_df.empty:
             st.info("当前没有持仓数据")
         else:
             # 持仓概览
-            total_market_value = positions_df['持仓市值'].sum()
-            total_cost = positions_df['持仓成本总额'].sum()
+            total_market_value = positions_df[money_column(positions_df, '持仓市值')].sum()
+            total_cost = positions_df[money_column(positions_df, '持仓成本总额')].sum()
             unrealized_pnl = total_market_value - total_cost
             pnl_ratio = (unrealized_pnl / total_cost * 100) if total_cost > 0 else 0
             
@@ -310,46 +1034,7 @@ else:
             
             # 持仓明细表格
             st.markdown('<h3 class="sub-header">持仓明细</h3>', unsafe_allow_html=True)
-            
-            # 格式化显示
-            positions_display = positions_df.copy()
-            
-            # 添加盈亏列（如果没有）
-            if '未实现盈亏' not in positions_display.columns:
-                positions_display['未实现盈亏'] = positions_display['持仓市值'] - positions_display['持仓成本总额']
-            
-            if '盈亏比例(%)' not in positions_display.columns:
-                positions_display['盈亏比例(%)'] = positions_display.apply(
-                    lambda x: (x['未实现盈亏'] / x['持仓成本总额'] * 100) if x['持仓成本总额'] > 0 else 0, 
-                    axis=1
-                )
-            
-            # 格式化数字列
-            numeric_cols = ['持仓成本价', '当前价格', '平均买入价', '平均卖出价']
-            for col in numeric_cols:
-                if col in positions_display.columns:
-                    positions_display[col] = positions_display[col].map('{:.4f}'.format)
-            
-            money_cols = ['持仓市值', '持仓成本总额', '未实现盈亏', '买入手续费', '卖出手续费', '总手续费']
-            for col in money_cols:
-                if col in positions_display.columns:
-                    positions_display[col] = positions_display[col].map('{:,.2f}'.format)
-            
-            if '盈亏比例(%)' in positions_display.columns:
-                positions_display['盈亏比例(%)'] = positions_display['盈亏比例(%)'].map('{:.2f}%'.format)
-            
-            # 选择要显示的列
-            columns_to_show = [
-                '证券代码', '证券名称', '持仓数量', '持仓成本价', '当前价格', 
-                '持仓市值', '持仓成本总额', '未实现盈亏', '盈亏比例(%)', 
-                '交易次数', '持有天数'
-            ]
-            
-            # 确保所有列都存在
-            columns_to_show = [col for col in columns_to_show if col in positions_display.columns]
-            
-            # 显示表格
-            st.dataframe(positions_display[columns_to_show], use_container_width=True)
+            st.dataframe(cached_positions_display(data_tag, positions_df), use_container_width=True)
             
             # 持仓市值分布图
             st.markdown('<h3 class="sub-header">持仓市值分布</h3>', unsafe_allow_html=True)
@@ -358,58 +1043,29 @@ else:
             
             with col1:
                 # 按市值排序的条形图
-                positions_sorted = positions_df.sort_values('持仓市值', ascending=False)
-                
-                fig = px.bar(
-                    positions_sorted,
-                    x='证券名称',
-                    y='持仓市值',
-                    title='持仓市值分布',
-                    color='证券名称',
-                    color_discrete_sequence=px.colors.qualitative.Pastel
-                )
-                fig.update_layout(xaxis_title="", yaxis_title="市值", height=400)
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig_positions_value_bar(data_tag, positions_df), use_container_width=True)
             
             with col2:
                 # 盈亏分布图
                 if '未实现盈亏' not in positions_df.columns:
                     positions_df['未实现盈亏'] = positions_df['持仓市值'] - positions_df['持仓成本总额']
                 
-                positions_sorted = positions_df.sort_values('未实现盈亏')
-                
-                colors = ['#4CAF50' if x >= 0 else '#F44336' for x in positions_sorted['未实现盈亏']]
-                
-                fig = px.bar(
-                    positions_sorted,
-                    x='证券名称',
-                    y='未实现盈亏',
-                    title='持仓盈亏分布',
-                    color='证券名称',
-                    color_discrete_sequence=colors
+                st.plotly_chart(
+                    fig_signed_bar(data_tag, positions_df, '未实现盈亏', '持仓盈亏分布'),
+                    use_container_width=True
                 )
-                fig.update_layout(xaxis_title="", yaxis_title="未实现盈亏", height=400)
-                st.plotly_chart(fig, use_container_width=True)
     
     # 交易明细页面
     elif st.session_state.current_tab == "交易明细":
         st.markdown('<h2 class="sub-header">交易明细</h2>', unsafe_allow_html=True)
         
-        if processor.trades_df is None or processor.trades_df.empty:
+        trades_df = data['trades']
+        
+        if trades_df is None or trades_df.empty:
             st.info("没有交易数据")
         else:
             # 交易统计
-            trades_df = processor.trades_df
-            
-            # 买入和卖出交易
-            buy_trades = trades_df[~trades_df['买卖方向'].isin(['卖出', '卖', 'SELL', 'S'])]
-            sell_trades = trades_df[trades_df['买卖方向'].isin(['卖出', '卖', 'SELL', 'S'])]
-            
-            # 交易统计
-            total_buy_amount = (buy_trades['成交价格'] * buy_trades['成交数量']).sum()
-            total_sell_amount = (sell_trades['成交价格'] * sell_trades['成交数量']).sum()
-            total_buy_fee = buy_trades['总费用'].sum()
-            total_sell_fee = sell_trades['总费用'].sum()
+            trade_stats = cached_trade_stats(data_tag, trades_df)
             
             col1, col2, col3, col4 = st.columns(4)
             
@@ -422,19 +1078,19 @@ else:
             with col2:
                 st.metric(
                     label="总买入金额", 
-                    value=f"{total_buy_amount:,.2f}"
+                    value=f"{trade_stats['总买入金额']:,.2f}"
                 )
             
             with col3:
                 st.metric(
                     label="总卖出金额", 
-                    value=f"{total_sell_amount:,.2f}"
+                    value=f"{trade_stats['总卖出金额']:,.2f}"
                 )
             
             with col4:
                 st.metric(
                     label="总手续费", 
-                    value=f"{total_buy_fee + total_sell_fee:,.2f}"
+                    value=f"{trade_stats['总手续费']:,.2f}"
                 )
             
             # 交易过滤器
@@ -462,34 +1118,45 @@ else:
                 )
             
             # 应用过滤器
-            filtered_trades = trades_df.copy()
+            mask = pd.Series(True, index=trades_df.index)
             
             # 按证券代码或名称过滤
             if search_term:
-                filtered_trades = filtered_trades[
-                    filtered_trades['证券代码'].str.contains(search_term) | 
-                    filtered_trades['证券名称'].str.contains(search_term)
-                ]
+                mask &= (
+                    trades_df['证券代码'].str.contains(search_term, regex=False) |
+                    trades_df['证券名称'].str.contains(search_term, regex=False)
+                )
             
             # 按交易方向过滤
             if selected_direction == "买入":
-                filtered_trades = filtered_trades[~filtered_trades['买卖方向'].isin(['卖出', '卖', 'SELL', 'S'])]
+                mask &= ~trades_df['买卖方向'].isin(SELL_DIRECTIONS)
             elif selected_direction == "卖出":
-                filtered_trades = filtered_trades[filtered_trades['买卖方向'].isin(['卖出', '卖', 'SELL', 'S'])]
+                mask &= trades_df['买卖方向'].isin(SELL_DIRECTIONS)
             
             # 按日期范围过滤
             if len(date_range) == 2:
                 start_date, end_date = date_range
-                filtered_trades = filtered_trades[
-                    (filtered_trades['日期'].dt.date >= start_date) & 
-                    (filtered_trades['日期'].dt.date <= end_date)
-                ]
+                mask &= (
+                    (trades_df['日期'] >= pd.Timestamp(start_date)) &
+                    (trades_df['日期'] < pd.Timestamp(end_date) + pd.Timedelta(days=1))
+                )
+            
+            filtered_trades = trades_df[mask]
             
             # 显示过滤后的交易明细
             st.markdown('<h3 class="sub-header">交易明细表格</h3>', unsafe_allow_html=True)
             
+            # 选择要显示的列
+            columns_to_show = [
+                '日期', '证券代码', '证券名称', '买卖方向', '成交价格',
+                '成交数量', '交易金额', '手续费', '印花税', '总费用'
+            ]
+            
+            # 确保所有列都存在
+            columns_to_show = [col for col in columns_to_show if col in filtered_trades.columns]
+            
             # 格式化显示
-            trades_display = filtered_trades.copy()
+            trades_display = filtered_trades[columns_to_show].copy()
             trades_display['日期'] = trades_display['日期'].dt.strftime('%Y-%m-%d')
             trades_display['成交价格'] = trades_display['成交价格'].map('{:.4f}'.format)
             trades_display['交易金额'] = trades_display['交易金额'].map('{:,.2f}'.format)
@@ -499,93 +1166,30 @@ else:
                 if col in trades_display.columns:
                     trades_display[col] = trades_display[col].map('{:.2f}'.format)
             
-            # 选择要显示的列
-            columns_to_show = [
-                '日期', '证券代码', '证券名称', '买卖方向', '成交价格', 
-                '成交数量', '交易金额', '手续费', '印花税', '总费用'
-            ]
-            
-            # 确保所有列都存在
-            columns_to_show = [col for col in columns_to_show if col in trades_display.columns]
-            
             # 显示表格
-            st.dataframe(trades_display[columns_to_show], use_container_width=True)
+            st.dataframe(trades_display, use_container_width=True)
             
             # 交易趋势图
             st.markdown('<h3 class="sub-header">交易趋势</h3>', unsafe_allow_html=True)
             
             # 按日期汇总交易
-            daily_trades = trades_df.copy()
-            daily_trades['日期'] = daily_trades['日期'].dt.date
-            daily_trades['买入金额'] = daily_trades.apply(
-                lambda x: x['成交价格'] * x['成交数量'] if x['买卖方向'] not in ['卖出', '卖', 'SELL', 'S'] else 0, 
-                axis=1
-            )
-            daily_trades['卖出金额'] = daily_trades.apply(
-                lambda x: x['成交价格'] * x['成交数量'] if x['买卖方向'] in ['卖出', '卖', 'SELL', 'S'] else 0, 
-                axis=1
-            )
-            
-            daily_summary = daily_trades.groupby('日期').agg({
-                '买入金额': 'sum',
-                '卖出金额': 'sum',
-                '总费用': 'sum'
-            }).reset_index()
-            
-            # 创建趋势图
-            fig = go.Figure()
-            
-            fig.add_trace(go.Bar(
-                x=daily_summary['日期'],
-                y=daily_summary['买入金额'],
-                name='买入金额',
-                marker_color='#FF9999'
-            ))
-            
-            fig.add_trace(go.Bar(
-                x=daily_summary['日期'],
-                y=daily_summary['卖出金额'],
-                name='卖出金额',
-                marker_color='#99CC99'
-            ))
-            
-            fig.add_trace(go.Scatter(
-                x=daily_summary['日期'],
-                y=daily_summary['总费用'],
-                name='总费用',
-                marker_color='#666666',
-                yaxis='y2'
-            ))
-            
-            fig.update_layout(
-                title='每日交易金额和费用',
-                xaxis_title='日期',
-                yaxis_title='交易金额',
-                yaxis2=dict(
-                    title='费用',
-                    overlaying='y',
-                    side='right'
-                ),
-                barmode='group',
-                height=500
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            daily_summary = cached_daily_trade_summary(data_tag, trades_df)
+            st.plotly_chart(fig_daily_trade_trend(data_tag, daily_summary), use_container_width=True)
     
     # 盈亏分析页面
     elif st.session_state.current_tab == "盈亏分析":
         st.markdown('<h2 class="sub-header">盈亏分析</h2>', unsafe_allow_html=True)
         
         # 获取股票历史盈亏数据
-        stock_pnl_df = processor.get_stock_historical_pnl()
+        stock_pnl_df = data['stock_pnl']
         
         if stock_pnl_df.empty:
             st.info("没有盈亏数据")
         else:
             # 盈亏概览
-            total_realized_pnl = stock_pnl_df['已实现盈亏'].sum()
-            total_unrealized_pnl = stock_pnl_df['未实现盈亏'].sum()
-            total_pnl = stock_pnl_df['总盈亏'].sum()
+            total_realized_pnl = stock_pnl_df[money_column(stock_pnl_df, '已实现盈亏')].sum()
+            total_unrealized_pnl = stock_pnl_df[money_column(stock_pnl_df, '未实现盈亏')].sum()
+            total_pnl = stock_pnl_df[money_column(stock_pnl_df, '总盈亏')].sum()
             
             col1, col2, col3, col4 = st.columns(4)
             
@@ -621,36 +1225,7 @@ else:
             
             # 盈亏明细表格
             st.markdown('<h3 class="sub-header">股票盈亏明细</h3>', unsafe_allow_html=True)
-            
-            # 格式化显示
-            pnl_display = stock_pnl_df.copy()
-            
-            # 格式化数字列
-            price_cols = ['当前成本价', '当前价格', '平均买入价', '平均卖出价']
-            for col in price_cols:
-                if col in pnl_display.columns:
-                    pnl_display[col] = pnl_display[col].map('{:.4f}'.format)
-            
-            money_cols = ['当前市值', '已实现盈亏', '未实现盈亏', '总盈亏', '买入手续费', '卖出手续费', '总手续费']
-            for col in money_cols:
-                if col in pnl_display.columns:
-                    pnl_display[col] = pnl_display[col].map('{:,.2f}'.format)
-            
-            if '盈亏比例(%)' in pnl_display.columns:
-                pnl_display['盈亏比例(%)'] = pnl_display['盈亏比例(%)'].map('{:.2f}%'.format)
-            
-            # 选择要显示的列
-            columns_to_show = [
-                '证券代码', '证券名称', '当前持仓数量', '当前成本价', '当前价格', 
-                '当前市值', '已实现盈亏', '未实现盈亏', '总盈亏', '盈亏比例(%)', 
-                '交易次数', '总手续费'
-            ]
-            
-            # 确保所有列都存在
-            columns_to_show = [col for col in columns_to_show if col in pnl_display.columns]
-            
-            # 显示表格
-            st.dataframe(pnl_display[columns_to_show], use_container_width=True)
+            st.dataframe(cached_stock_pnl_display(data_tag, stock_pnl_df), use_container_width=True)
             
             # 盈亏分布图
             st.markdown('<h3 class="sub-header">盈亏分布</h3>', unsafe_allow_html=True)
@@ -659,46 +1234,81 @@ else:
             
             with col1:
                 # 总盈亏排名
-                pnl_sorted = stock_pnl_df.sort_values('总盈亏')
-                
-                colors = ['#4CAF50' if x >= 0 else '#F44336' for x in pnl_sorted['总盈亏']]
-                
-                fig = px.bar(
-                    pnl_sorted,
-                    x='证券名称',
-                    y='总盈亏',
-                    title='股票总盈亏排名',
-                    color='证券名称',
-                    color_discrete_sequence=colors
+                st.plotly_chart(
+                    fig_signed_bar(data_tag, stock_pnl_df, money_column(stock_pnl_df, '总盈亏'), '股票总盈亏排名'),
+                    use_container_width=True
                 )
-                fig.update_layout(xaxis_title="", yaxis_title="总盈亏", height=400)
-                st.plotly_chart(fig, use_container_width=True)
             
             with col2:
                 # 盈亏比例分布
                 if '盈亏比例(%)' in stock_pnl_df.columns:
-                    pnl_ratio_sorted = stock_pnl_df.sort_values('盈亏比例(%)')
-                    
-                    colors = ['#4CAF50' if x >= 0 else '#F44336' for x in pnl_ratio_sorted['盈亏比例(%)']]
-                    
-                    fig = px.bar(
-                        pnl_ratio_sorted,
-                        x='证券名称',
-                        y='盈亏比例(%)',
-                        title='股票盈亏比例排名',
-                        color='证券名称',
-                        color_discrete_sequence=colors
+                    st.plotly_chart(
+                        fig_signed_bar(data_tag, stock_pnl_df, '盈亏比例(%)', '股票盈亏比例排名'),
+                        use_container_width=True
                     )
-                    fig.update_layout(xaxis_title="", yaxis_title="盈亏比例(%)", height=400)
-                    st.plotly_chart(fig, use_container_width=True)
+    
+    # 回合交易页面
+    elif st.session_state.current_tab == "回合交易":
+        st.markdown('<h2 class="sub-header">回合交易</h2>', unsafe_allow_html=True)
+        
+        # 按先进先出配对的回合交易
+        trips_df = data['round_trips']
+        summary_df, distribution_df = data['round_trip_summary']
+        
+        if trips_df.empty:
+            st.info("没有已平仓的回合交易")
+        else:
+            # 全部回合的合计行
+            total = summary_df.iloc[-1]
+            
+            col1, col2, col3, col4, col5 = st.columns(5)
+            
+            with col1:
+                st.metric(label="回合数", value=int(total['回合数']))
+            
+            with col2:
+                st.metric(label="胜率", value=f"{total['胜率(%)']:.2f}%")
+            
+            with col3:
+                st.metric(label="平均盈利", value=f"{total['平均盈利']:,.2f}")
+            
+            with col4:
+                st.metric(label="平均亏损", value=f"{total['平均亏损']:,.2f}")
+            
+            with col5:
+                st.metric(label="平均持有天数", value=f"{total['平均持有天数']:.1f}")
+            
+            # 按证券汇总
+            st.markdown('<h3 class="sub-header">回合统计</h3>', unsafe_allow_html=True)
+            st.dataframe(summary_df, use_container_width=True, hide_index=True)
+            
+            # 持有期分布
+            st.markdown('<h3 class="sub-header">持有期分布</h3>', unsafe_allow_html=True)
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.plotly_chart(fig_holding_distribution(data_tag, distribution_df), use_container_width=True)
+            
+            with col2:
+                st.plotly_chart(
+                    fig_signed_bar(data_tag, summary_df.iloc[:-1], '总盈亏', '各股票回合盈亏排名'),
+                    use_container_width=True
+                )
+            
+            st.dataframe(distribution_df, use_container_width=True, hide_index=True)
+            
+            # 回合明细
+            st.markdown('<h3 class="sub-header">回合明细</h3>', unsafe_allow_html=True)
+            st.dataframe(cached_round_trips_display(data_tag, trips_df), use_container_width=True, hide_index=True)
     
     # 分红记录页面
     elif st.session_state.current_tab == "分红记录":
         st.markdown('<h2 class="sub-header">分红记录</h2>', unsafe_allow_html=True)
         
         # 获取分红记录
-        dividend_records = processor.get_dividend_records()
-        dividend_summary = processor.get_dividend_summary()
+        dividend_records = data['dividend_records']
+        dividend_summary = data['dividend_summary']
         
         # 分红概览
         col1, col2, col3, col4 = st.columns(4)
@@ -733,346 +1343,98 @@ else:
         if dividend_records.empty:
             st.info("没有分红记录")
         else:
-            # 格式化显示
-            dividend_display = dividend_records.copy()
-            
-            # 格式化日期列
-            if '日期' in dividend_display.columns:
-                dividend_display['日期'] = pd.to_datetime(dividend_display['日期']).dt.strftime('%Y-%m-%d')
-            
-            # 格式化金额列
-            money_cols = ['每股分红', '总分红金额', '税费', '净分红金额']
-            for col in money_cols:
-                if col in dividend_display.columns:
-                    dividend_display[col] = dividend_display[col].map('{:,.4f}'.format)
-            
             # 显示表格
-            st.dataframe(dividend_display, use_container_width=True)
+            st.dataframe(cached_dividend_display(data_tag, dividend_records), use_container_width=True)
             
             # 分红趋势图
             if len(dividend_records) > 1:
                 st.markdown('<h3 class="sub-header">分红趋势</h3>', unsafe_allow_html=True)
                 
-                # 按日期汇总分红
-                dividend_records['日期'] = pd.to_datetime(dividend_records['日期'])
-                dividend_records['年月'] = dividend_records['日期'].dt.strftime('%Y-%m')
-                
-                monthly_dividends = dividend_records.groupby('年月').agg({
-                    '总分红金额': 'sum',
-                    '税费': 'sum',
-                    '净分红金额': 'sum'
-                }).reset_index()
-                
-                # 创建趋势图
-                fig = go.Figure()
-                
-                fig.add_trace(go.Bar(
-                    x=monthly_dividends['年月'],
-                    y=monthly_dividends['净分红金额'],
-                    name='净分红金额',
-                    marker_color='#4CAF50'
-                ))
-                
-                fig.add_trace(go.Bar(
-                    x=monthly_dividends['年月'],
-                    y=monthly_dividends['税费'],
-                    name='税费',
-                    marker_color='#F44336'
-                ))
-                
-                fig.update_layout(
-                    title='月度分红趋势',
-                    xaxis_title='年月',
-                    yaxis_title='金额',
-                    barmode='stack',
-                    height=400
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+                # 按月汇总分红
+                monthly_dividends = cached_monthly_dividends(data_tag, dividend_records)
+                st.plotly_chart(fig_monthly_dividend_bar(data_tag, monthly_dividends), use_container_width=True)
                 
                 # 按证券汇总分红
-                stock_dividends = dividend_records.groupby(['证券代码', '证券名称']).agg({
-                    '总分红金额': 'sum',
-                    '税费': 'sum',
-                    '净分红金额': 'sum'
-                }).reset_index()
-                
-                # 创建饼图
-                fig = px.pie(
-                    stock_dividends,
-                    values='净分红金额',
-                    names='证券名称',
-                    title='各股票分红占比',
-                    hole=0.4,
-                    color_discrete_sequence=px.colors.sequential.Greens
-                )
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig_dividend_share_pie(data_tag, dividend_records), use_container_width=True)
     
     # 数据可视化页面
     elif st.session_state.current_tab == "数据可视化":
         st.markdown('<h2 class="sub-header">数据可视化</h2>', unsafe_allow_html=True)
         
-        # 获取数据
-        positions_df = processor.get_current_positions()
-        stock_pnl_df = processor.get_stock_historical_pnl()
-        trades_df = processor.trades_df
-        dividend_records = processor.get_dividend_records()
-        
         # 选择可视化类型
         viz_type = st.selectbox(
             "选择可视化类型",
-            ["持仓分析", "盈亏分析", "交易分析", "分红分析"]
+            list(VIZ_DATASETS.keys())
         )
         
+        # 只计算所选可视化类型需要的数据
+        viz_data = load_datasets(processor, data_tag, VIZ_DATASETS[viz_type])
+        positions_df = viz_data.get('positions')
+        stock_pnl_df = viz_data.get('stock_pnl')
+        trades_df = viz_data.get('trades')
+        dividend_records = viz_data.get('dividend_records')
+        
         if viz_type == "持仓分析" and not positions_df.empty:
             # 持仓分析可视化
             st.markdown('<h3 class="sub-header">持仓分析可视化</h3>', unsafe_allow_html=True)
             
             # 持仓市值树状图
-            fig = px.treemap(
-                positions_df,
-                path=['证券名称'],
-                values='持仓市值',
-                color='持仓市值',
-                color_continuous_scale='Blues',
-                title='持仓市值树状图'
-            )
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig_positions_treemap(data_tag, positions_df), use_container_width=True)
             
             # 持仓成本与市值对比
-            positions_compare = positions_df.copy()
-            positions_compare = positions_compare.sort_values('持仓市值', ascending=False)
-            
-            fig = go.Figure()
-            
-            fig.add_trace(go.Bar(
-                x=positions_compare['证券名称'],
-                y=positions_compare['持仓市值'],
-                name='当前市值',
-                marker_color='#4CAF50'
-            ))
-            
-            fig.add_trace(go.Bar(
-                x=positions_compare['证券名称'],
-                y=positions_compare['持仓成本总额'],
-                name='持仓成本',
-                marker_color='#2196F3'
-            ))
-            
-            fig.update_layout(
-                title='持仓成本与市值对比',
-                xaxis_title='',
-                yaxis_title='金额',
-                barmode='group',
-                height=500
+            st.plotly_chart(
+                fig_grouped_bar(
+                    data_tag, positions_df, '持仓市值',
+                    [('持仓市值', '当前市值', '#4CAF50'), ('持仓成本总额', '持仓成本', '#2196F3')],
+                    '持仓成本与市值对比', '金额'
+                ),
+                use_container_width=True
             )
-            
-            st.plotly_chart(fig, use_container_width=True)
         
         elif viz_type == "盈亏分析" and not stock_pnl_df.empty:
             # 盈亏分析可视化
             st.markdown('<h3 class="sub-header">盈亏分析可视化</h3>', unsafe_allow_html=True)
             
             # 盈亏瀑布图
-            pnl_waterfall = stock_pnl_df.sort_values('总盈亏', ascending=False).head(10)
-            
-            fig = go.Figure(go.Waterfall(
-                name="盈亏瀑布图",
-                orientation="v",
-                measure=["relative"] * len(pnl_waterfall),
-                x=pnl_waterfall['证券名称'],
-                y=pnl_waterfall['总盈亏'],
-                connector={"line": {"color": "rgb(63, 63, 63)"}},
-                increasing={"marker": {"color": "#4CAF50"}},
-                decreasing={"marker": {"color": "#F44336"}}
-            ))
-            
-            fig.update_layout(
-                title="前10只股票盈亏瀑布图",
-                xaxis_title="",
-                yaxis_title="总盈亏",
-                height=500
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig_pnl_waterfall(data_tag, stock_pnl_df), use_container_width=True)
             
             # 已实现与未实现盈亏对比
-            pnl_compare = stock_pnl_df.copy()
-            pnl_compare = pnl_compare.sort_values('总盈亏', ascending=False)
-            
-            fig = go.Figure()
-            
-            fig.add_trace(go.Bar(
-                x=pnl_compare['证券名称'],
-                y=pnl_compare['已实现盈亏'],
-                name='已实现盈亏',
-                marker_color='#4CAF50'
-            ))
-            
-            fig.add_trace(go.Bar(
-                x=pnl_compare['证券名称'],
-                y=pnl_compare['未实现盈亏'],
-                name='未实现盈亏',
-                marker_color='#2196F3'
-            ))
-            
-            fig.update_layout(
-                title='已实现与未实现盈亏对比',
-                xaxis_title='',
-                yaxis_title='盈亏金额',
-                barmode='group',
-                height=500
+            st.plotly_chart(
+                fig_grouped_bar(
+                    data_tag, stock_pnl_df, '总盈亏',
+                    [('已实现盈亏', '已实现盈亏', '#4CAF50'), ('未实现盈亏', '未实现盈亏', '#2196F3')],
+                    '已实现与未实现盈亏对比', '盈亏金额'
+                ),
+                use_container_width=True
             )
             
-            st.plotly_chart(fig, use_container_width=True)
-            
             # 盈亏比例散点图
             if '盈亏比例(%)' in stock_pnl_df.columns:
-                fig = px.scatter(
-                    stock_pnl_df,
-                    x='总盈亏',
-                    y='盈亏比例(%)',
-                    size='当前市值',
-                    color='证券名称',
-                    hover_name='证券名称',
-                    title='盈亏金额与比例散点图'
-                )
-                fig.update_layout(height=500)
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig_pnl_scatter(data_tag, stock_pnl_df), use_container_width=True)
         
         elif viz_type == "交易分析" and trades_df is not None and not trades_df.empty:
             # 交易分析可视化
             st.markdown('<h3 class="sub-header">交易分析可视化</h3>', unsafe_allow_html=True)
             
             # 交易频率热力图
-            trades_df['日期'] = pd.to_datetime(trades_df['日期'])
-            trades_df['星期'] = trades_df['日期'].dt.day_name()
-            trades_df['小时'] = trades_df['日期'].dt.hour
-            
-            # 创建交易频率数据
-            trade_counts = trades_df.groupby(['星期', '小时']).size().reset_index(name='交易次数')
-            
-            # 确保所有星期和小时都有数据
-            weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            hours = list(range(24))
-            
-            # 创建完整的索引
-            idx = pd.MultiIndex.from_product([weekdays, hours], names=['星期', '小时'])
-            trade_counts = trade_counts.set_index(['星期', '小时']).reindex(idx, fill_value=0).reset_index()
-            
-            # 创建热力图
-            fig = px.density_heatmap(
-                trade_counts,
-                x='小时',
-                y='星期',
-                z='交易次数',
-                title='交易频率热力图',
-                color_continuous_scale='Viridis'
-            )
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig_trade_heatmap(data_tag, trades_df), use_container_width=True)
             
             # 交易金额趋势图
-            trades_df['月份'] = trades_df['日期'].dt.strftime('%Y-%m')
-            
-            monthly_trades = trades_df.groupby('月份').agg({
-                '交易金额': 'sum',
-                '总费用': 'sum'
-            }).reset_index()
-            
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatter(
-                x=monthly_trades['月份'],
-                y=monthly_trades['交易金额'],
-                mode='lines+markers',
-                name='交易金额',
-                line=dict(color='#2196F3', width=3)
-            ))
-            
-            fig.add_trace(go.Scatter(
-                x=monthly_trades['月份'],
-                y=monthly_trades['总费用'],
-                mode='lines+markers',
-                name='总费用',
-                line=dict(color='#F44336', width=2),
-                yaxis='y2'
-            ))
-            
-            fig.update_layout(
-                title='月度交易金额与费用趋势',
-                xaxis_title='月份',
-                yaxis_title='交易金额',
-                yaxis2=dict(
-                    title='费用',
-                    overlaying='y',
-                    side='right'
-                ),
-                height=500
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig_monthly_trade_trend(data_tag, trades_df), use_container_width=True)
         
         elif viz_type == "分红分析" and not dividend_records.empty:
             # 分红分析可视化
             st.markdown('<h3 class="sub-header">分红分析可视化</h3>', unsafe_allow_html=True)
             
             # 分红金额趋势图
-            dividend_records['日期'] = pd.to_datetime(dividend_records['日期'])
-            dividend_records['月份'] = dividend_records['日期'].dt.strftime('%Y-%m')
-            
-            monthly_dividends = dividend_records.groupby('月份').agg({
-                '总分红金额': 'sum',
-                '税费': 'sum',
-                '净分红金额': 'sum'
-            }).reset_index()
-            
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatter(
-                x=monthly_dividends['月份'],
-                y=monthly_dividends['净分红金额'],
-                mode='lines+markers',
-                name='净分红金额',
-                line=dict(color='#4CAF50', width=3)
-            ))
-            
-            fig.add_trace(go.Scatter(
-                x=monthly_dividends['月份'],
-                y=monthly_dividends['税费'],
-                mode='lines+markers',
-                name='税费',
-                line=dict(color='#F44336', width=2)
-            ))
-            
-            fig.update_layout(
-                title='月度分红金额趋势',
-                xaxis_title='月份',
-                yaxis_title='金额',
-                height=500
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            monthly_dividends = cached_monthly_dividends(data_tag, dividend_records, period_col='月份')
+            st.plotly_chart(fig_monthly_dividend_line(data_tag, monthly_dividends), use_container_width=True)
             
             # 分红股票占比
-            stock_dividends = dividend_records.groupby('证券名称').agg({
-                '净分红金额': 'sum'
-            }).reset_index()
-            
-            fig = px.pie(
-                stock_dividends,
-                values='净分红金额',
-                names='证券名称',
-                title='各股票分红占比',
-                color_discrete_sequence=px.colors.sequential.Greens
+            st.plotly_chart(
+                fig_dividend_share_pie(data_tag, dividend_records, hole=0, height=500),
+                use_container_width=True
             )
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            fig.update_layout(height=500)
-            
-            st.plotly_chart(fig, use_container_width=True)
         
         else:
             st.info("没有足够的数据进行可视化")
@@ -1081,22 +1443,28 @@ else:
     elif st.session_state.current_tab == "交易复盘":
         st.markdown('<h2 class="sub-header">交易复盘</h2>', unsafe_allow_html=True)
         
-        # 创建复盘记录生成器
-        review = TradingReview(processor=processor)
-        
         # 日期选择
         col1, col2 = st.columns([3, 1])
         
+        # 有交易的日期来自处理器的日期索引，默认复盘最近一个交易日
+        trade_dates = processor.get_record_dates('trades')
+        today = datetime.now().date()
+        default_date = trade_dates[-1] if trade_dates and trade_dates[-1] <= today else today
+        min_date = min([(datetime.now() - timedelta(days=365)).date()] + trade_dates[:1])
+        
         with col1:
             selected_date = st.date_input(
                 "选择复盘日期",
-                value=datetime.now().date(),
-                min_value=(datetime.now() - timedelta(days=365)).date(),
-                max_value=datetime.now().date()
+                value=default_date,
+                min_value=min_date,
+                max_value=today
             )
         
-        # 设置复盘日期
-        review.set_review_date(selected_date)
+        # 获取复盘数据（按日期缓存）
+        review_data = load_datasets(
+            processor, data_tag, ['review_tables', 'review_report'], params=(selected_date,)
+        )
+        report_content = review_data['review_report']
         
         with col2:
             # 生成复盘报告按钮
@@ -1105,33 +1473,30 @@ else:
                     # 确保reports目录存在
                     os.makedirs("reports", exist_ok=True)
                     
-                    # 生成复盘报告
-                    report_path = review.save_review_report()
-                    
-                    if report_path:
+                    # 保存复盘报告
+                    report_path = os.path.join("reports", f"trading_review_{selected_date.strftime('%Y%m%d')}.md")
+                    try:
+                        with open(report_path, "w", encoding="utf-8") as f:
+                            f.write(report_content)
                         st.success(f"复盘报告已生成: {report_path}")
                         
-                        # 读取报告内容
-                        with open(report_path, "r", encoding="utf-8") as f:
-                            report_content = f.read()
-                        
                         # 显示下载按钮
                         st.download_button(
-                            label="下载复盘报告",
+                            label="下载复盘报告", 
                             data=report_content,
                             file_name=f"trading_review_{selected_date.strftime('%Y%m%d')}.md",
                             mime="text/markdown"
                         )
-                    else:
+                    except OSError:
                         st.error("复盘报告生成失败")
         
         # 复盘数据预览
         st.markdown('<h3 class="sub-header">复盘数据预览</h3>', unsafe_allow_html=True)
         
         # 获取当天交易记录
-        daily_trades = review.get_daily_trades()
-        daily_pnl = review.get_daily_pnl()
-        daily_dividends = review.get_daily_dividends()
+        daily_trades = review_data['review_tables']['trades']
+        daily_pnl = review_data['review_tables']['pnl']
+        daily_dividends = review_data['review_tables']['dividends']
         
         # 创建三个标签页
         tab1, tab2, tab3 = st.tabs(["当日交易", "当日盈亏", "当日分红"])
@@ -1153,7 +1518,7 @@ else:
                 
                 # 选择要显示的列
                 columns_to_show = [
-                    '证券代码', '证券名称', '买卖方向', '成交价格', 
+                    '证券代码', '证券名称', '买卖方向', '成交价格',
                     '成交数量', '交易金额', '总费用'
                 ]
                 
@@ -1164,27 +1529,26 @@ else:
                 st.dataframe(trades_display[columns_to_show], use_container_width=True)
                 
                 # 交易统计
-                buy_trades = daily_trades[~daily_trades['买卖方向'].isin(['卖出', '卖', 'SELL', 'S'])]
-                sell_trades = daily_trades[daily_trades['买卖方向'].isin(['卖出', '卖', 'SELL', 'S'])]
+                is_sell = daily_trades['买卖方向'].isin(SELL_DIRECTIONS)
                 
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
                     st.metric(
                         label="买入笔数", 
-                        value=len(buy_trades)
+                        value=int((~is_sell).sum())
                     )
                 
                 with col2:
                     st.metric(
                         label="卖出笔数", 
-                        value=len(sell_trades)
+                        value=int(is_sell.sum())
                     )
                 
                 with col3:
                     st.metric(
                         label="总交易金额", 
-                        value=f"{daily_trades['交易金额'].sum():,.2f}"
+                        value=f"{daily_trades[money_column(daily_trades, '交易金额')].sum():,.2f}"
                     )
         
         with tab2:
@@ -1192,8 +1556,8 @@ else:
                 st.info(f"{selected_date.strftime('%Y-%m-%d')} 没有盈亏记录")
             else:
                 # 盈亏统计
-                realized_pnl = daily_pnl['当日已实现盈亏'].sum()
-                unrealized_pnl = daily_pnl['当日未实现盈亏'].sum()
+                realized_pnl = daily_pnl[money_column(daily_pnl, '当日已实现盈亏')].sum()
+                unrealized_pnl = daily_pnl[money_column(daily_pnl, '当日未实现盈亏')].sum()
                 total_pnl = realized_pnl + unrealized_pnl
                 
                 col1, col2, col3 = st.columns(3)
@@ -1235,7 +1599,7 @@ else:
                 
                 # 选择要显示的列
                 columns_to_show = [
-                    '证券代码', '证券名称', '持仓数量', '持仓成本价', '收盘价', 
+                    '证券代码', '证券名称', '持仓数量', '持仓成本价', '收盘价',
                     '当日已实现盈亏', '当日未实现盈亏'
                 ]
                 
@@ -1249,28 +1613,16 @@ else:
                 st.markdown('<h4 class="sub-header">当日盈亏分布</h4>', unsafe_allow_html=True)
                 
                 # 计算每只股票的总盈亏
-                pnl_data = []
-                for _, row in daily_pnl.iterrows():
-                    pnl_data.append({
-                        '证券名称': row['证券名称'],
-                        '总盈亏': row['当日已实现盈亏'] + row['当日未实现盈亏']
-                    })
+                pnl_df = pd.DataFrame({
+                    '证券名称': daily_pnl['证券名称'],
+                    '总盈亏': (daily_pnl[money_column(daily_pnl, '当日已实现盈亏')]
+                            + daily_pnl[money_column(daily_pnl, '当日未实现盈亏')])
+                })
                 
-                pnl_df = pd.DataFrame(pnl_data)
-                pnl_sorted = pnl_df.sort_values('总盈亏')
-                
-                colors = ['#4CAF50' if x >= 0 else '#F44336' for x in pnl_sorted['总盈亏']]
-                
-                fig = px.bar(
-                    pnl_sorted,
-                    x='证券名称',
-                    y='总盈亏',
-                    title='当日股票盈亏分布',
-                    color='证券名称',
-                    color_discrete_sequence=colors
+                st.plotly_chart(
+                    fig_signed_bar((data_tag, selected_date), pnl_df, '总盈亏', '当日股票盈亏分布'),
+                    use_container_width=True
                 )
-                fig.update_layout(xaxis_title="", yaxis_title="总盈亏", height=400)
-                st.plotly_chart(fig, use_container_width=True)
         
         with tab3:
             if daily_dividends.empty:
@@ -1301,55 +1653,31 @@ else:
                         value=f"{net_dividend:,.2f}"
                     )
                 
-                # 格式化显示
-                dividend_display = daily_dividends.copy()
-                
-                # 格式化日期列
-                if '日期' in dividend_display.columns:
-                    dividend_display['日期'] = pd.to_datetime(dividend_display['日期']).dt.strftime('%Y-%m-%d')
-                
-                # 格式化金额列
-                money_cols = ['每股分红', '总分红金额', '税费', '净分红金额']
-                for col in money_cols:
-                    if col in dividend_display.columns:
-                        dividend_display[col] = dividend_display[col].map('{:,.4f}'.format)
-                
                 # 显示表格
-                st.dataframe(dividend_display, use_container_width=True)
+                st.dataframe(cached_dividend_display((data_tag, selected_date), daily_dividends), use_container_width=True)
                 
                 # 分红分布图
                 st.markdown('<h4 class="sub-header">分红分布</h4>', unsafe_allow_html=True)
                 
-                fig = px.pie(
-                    daily_dividends,
-                    values='净分红金额',
-                    names='证券名称',
-                    title='当日分红分布',
-                    hole=0.4,
-                    color_discrete_sequence=px.colors.sequential.Greens
+                st.plotly_chart(
+                    fig_dividend_share_pie((data_tag, selected_date), daily_dividends, title='当日分红分布'),
+                    use_container_width=True
                 )
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                
-                st.plotly_chart(fig, use_container_width=True)
         
         # 复盘报告预览
         st.markdown('<h3 class="sub-header">复盘报告预览</h3>', unsafe_allow_html=True)
         
-        # 生成复盘报告（不保存）
-        report_content = review.generate_review_report()
-        
         # 显示报告预览
         st.markdown(report_content)
 
         # 页脚
         st.markdown("""
-        <div style="text-align: center; margin-top: 2rem; padding-t
+        <div style="text-align: center; margin-top: 2rem; padding-top: 1rem; color: #888;">
             <p>交易数据分析仪表盘 © 2025</p>
         </div>
-        """, unsml=True)
+        """, unsafe_allow_html=True)
 
 # 运行说明
-if __name__ == "__main":
+if __name__ == "__main__":
     # 确保data目录存在
     os.makedirs("data", exist_ok=True)
-    main()
\ No newline at end of file
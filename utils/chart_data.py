@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+图表数据聚合工具
+在绘图前用pandas压缩数据，使每个图表发送给浏览器的点数有上限，与数据规模无关：
+- 分类图表（饼图、条形图、树状图）保留前N项，其余合并为"其他"
+- 时间序列折线图使用LTTB (Largest-Triangle-Three-Buckets) 降采样
+- 时间序列条形图按更粗的周期重新汇总
+- 热力图预先分箱为固定大小的矩阵
+"""
+
+import numpy as np
+import pandas as pd
+
+# 分类图表默认保留的类别数
+MAX_CATEGORIES = 20
+
+# 时间序列图表默认的最大点数
+MAX_SERIES_POINTS = 500
+
+# 合并后的类别名称
+OTHER_LABEL = '其他'
+
+# 条形图重新汇总时依次尝试的周期: (pandas频率, 日期格式)
+RESAMPLE_PERIODS = [
+    ('W-MON', '%Y-%m-%d'),
+    ('MS', '%Y-%m'),
+    ('QS', '%Y-%m'),
+    ('YS', '%Y')
+]
+
+# 热力图的星期顺序
+WEEKDAY_LABELS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def top_n_with_other(df, label_col, value_col, n=MAX_CATEGORIES, sum_cols=None, by_abs=False,
+                     other_label=OTHER_LABEL):
+    """按数值保留前N个类别，其余类别合并为一行"其他"
+    
+    同名类别先合并。合并行的数值列取总和，其他列留空。
+    
+    Args:
+        df: 原始数据
+        label_col: 类别列，例如 '证券名称'
+        value_col: 排序所用的数值列
+        n: 保留的类别数
+        sum_cols: 需要合并求和的数值列，默认只有value_col
+        by_abs: 是否按绝对值排序（盈亏这类有正负的数值）
+        other_label: 合并行的类别名称
+    
+    Returns:
+        DataFrame: 最多n+1行，按排序列从大到小排列，"其他"在最后
+    """
+    sum_cols = list(dict.fromkeys([value_col] + list(sum_cols or [])))
+    
+    if df is None or df.empty:
+        return pd.DataFrame(columns=[label_col] + sum_cols)
+    
+    grouped = df.groupby(label_col, sort=False)[sum_cols].sum().reset_index()
+    if len(grouped) <= n:
+        return _sort_by_value(grouped, value_col, by_abs)
+    
+    ranked = _sort_by_value(grouped, value_col, by_abs)
+    top = ranked.head(n)
+    rest = ranked.iloc[n:]
+    
+    other = pd.DataFrame([{label_col: other_label, **rest[sum_cols].sum().to_dict()}])
+    return pd.concat([top, other], ignore_index=True)
+
+
+def top_bottom_n(df, value_col, n=MAX_CATEGORIES):
+    """保留数值最大和最小的各n行，用于有正负的排名图
+    
+    Args:
+        df: 原始数据
+        value_col: 排序所用的数值列
+        n: 两端各保留的行数
+    
+    Returns:
+        DataFrame: 最多2n行，按数值从小到大排列
+    """
+    if df is None or len(df) <= 2 * n:
+        return df.sort_values(value_col) if df is not None else df
+    
+    ordered = df.sort_values(value_col)
+    return pd.concat([ordered.head(n), ordered.tail(n)])
+
+
+def _sort_by_value(df, value_col, by_abs):
+    """按数值或绝对值从大到小排序"""
+    if by_abs:
+        return df.reindex(df[value_col].abs().sort_values(ascending=False).index).reset_index(drop=True)
+    return df.sort_values(value_col, ascending=False).reset_index(drop=True)
+
+
+def lttb_indices(x, y, threshold):
+    """LTTB降采样，返回保留点的位置
+    
+    将序列分为threshold-2个桶，每个桶保留与前一个保留点和下一个桶均值
+    构成三角形面积最大的点，首尾两点始终保留，能较好地保留曲线形状。
+    
+    Args:
+        x: 横坐标（数值，日期需先转换为整数）
+        y: 纵坐标
+        threshold: 保留的点数
+    
+    Returns:
+        numpy.ndarray: 保留点的位置（升序）
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    length = len(x)
+    
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+    
+    # 每个桶的边界，首尾两点单独保留
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        
+        # 下一个桶的均值点，最后一个桶使用终点
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        
+        # 三角形面积（省略常数1/2）
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    
+    return selected
+
+
+def downsample_series(df, x_col, y_cols, max_points=MAX_SERIES_POINTS):
+    """对时间序列折线图做LTTB降采样
+    
+    多条曲线共用横坐标时，对每条曲线分别选点后取并集，
+    保证每条曲线的峰谷都被保留，总点数不超过 max_points 的曲线数倍。
+    
+    Args:
+        df: 已按横坐标排序的数据
+        x_col: 横坐标列（日期或数值，日期字符串也可）
+        y_cols: 纵坐标列名或列名列表
+        max_points: 每条曲线保留的最大点数
+    
+    Returns:
+        DataFrame: 降采样后的数据
+    """
+    if df is None or len(df) <= max_points:
+        return df
+    
+    if isinstance(y_cols, str):
+        y_cols = [y_cols]
+    
+    x = df[x_col]
+    if pd.api.types.is_numeric_dtype(x):
+        x = x.to_numpy()
+    else:
+        x = pd.to_datetime(x).to_numpy().astype('datetime64[ns]').astype('int64')
+    
+    keep = np.unique(np.concatenate([
+        lttb_indices(x, df[col].fillna(0).to_numpy(), max_points) for col in y_cols
+    ]))
+    return df.iloc[keep]
+
+
+def resample_totals(df, date_col, value_cols, max_points=MAX_SERIES_POINTS):
+    """按日期汇总的条形图数据过多时，按周、月、季、年重新汇总
+    
+    从细到粗依次尝试，使用第一个点数不超过 max_points 的周期。
+    
+    Args:
+        df: 按日期汇总的数据
+        date_col: 日期列
+        value_cols: 需要求和的数值列
+        max_points: 最大点数
+    
+    Returns:
+        tuple: (汇总后的数据, 周期频率)，数据量未超限时原样返回，频率为None
+    """
+    if df is None or len(df) <= max_points:
+        return df, None
+    
+    dates = pd.to_datetime(df[date_col])
+    values = df[value_cols].set_index(dates)
+    
+    for freq, date_format in RESAMPLE_PERIODS:
+        resampled = values.resample(freq).sum()
+        if len(resampled) <= max_points or freq == RESAMPLE_PERIODS[-1][0]:
+            break
+    
+    resampled = resampled.reset_index()
+    resampled[date_col] = resampled[date_col].dt.strftime(date_format)
+    return resampled, freq
+
+
+def weekday_hour_matrix(dates):
+    """将交易时间预先分箱为 星期 × 小时 的计数矩阵
+    
+    Args:
+        dates: 交易时间序列
+    
+    Returns:
+        DataFrame: 7行（星期一到星期日）× 24列（0-23时）的交易次数
+    """
+    dates = pd.to_datetime(pd.Series(dates))
+    
+    # 星期和小时合并为 0-167 的分箱编号后一次计数
+    bins = dates.dt.dayofweek.to_numpy() * 24 + dates.dt.hour.to_numpy()
+    counts = np.bincount(bins, minlength=7 * 24).reshape(7, 24)
+    
+    return pd.DataFrame(counts, index=WEEKDAY_LABELS, columns=list(range(24)))
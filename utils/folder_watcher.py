@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+目录监控工具
+监控目录中新到达或被覆盖的文件，等待写入完成后再交给回调处理。
+Linux上优先使用inotify（需要安装 inotify_simple），否则退化为定时轮询。
+"""
+
+import fnmatch
+import logging
+import os
+import time
+
+# inotify_simple为可选依赖，未安装或非Linux系统时使用轮询
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+    inotify_flags = None
+
+logger = logging.getLogger('folder_watcher')
+
+
+class FolderWatcher:
+    """目录监控类，文件大小和修改时间稳定一段时间后才视为写入完成"""
+    
+    def __init__(self, directory, patterns=('*.xlsx',), exclude_patterns=(), debounce=2.0,
+                 poll_interval=1.0, use_inotify=True):
+        """初始化目录监控
+        
+        Args:
+            directory: 监控的目录
+            patterns: 需要处理的文件名模式
+            exclude_patterns: 需要跳过的文件名模式（例如Excel临时文件 ~$*）
+            debounce: 文件保持不变多少秒后视为写入完成
+            poll_interval: 轮询间隔（秒），使用inotify时为等待事件的超时时间
+            use_inotify: 是否优先使用inotify
+        """
+        self.directory = directory
+        self.patterns = patterns
+        self.exclude_patterns = exclude_patterns
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        
+        # 等待写入完成的文件: {路径: ((文件大小, 修改时间), 最近一次变化的时间)}
+        self._pending = {}
+        # 已交给回调处理的文件签名: {路径: (文件大小, 修改时间)}
+        self._processed = {}
+        
+        self._inotify = None
+        if use_inotify and INotify is not None:
+            try:
+                self._inotify = INotify()
+                watch_flags = inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE | inotify_flags.MODIFY
+                self._inotify.add_watch(directory, watch_flags)
+            except OSError as e:
+                logger.warning(f"inotify不可用，改用轮询: {e}")
+                self._inotify = None
+    
+    @property
+    def mode(self):
+        """当前使用的监控方式"""
+        return 'inotify' if self._inotify is not None else 'polling'
+    
+    def _matches(self, name):
+        """文件名是否需要处理"""
+        if any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude_patterns):
+            return False
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+    
+    @staticmethod
+    def _signature(path):
+        """文件签名（大小和修改时间），文件不存在时返回None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+    
+    def _mark(self, path, now):
+        """记录文件的最新签名，签名变化时重新开始计时"""
+        signature = self._signature(path)
+        if signature is None:
+            self._pending.pop(path, None)
+            return
+        
+        pending = self._pending.get(path)
+        if pending is None or pending[0] != signature:
+            self._pending[path] = (signature, now)
+    
+    def _collect_events(self, now):
+        """收集发生变化的文件"""
+        if self._inotify is not None:
+            for event in self._inotify.read(timeout=int(self.poll_interval * 1000)):
+                if event.name and self._matches(event.name):
+                    self._mark(os.path.join(self.directory, event.name), now)
+            
+            # 写入过程中文件不一定持续产生事件，主动检查等待中的文件
+            for path in list(self._pending):
+                self._mark(path, now)
+            return
+        
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError as e:
+            logger.error(f"读取监控目录失败: {e}")
+            entries = []
+        
+        for entry in entries:
+            if entry.is_file() and self._matches(entry.name):
+                path = entry.path
+                if path in self._pending or self._signature(path) != self._processed.get(path):
+                    self._mark(path, now)
+    
+    def scan_existing(self):
+        """将目录中已存在的文件加入待处理列表"""
+        now = time.monotonic()
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and self._matches(entry.name):
+                self._mark(entry.path, now)
+    
+    def poll(self):
+        """检查一次目录，返回已写入完成且尚未处理的文件
+        
+        Returns:
+            list: 文件路径列表
+        """
+        if self._inotify is None:
+            time.sleep(self.poll_interval)
+        
+        now = time.monotonic()
+        self._collect_events(now)
+        
+        ready = []
+        for path, (signature, changed_at) in list(self._pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            
+            del self._pending[path]
+            if self._processed.get(path) != signature:
+                self._processed[path] = signature
+                ready.append(path)
+        
+        return sorted(ready)
+    
+    def run(self, callback, process_existing=True):
+        """持续监控目录，文件写入完成后调用回调，按Ctrl+C停止
+        
+        Args:
+            callback: 处理文件的函数，参数为文件路径
+            process_existing: 启动时是否处理目录中已存在的文件
+        """
+        if process_existing:
+            self.scan_existing()
+        else:
+            # 记录已存在文件的签名，只处理之后到达或被覆盖的文件
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and self._matches(entry.name):
+                    self._processed[entry.path] = self._signature(entry.path)
+        
+        try:
+            while True:
+                for path in self.poll():
+                    try:
+                        callback(path)
+                    except Exception as e:
+                        logger.error(f"处理文件 {path} 出错: {e}")
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
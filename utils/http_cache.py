@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP缓存与压缩工具
+为JSON接口和报告下载提供ETag校验、304响应和gzip/brotli压缩
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+from flask import Response
+
+# brotli为可选依赖，未安装时只使用gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小于该字节数的响应不压缩，压缩收益抵不过开销
+MIN_COMPRESS_SIZE = 1024
+
+# 可以用304响应If-None-Match的请求方法，其他方法命中时返回412
+SAFE_METHODS = ('GET', 'HEAD')
+
+# 文件哈希缓存: {文件路径: (文件大小, 修改时间, 哈希值)}
+_file_hash_cache = {}
+
+
+def make_etag(*parts):
+    """根据若干组成部分生成ETag
+
+    Args:
+        parts: 参与计算的值，例如数据版本号、文件哈希、路由名称
+
+    Returns:
+        str: ETag字符串（不含引号）
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def file_etag(file_path, chunk_size=1024 * 1024):
+    """计算文件内容哈希作为ETag，文件大小和修改时间不变时复用缓存结果
+
+    Args:
+        file_path: 文件路径
+        chunk_size: 分块读取的字节数
+
+    Returns:
+        str: 文件内容的sha1哈希
+    """
+    stat = os.stat(file_path)
+    cached = _file_hash_cache.get(file_path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+    etag = digest.hexdigest()
+    _file_hash_cache[file_path] = (stat.st_size, stat.st_mtime_ns, etag)
+    return etag
+
+
+def is_not_modified(request, etag):
+    """判断客户端缓存是否仍然有效（If-None-Match命中）
+
+    Args:
+        request: 当前请求对象
+        etag: 当前资源的ETag
+
+    Returns:
+        bool: 客户端缓存有效时返回True
+    """
+    return etag is not None and request.if_none_match.contains(etag)
+
+
+def _choose_encoding(request):
+    """根据Accept-Encoding选择压缩算法，优先brotli"""
+    accept = request.accept_encodings
+    if brotli is not None and accept.quality('br') > 0:
+        return 'br'
+    if accept.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def encoded_etag(etag, encoding):
+    """按响应实际使用的编码区分ETag
+
+    同一资源的gzip、brotli和未压缩响应是不同的表示，强校验ETag必须各不相同，
+    否则共享缓存和Range请求可能把不同编码的内容混用。后缀取自 compress_body 实际使用的编码，
+    未达到压缩阈值的响应无论Accept-Encoding如何都是同一个未压缩表示。
+
+    Args:
+        etag: 资源ETag
+        encoding: 响应的Content-Encoding，未压缩时为None
+
+    Returns:
+        str: 带编码后缀的ETag，例如 'abc-gzip'、'abc-identity'
+    """
+    return f"{etag}-{encoding or 'identity'}"
+
+
+def matching_etag(request, etag):
+    """在生成响应体之前判断If-None-Match是否命中
+
+    响应体大小未知，当前请求可能得到未压缩表示或协商出的压缩表示，命中其中任意一个即说明客户端
+    持有的是当前版本的内容。
+
+    Args:
+        request: 当前请求对象
+        etag: 资源ETag（不含编码后缀）
+
+    Returns:
+        str: 命中的带编码后缀的ETag，未命中时为None
+    """
+    for encoding in {None, _choose_encoding(request)}:
+        candidate = encoded_etag(etag, encoding)
+        if is_not_modified(request, candidate):
+            return candidate
+    return None
+
+
+def compress_body(request, body):
+    """按客户端支持的编码压缩响应体
+
+    Args:
+        request: 当前请求对象
+        body: 原始响应字节
+
+    Returns:
+        tuple: (压缩后的字节, Content-Encoding)，不压缩时编码为None
+    """
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+
+    encoding = _choose_encoding(request)
+    if encoding == 'br':
+        return brotli.compress(body), 'br'
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6), 'gzip'
+    return body, None
+
+
+def conditional_json(request, payload, etag=None, status=200, headers=None):
+    """返回支持ETag校验和压缩的JSON响应
+
+    payload可以是数据本身，也可以是返回数据的函数；传入函数时，
+    只有在客户端缓存失效时才会调用，从而跳过重复计算。
+    响应的ETag带有实际使用的压缩算法后缀，每种编码各自校验。If-None-Match只对GET和HEAD返回304，
+    其他方法命中时按条件请求的规则返回412。
+
+    Args:
+        request: 当前请求对象
+        payload: 响应数据或生成响应数据的函数
+        etag: 资源ETag（不含编码后缀），为None时根据响应内容计算
+        status: HTTP状态码
+        headers: 额外的响应头
+
+    Returns:
+        Response: Flask响应对象
+    """
+    matched = matching_etag(request, etag) if etag is not None else None
+    if matched is not None:
+        if request.method in SAFE_METHODS:
+            response = Response(status=304)
+            response.set_etag(matched)
+        else:
+            response = Response(status=412)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        if headers:
+            response.headers.update(headers)
+        return response
+
+    data = payload() if callable(payload) else payload
+    body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+    if etag is None:
+        etag = make_etag(body)
+
+    body, encoding = compress_body(request, body)
+    if is_not_modified(request, encoded_etag(etag, encoding)):
+        return conditional_json(request, data, etag=etag, status=status, headers=headers)
+
+    response = Response(body, status=status, mimetype='application/json')
+    response.set_etag(encoded_etag(etag, encoding))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if headers:
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+延迟导入工具
+模块在第一次访问属性时才真正导入，用于启动时不一定用到的重量级依赖（例如plotly）。
+"""
+
+import importlib
+
+
+class LazyModule:
+    """模块代理，第一次访问属性时导入目标模块"""
+    
+    def __init__(self, name):
+        """初始化模块代理
+        
+        Args:
+            name: 模块全名，例如 'plotly.express'
+        """
+        self._name = name
+        self._module = None
+    
+    def _load(self):
+        """导入并缓存目标模块"""
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+    
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+    
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name):
+    """返回延迟导入的模块代理
+    
+    Args:
+        name: 模块全名
+    
+    Returns:
+        LazyModule: 模块代理
+    """
+    return LazyModule(name)
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+进程内监控指标
+提供计数器、仪表和直方图三种指标，按Prometheus文本格式输出，不依赖prometheus_client。
+指标只在内存中累加，记录一次的开销是一次加锁和几次加法。
+"""
+
+import bisect
+import math
+import threading
+from contextlib import ContextDecorator
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 耗时直方图默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 文件大小直方图分桶（字节）：16KB到64MB，每档乘以4
+SIZE_BUCKETS = tuple(16 * 1024 * 4 ** i for i in range(7))
+
+
+def _format_value(value):
+    """格式化指标数值"""
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value):
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    """生成 {name="value",...} 形式的标签字符串"""
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape_label(extra[1])}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class MetricsRegistry:
+    """指标注册表，按注册顺序输出所有指标"""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric):
+        """注册指标，同名指标只能注册一次"""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics[metric.name] = metric
+    
+    def get(self, name):
+        """按名称获取已注册的指标"""
+        return self._metrics.get(name)
+    
+    def render(self):
+        """按Prometheus文本格式输出所有指标
+        
+        Returns:
+            str: 指标文本
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+# 默认注册表
+REGISTRY = MetricsRegistry()
+
+
+class _Metric:
+    """指标基类，按标签值分别保存数据"""
+    
+    type_name = 'untyped'
+    
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        """初始化指标
+        
+        Args:
+            name: 指标名称
+            documentation: 指标说明
+            labelnames: 标签名称
+            registry: 注册表，为None时不注册
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+    
+    def _key(self, labels):
+        """按标签名称顺序取标签值"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def samples(self):
+        """输出指标样本行"""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """计数器，只增不减"""
+    
+    type_name = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        """增加计数
+        
+        Args:
+            amount: 增加量，不能为负数
+            labels: 标签值
+        """
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels):
+        """当前计数"""
+        return self._values.get(self._key(labels), 0)
+    
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+
+class _InProgress(ContextDecorator):
+    """进入时仪表加一、退出时减一，可作为上下文管理器或装饰器"""
+    
+    def __init__(self, gauge, labels):
+        self._gauge = gauge
+        self._labels = labels
+    
+    def __enter__(self):
+        self._gauge.inc(**self._labels)
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._gauge.dec(**self._labels)
+        return False
+
+
+class Gauge(_Metric):
+    """仪表，可增可减，也可以在输出时通过函数取值"""
+    
+    type_name = 'gauge'
+    
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self._function = None
+    
+    def set(self, value, **labels):
+        """设置当前值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def inc(self, amount=1, **labels):
+        """增加当前值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount=1, **labels):
+        """减少当前值"""
+        self.inc(-amount, **labels)
+    
+    def set_function(self, function):
+        """输出时调用函数取值（仅用于无标签的仪表）"""
+        self._function = function
+    
+    def track_inprogress(self, **labels):
+        """统计正在执行的代码块数量
+        
+        Returns:
+            _InProgress: 上下文管理器/装饰器
+        """
+        return _InProgress(self, labels)
+    
+    def value(self, **labels):
+        """当前值"""
+        if self._function is not None:
+            return self._function()
+        return self._values.get(self._key(labels), 0)
+    
+    def samples(self):
+        if self._function is not None:
+            return [f'{self.name} {_format_value(self._function())}']
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+
+class Histogram(_Metric):
+    """直方图，按分桶统计观测值的分布，同时记录总和与次数"""
+    
+    type_name = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY, buckets=DEFAULT_BUCKETS):
+        """初始化直方图
+        
+        Args:
+            buckets: 分桶上界（升序），自动追加 +Inf
+        """
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value, **labels):
+        """记录一个观测值"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各分桶计数(含+Inf), 总和, 次数]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+    
+    def count(self, **labels):
+        """观测次数"""
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+    
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+运行统计工具
+记录处理流程各阶段的耗时、处理行数、每秒行数和进程内存峰值，汇总为结构化的运行报告。
+同名阶段多次调用时累计，嵌套调用按层级显示。
+"""
+
+import functools
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# 报告表格的中文列名
+REPORT_COLUMNS = {
+    'stage': '阶段',
+    'calls': '调用次数',
+    'seconds': '耗时(秒)',
+    'rows': '处理行数',
+    'rows_per_sec': '行/秒',
+    'peak_mb': '内存峰值(MB)'
+}
+
+# 阶段完成时调用的监听函数，参数为 (阶段名称, 耗时秒数, 处理行数)，用于导出监控指标
+_stage_listeners = []
+
+
+def add_stage_listener(listener):
+    """注册阶段完成监听函数，所有处理器的阶段都会通知
+    
+    Args:
+        listener: 函数，参数为 (阶段名称, 耗时秒数, 处理行数或None)
+    """
+    if listener not in _stage_listeners:
+        _stage_listeners.append(listener)
+
+
+def remove_stage_listener(listener):
+    """移除阶段完成监听函数"""
+    if listener in _stage_listeners:
+        _stage_listeners.remove(listener)
+
+
+def peak_memory_mb():
+    """当前进程的内存峰值(MB)，不支持时返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS单位为字节，Linux为KB
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def frame_rows(df):
+    """DataFrame的行数，为None时返回None"""
+    return len(df) if df is not None else None
+
+
+def _empty_stage(depth):
+    """新阶段的初始统计"""
+    return {'depth': depth, 'calls': 0, 'seconds': 0.0, 'rows': None, 'peak_mb': None}
+
+
+class RunReport:
+    """运行报告类，按阶段累计耗时、行数和内存峰值"""
+    
+    def __init__(self):
+        """初始化运行报告"""
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def __getstate__(self):
+        """序列化时只保留阶段统计，锁和线程局部变量重新创建"""
+        with self._lock:
+            return {'_stages': dict(self._stages)}
+    
+    def __setstate__(self, state):
+        self.__init__()
+        self._stages = state['_stages']
+    
+    def reset(self):
+        """清空已记录的阶段"""
+        with self._lock:
+            self._stages = {}
+    
+    @contextmanager
+    def stage(self, name):
+        """记录一个阶段，可在with块中设置处理行数
+        
+        Args:
+            name: 阶段名称
+        
+        Yields:
+            dict: 阶段记录，设置 record['rows'] 记录处理行数
+        """
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        with self._lock:
+            # 开始时登记阶段，报告按开始顺序排列，外层阶段在嵌套阶段之前
+            self._stages.setdefault(name, _empty_stage(depth))
+        record = {'rows': None}
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self._local.depth = depth
+            self._add(name, depth, time.perf_counter() - start_time, record['rows'])
+    
+    def _add(self, name, depth, seconds, rows):
+        """累计一次阶段调用"""
+        peak = peak_memory_mb()
+        with self._lock:
+            stage = self._stages.setdefault(name, _empty_stage(depth))
+            stage['calls'] += 1
+            stage['seconds'] += seconds
+            if rows is not None:
+                stage['rows'] = (stage['rows'] or 0) + rows
+            if peak is not None:
+                stage['peak_mb'] = max(stage['peak_mb'] or 0, peak)
+        
+        for listener in list(_stage_listeners):
+            listener(name, seconds, rows)
+    
+    def to_records(self):
+        """阶段记录列表，按阶段第一次开始的顺序排列
+        
+        Returns:
+            list: [{'stage', 'depth', 'calls', 'seconds', 'rows', 'rows_per_sec', 'peak_mb'}]
+        """
+        with self._lock:
+            stages = [(name, dict(stage)) for name, stage in self._stages.items() if stage['calls']]
+        
+        records = []
+        for name, stage in stages:
+            rows = stage['rows']
+            seconds = stage['seconds']
+            records.append({
+                'stage': name,
+                'depth': stage['depth'],
+                'calls': stage['calls'],
+                'seconds': round(seconds, 4),
+                'rows': rows,
+                'rows_per_sec': round(rows / seconds) if rows and seconds > 0 else None,
+                'peak_mb': round(stage['peak_mb'], 1) if stage['peak_mb'] is not None else None
+            })
+        return records
+    
+    def to_dict(self):
+        """运行报告字典，可直接序列化为JSON
+        
+        Returns:
+            dict: {'stages': 阶段记录列表, 'total_seconds': 顶层阶段耗时合计, 'peak_mb': 内存峰值}
+        """
+        records = self.to_records()
+        peaks = [record['peak_mb'] for record in records if record['peak_mb'] is not None]
+        return {
+            'stages': records,
+            'total_seconds': round(sum(record['seconds'] for record in records if record['depth'] == 0), 4),
+            'peak_mb': max(peaks) if peaks else None
+        }
+    
+    def to_frame(self):
+        """运行报告表格，阶段名称按层级缩进
+        
+        Returns:
+            DataFrame: 运行报告
+        """
+        import pandas as pd
+        
+        records = self.to_records()
+        for record in records:
+            record['stage'] = '  ' * record.pop('depth') + record['stage']
+        df = pd.DataFrame(records, columns=list(REPORT_COLUMNS))
+        df[['rows', 'rows_per_sec']] = df[['rows', 'rows_per_sec']].astype('Int64')
+        return df.rename(columns=REPORT_COLUMNS)
+    
+    def format_text(self):
+        """运行报告文本，用于命令行输出"""
+        records = self.to_records()
+        if not records:
+            return "没有记录运行阶段"
+        
+        lines = [f"{'阶段':<32}{'调用':>6}{'耗时(秒)':>12}{'行数':>10}{'行/秒':>12}{'内存峰值(MB)':>14}"]
+        for record in records:
+            name = '  ' * record['depth'] + record['stage']
+            rows = record['rows'] if record['rows'] is not None else '-'
+            rows_per_sec = record['rows_per_sec'] if record['rows_per_sec'] is not None else '-'
+            peak = record['peak_mb'] if record['peak_mb'] is not None else '-'
+            lines.append(f"{name:<32}{record['calls']:>6}{record['seconds']:>12.4f}{rows:>10}{rows_per_sec:>12}{peak:>14}")
+        return '\n'.join(lines)
+
+
+def timed_stage(name=None, rows=None):
+    """方法装饰器：将方法调用记录到实例的 run_report 中
+    
+    Args:
+        name: 阶段名称，默认使用方法名
+        rows: 计算处理行数的函数，参数为 (实例, 返回值)
+    
+    Returns:
+        装饰器
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+        
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            report = getattr(self, 'run_report', None)
+            if report is None:
+                return func(self, *args, **kwargs)
+            
+            with report.stage(stage_name) as record:
+                result = func(self, *args, **kwargs)
+                if rows is not None:
+                    try:
+                        record['rows'] = rows(self, result)
+                    except Exception:
+                        record['rows'] = None
+                return result
+        
+        return wrapper
+    
+    return decorator
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时检查
+在独立子进程中用 python -X importtime 导入各入口模块，统计导入耗时，
+检查不应在启动时导入的重量级模块，以及导入时是否配置了日志处理器。
+超出预算时返回非零退出码，可在CI中运行：
+
+    python utils/startup_profile.py
+    python utils/startup_profile.py --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 入口模块: (导入语句, 导入耗时预算(ms), 不允许导入的顶层包)
+ENTRY_POINTS = {
+    'main': ('import main', 200, ('pandas', 'numpy', 'openpyxl', 'plotly', 'streamlit', 'flask')),
+    'api._runtime': (
+        "import sys; sys.path.insert(0, 'api'); import _runtime",
+        150, ('pandas', 'numpy', 'openpyxl', 'plotly', 'streamlit')
+    ),
+    'core.trading_processor': ('import core.trading_processor', 800, ('plotly', 'streamlit', 'flask', 'openpyxl', 'numba')),
+    'core.trading_review': ('import core.trading_review', 800, ('plotly', 'streamlit', 'flask', 'openpyxl', 'numba')),
+}
+
+# 子进程导入完成后输出根日志处理器数量，用于检查导入时的副作用
+# logging在导入入口模块前导入并计入基准，不影响统计
+BASELINE_STATEMENT = 'import logging'
+HANDLER_CHECK = "; print(len(logging.getLogger().handlers))"
+
+
+def parse_importtime(output):
+    """解析 -X importtime 的输出
+    
+    Args:
+        output: 子进程的标准错误输出
+    
+    Returns:
+        list: [(模块名, 自身耗时us, 累计耗时us, 嵌套层级)]
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.split('|', 2)
+        self_us = int(self_us.split(':')[-1])
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append((name.strip(), self_us, int(cumulative_us), level))
+    return records
+
+
+def profile_entry(statement):
+    """在子进程中执行导入语句并解析导入耗时
+    
+    Args:
+        statement: 导入语句
+    
+    Returns:
+        tuple: (导入记录列表, 根日志处理器数量)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'{BASELINE_STATEMENT}; {statement}{HANDLER_CHECK}'],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    
+    handlers = int(result.stdout.strip().splitlines()[-1])
+    return parse_importtime(result.stderr), handlers
+
+
+def check_entry(name, statement, budget_ms, forbidden, top=0):
+    """检查一个入口模块的导入耗时和导入内容
+    
+    Returns:
+        bool: 是否满足预算
+    """
+    # 解释器启动本身导入的模块（site等）不计入
+    baseline = {record[0] for record in parse_importtime(subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BASELINE_STATEMENT], capture_output=True, text=True
+    ).stderr)}
+    
+    records, handlers = profile_entry(statement)
+    records = [record for record in records if record[0] not in baseline]
+    total_ms = sum(record[2] for record in records if record[3] == 0) / 1000
+    packages = {record[0].split('.')[0] for record in records}
+    loaded_forbidden = sorted(packages & set(forbidden))
+    
+    ok = total_ms <= budget_ms and not loaded_forbidden and handlers == 0
+    print(f"{'✅' if ok else '❌'} {name}: {total_ms:.0f} ms (预算 {budget_ms} ms)")
+    if loaded_forbidden:
+        print(f"   导入了不应在启动时加载的包: {', '.join(loaded_forbidden)}")
+    if handlers:
+        print(f"   导入时配置了 {handlers} 个根日志处理器")
+    
+    if top:
+        for module, _, cumulative_us, _ in sorted(
+            (record for record in records if record[3] == 0), key=lambda record: -record[2]
+        )[:top]:
+            print(f"   {cumulative_us / 1000:8.1f} ms  {module}")
+    
+    return ok
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="检查入口模块的导入耗时")
+    parser.add_argument('modules', nargs='*', help='只检查指定的入口模块')
+    parser.add_argument('--top', type=int, default=0, help='列出耗时最多的顶层导入')
+    args = parser.parse_args()
+    
+    names = args.modules or list(ENTRY_POINTS)
+    results = []
+    for name in names:
+        if name not in ENTRY_POINTS:
+            print(f"❌ 未知的入口模块: {name}")
+            results.append(False)
+            continue
+        statement, budget_ms, forbidden = ENTRY_POINTS[name]
+        results.append(check_entry(name, statement, budget_ms, forbidden, args.top))
+    
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+xlsx工作表原地替换工具
+xlsx文件是zip包，每个工作表是其中一个独立的XML部件。替换某个工作表的数据时，
+只重新生成该工作表的XML，其余部件（包括很大的交易数据、收盘价格工作表）按原始
+压缩字节复制，先流式写入同目录下的临时文件，完成后原子重命名覆盖原文件。
+"""
+
+import os
+import copy
+import re
+import math
+import shutil
+import struct
+import zlib
+import tempfile
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+# OOXML命名空间
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+OFFICE_DOCUMENT_TYPE = REL_NS + '/officeDocument'
+
+# XML 1.0 不允许的控制字符
+ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# 每次写入的行数
+ROWS_PER_CHUNK = 1000
+
+# zip格式常量
+CENTRAL_DIRECTORY_SIGNATURE = b'PK\x01\x02'
+END_OF_DIRECTORY_SIGNATURE = b'PK\x05\x06'
+ZIP64_END_SIGNATURE = b'PK\x06\x06'
+DATA_DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+DATA_DESCRIPTOR_FLAG = 0x08
+UTF8_FLAG = 0x800
+ZIP64_LIMIT = 0xFFFFFFFF
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+def _resolve_target(base_dir, target):
+    """将关系中的Target解析为zip包内的路径"""
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+
+def find_sheet_part(zf, sheet_name):
+    """查找工作表对应的XML部件路径
+    
+    Args:
+        zf: 已打开的 zipfile.ZipFile
+        sheet_name: 工作表名称
+    
+    Returns:
+        str: 部件路径（例如 xl/worksheets/sheet3.xml），工作表不存在时返回None
+    """
+    # 包关系 -> 工作簿部件
+    root_rels = ET.fromstring(zf.read('_rels/.rels'))
+    workbook_part = None
+    for rel in root_rels.iter(f'{{{PACKAGE_REL_NS}}}Relationship'):
+        if rel.get('Type') == OFFICE_DOCUMENT_TYPE:
+            workbook_part = _resolve_target('', rel.get('Target'))
+            break
+    if workbook_part is None:
+        return None
+    
+    # 工作簿 -> 工作表关系ID
+    workbook = ET.fromstring(zf.read(workbook_part))
+    rel_id = None
+    for sheet in workbook.iter(f'{{{MAIN_NS}}}sheet'):
+        if sheet.get('name') == sheet_name:
+            rel_id = sheet.get(f'{{{REL_NS}}}id')
+            break
+    if rel_id is None:
+        return None
+    
+    # 工作簿关系 -> 工作表部件
+    workbook_dir, workbook_file = posixpath.split(workbook_part)
+    workbook_rels = ET.fromstring(zf.read(posixpath.join(workbook_dir, '_rels', workbook_file + '.rels')))
+    for rel in workbook_rels.iter(f'{{{PACKAGE_REL_NS}}}Relationship'):
+        if rel.get('Id') == rel_id:
+            return _resolve_target(workbook_dir, rel.get('Target'))
+    return None
+
+
+def _cell_xml(ref, value):
+    """生成单个单元格的XML，空值返回空字符串"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        return f'<c r="{ref}"><v>{value!r}</v></c>'
+    if isinstance(value, pd.Timestamp):
+        value = value.strftime('%Y-%m-%d %H:%M:%S')
+    
+    text = escape(ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def iter_sheet_xml(df):
+    """逐块生成工作表XML，字符串使用内联字符串，不需要修改共享字符串表
+    
+    Args:
+        df: 工作表数据，第一行写入列名
+    
+    Yields:
+        str: XML片段
+    """
+    columns = [get_column_letter(i + 1) for i in range(max(len(df.columns), 1))]
+    last_ref = f'{columns[-1]}{len(df) + 1}'
+    
+    yield ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+           f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+           f'<dimension ref="A1:{last_ref}"/><sheetData>')
+    
+    header = ''.join(_cell_xml(f'{col}1', name) for col, name in zip(columns, df.columns))
+    yield f'<row r="1">{header}</row>'
+    
+    for start in range(0, len(df), ROWS_PER_CHUNK):
+        chunk = df.iloc[start:start + ROWS_PER_CHUNK]
+        parts = []
+        for offset, values in enumerate(chunk.itertuples(index=False, name=None)):
+            row_number = start + offset + 2
+            cells = ''.join(
+                _cell_xml(f'{col}{row_number}', value.item() if hasattr(value, 'item') else value)
+                for col, value in zip(columns, values)
+            )
+            parts.append(f'<row r="{row_number}">{cells}</row>')
+        yield ''.join(parts)
+    
+    yield '</sheetData></worksheet>'
+
+
+def _write_sheet_record(out, local_header, df):
+    """写入新工作表部件的本地文件记录，内容流式压缩，校验值和大小写在数据描述符中
+    
+    Args:
+        out: 输出文件
+        local_header: 原部件的本地文件头（含文件名）
+        df: 工作表数据
+    
+    Returns:
+        tuple: (CRC32, 压缩后大小, 原始大小, 标志位)
+    """
+    header = bytearray(local_header)
+    name_length = struct.unpack_from('<H', header, 26)[0]
+    del header[30 + name_length:]
+    # 标志位保留UTF-8文件名位并设置数据描述符位，压缩方式为deflate，不写扩展字段
+    flags = struct.unpack_from('<H', header, 6)[0] & UTF8_FLAG | DATA_DESCRIPTOR_FLAG
+    struct.pack_into('<HH', header, 6, flags, zipfile.ZIP_DEFLATED)
+    struct.pack_into('<3L', header, 14, 0, 0, 0)
+    struct.pack_into('<H', header, 28, 0)
+    out.write(header)
+    
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    crc = compressed_size = size = 0
+    for fragment in iter_sheet_xml(df):
+        data = fragment.encode('utf-8')
+        crc = zlib.crc32(data, crc)
+        size += len(data)
+        block = compressor.compress(data)
+        compressed_size += len(block)
+        out.write(block)
+    block = compressor.flush()
+    compressed_size += len(block)
+    out.write(block)
+    
+    out.write(struct.pack('<4s3L', DATA_DESCRIPTOR_SIGNATURE, crc, compressed_size, size))
+    return crc, compressed_size, size, flags
+
+
+def _copy_bytes(src, out, start, length):
+    """从src的start处复制length字节到out"""
+    src.seek(start)
+    while length > 0:
+        block = src.read(min(length, COPY_BLOCK_SIZE))
+        if not block:
+            raise zipfile.BadZipFile("文件意外结束")
+        out.write(block)
+        length -= len(block)
+
+
+def _rewrite_raw(path, temp_path, sheet_part, df):
+    """按原始字节复制未修改的部件，只重新生成目标工作表
+    
+    未修改部件的本地文件记录（文件头、压缩数据、数据描述符）直接复制，不解压；
+    中央目录记录只修改偏移量（目标部件另外修改校验值和大小）。
+    
+    Returns:
+        bool: 是否完成，zip64格式的文件返回False
+    """
+    with open(path, 'rb') as src, zipfile.ZipFile(src) as zin:
+        infos = zin.infolist()
+        if any(max(info.file_size, info.compress_size, info.header_offset) >= ZIP64_LIMIT for info in infos):
+            return False
+        
+        src.seek(zin.start_dir)
+        directory = bytearray(src.read())
+        if directory.find(ZIP64_END_SIGNATURE) != -1:
+            return False
+        
+        # 本地文件记录按偏移量排列，每条记录延续到下一条记录或中央目录开始处
+        ordered = sorted(infos, key=lambda info: info.header_offset)
+        ends = [info.header_offset for info in ordered[1:]] + [zin.start_dir]
+        
+        offsets = {}
+        target = None
+        with open(temp_path, 'wb') as out:
+            for info, end in zip(ordered, ends):
+                offsets[info.filename] = out.tell()
+                if info.filename == sheet_part:
+                    src.seek(info.header_offset)
+                    local_header = src.read(30)
+                    local_header += src.read(struct.unpack_from('<H', local_header, 26)[0])
+                    target = _write_sheet_record(out, local_header, df)
+                else:
+                    _copy_bytes(src, out, info.header_offset, end - info.header_offset)
+            
+            # 中央目录记录与 infolist() 顺序一致
+            directory_offset = out.tell()
+            position = 0
+            for info in infos:
+                if directory[position:position + 4] != CENTRAL_DIRECTORY_SIGNATURE:
+                    raise zipfile.BadZipFile("中央目录格式错误")
+                if info.filename == sheet_part:
+                    crc, compressed_size, size, flags = target
+                    struct.pack_into('<HH', directory, position + 8, flags, zipfile.ZIP_DEFLATED)
+                    struct.pack_into('<3L', directory, position + 16, crc, compressed_size, size)
+                struct.pack_into('<L', directory, position + 42, offsets[info.filename])
+                name_length, extra_length, comment_length = struct.unpack_from('<3H', directory, position + 28)
+                position += 46 + name_length + extra_length + comment_length
+            
+            # 中央目录结束记录中的目录偏移量
+            if directory[position:position + 4] != END_OF_DIRECTORY_SIGNATURE:
+                raise zipfile.BadZipFile("中央目录结束记录格式错误")
+            struct.pack_into('<L', directory, position + 16, directory_offset)
+            out.write(directory)
+    
+    return True
+
+
+def _rewrite_with_zipfile(path, temp_path, sheet_part, df):
+    """用zipfile逐个部件解压后重新压缩写入（zip64文件使用）"""
+    with zipfile.ZipFile(path) as zin, zipfile.ZipFile(temp_path, 'w') as zout:
+        for info in zin.infolist():
+            # 复制条目信息（名称、时间、压缩方式），写入时偏移量和校验值会被重新计算
+            out_info = copy.copy(info)
+            if info.filename == sheet_part:
+                with zout.open(out_info, 'w') as target:
+                    for fragment in iter_sheet_xml(df):
+                        target.write(fragment.encode('utf-8'))
+            else:
+                with zin.open(info) as source, zout.open(out_info, 'w') as target:
+                    shutil.copyfileobj(source, target)
+
+
+def replace_sheet_data(path, sheet_name, df):
+    """原地替换xlsx文件中一个已存在工作表的数据
+    
+    只重写目标工作表的XML部件，其他部件的压缩数据逐字节复制，不需要解压；
+    写入同目录的临时文件后用 os.replace 原子替换，中途失败时原文件不受影响。
+    
+    Args:
+        path: xlsx文件路径
+        sheet_name: 工作表名称
+        df: 新的工作表数据
+    
+    Returns:
+        bool: 是否替换成功，工作表不存在时返回False
+    """
+    with zipfile.ZipFile(path) as zin:
+        sheet_part = find_sheet_part(zin, sheet_name)
+    if sheet_part is None:
+        return False
+    
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(suffix='.xlsx', dir=directory)
+    os.close(fd)
+    
+    try:
+        if not _rewrite_raw(path, temp_path, sheet_part, df):
+            _rewrite_with_zipfile(path, temp_path, sheet_part, df)
+        
+        shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return True
@@ -5,13 +5,14 @@ Flask Web应用
 用于Cloudflare部署的Web版本
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, g
 import pandas as pd
 import json
 import os
 import sys
 from datetime import datetime
 import io
+import time
 import base64
 
 # 添加项目根目录到Python路径
@@ -19,20 +20,83 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.trading_processor import TradingProcessor
 from core.trading_review import TradingReview
-from config.settings import DATA_DIR, REPORTS_DIR
+from config.settings import DATA_DIR, REPORTS_DIR, ensure_directories, setup_logging
+from utils.http_cache import conditional_json, file_etag, make_etag
+from utils.metrics import CONTENT_TYPE, REGISTRY, SIZE_BUCKETS, Counter, Gauge, Histogram
+from utils.run_report import add_stage_listener
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# 上传文件和分析结果写入data、reports目录，WSGI服务器直接加载app时也需要这些目录
+ensure_directories()
+
 # 全局变量存储处理器实例
 processor = None
 
+# ==================== 监控指标 ====================
+# 通过 /metrics 以Prometheus文本格式输出
+
+REQUEST_LATENCY = Histogram(
+    'trading_http_request_duration_seconds', 'HTTP请求耗时（秒）', ('route', 'method', 'status')
+)
+REQUESTS_IN_FLIGHT = Gauge('trading_http_requests_in_flight', '正在处理的HTTP请求数')
+HTTP_CACHE_RESULTS = Counter(
+    'trading_http_cache_total', '带ETag的响应中客户端缓存命中(304)和未命中的次数', ('route', 'result')
+)
+UPLOAD_SIZE = Histogram('trading_upload_size_bytes', '上传文件大小（字节）', buckets=SIZE_BUCKETS)
+STAGE_DURATION = Histogram('trading_stage_duration_seconds', '数据处理各阶段耗时（秒）', ('stage',))
+ROWS_PROCESSED = Counter('trading_rows_processed_total', '数据处理各阶段处理的行数', ('stage',))
+JOBS_IN_PROGRESS = Gauge('trading_processing_jobs', '正在执行或排队等待的数据加载和处理任务数')
+PROCESSORS_IN_MEMORY = Gauge('trading_processors_in_memory', '内存中的处理器数量')
+PROCESSORS_IN_MEMORY.set_function(lambda: 0 if processor is None else 1)
+
+
+def _record_stage(stage, seconds, rows):
+    """处理器阶段完成时记录耗时和行数"""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    if rows:
+        ROWS_PROCESSED.inc(rows, stage=stage)
+
+
+add_stage_listener(_record_stage)
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+
+
+@app.after_request
+def _record_request(response):
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_LATENCY.observe(
+        time.perf_counter() - g.request_start, route=route, method=request.method, status=response.status_code
+    )
+    if response.headers.get('ETag'):
+        HTTP_CACHE_RESULTS.inc(route=route, result='hit' if response.status_code == 304 else 'miss')
+    return response
+
+
+@app.teardown_request
+def _finish_request(exc):
+    if 'request_start' in g:
+        REQUESTS_IN_FLIGHT.dec()
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus监控指标"""
+    return REGISTRY.render(), 200, {'Content-Type': CONTENT_TYPE}
+
 @app.route('/')
 def index():
     """主页"""
     return render_template('index.html')
 
 @app.route('/upload', methods=['POST'])
+@JOBS_IN_PROGRESS.track_inprogress()
 def upload_file():
     """上传Excel文件"""
     global processor
@@ -50,6 +114,7 @@ def upload_file():
             filename = f"uploaded_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
             filepath = os.path.join(DATA_DIR, filename)
             file.save(filepath)
+            UPLOAD_SIZE.observe(os.path.getsize(filepath))
             
             # 创建处理器并加载数据
             processor = TradingProcessor()
@@ -68,6 +133,7 @@ def upload_file():
     return jsonify({'error': '请上传Excel文件(.xlsx)'}), 400
 
 @app.route('/process', methods=['POST'])
+@JOBS_IN_PROGRESS.track_inprogress()
 def process_data():
     """处理交易数据"""
     global processor
@@ -76,11 +142,8 @@ def process_data():
         return jsonify({'error': '请先上传数据文件'}), 400
     
     try:
-        # 计算费用和盈亏
-        if not processor.calculate_fees():
-            return jsonify({'error': '费用计算失败'}), 500
-        
-        if not processor.calculate_pnl():
+        # 计算费用、持仓和每日盈亏
+        if not processor.process_data():
             return jsonify({'error': '盈亏计算失败'}), 500
         
         # 生成结果文件
@@ -108,38 +171,53 @@ def get_dashboard_data():
         return jsonify({'error': '请先上传并处理数据'}), 400
     
     try:
-        # 获取基本统计信息
-        stats = {}
-        
-        if processor.trades_df is not None:
-            stats['total_trades'] = len(processor.trades_df)
-            stats['total_amount'] = float(processor.trades_df['交易金额'].sum()) if '交易金额' in processor.trades_df.columns else 0
-        
-        if processor.positions:
-            stats['current_positions'] = len(processor.positions)
-            stats['total_market_value'] = sum([pos.get('市值', 0) for pos in processor.positions.values()])
-        
-        # 获取持仓数据
-        positions_data = []
-        for symbol, position in processor.positions.items():
-            positions_data.append({
-                'symbol': symbol,
-                'name': position.get('证券名称', ''),
-                'quantity': position.get('数量', 0),
-                'cost': position.get('成本价', 0),
-                'current_price': position.get('当前价格', 0),
-                'market_value': position.get('市值', 0),
-                'pnl': position.get('盈亏', 0)
-            })
-        
-        return jsonify({
-            'stats': stats,
-            'positions': positions_data
-        })
-        
+        # 数据版本未变化时直接返回304，不再重新汇总
+        etag = make_etag('dashboard_data', processor.data_tag)
+        return conditional_json(request, lambda: _build_dashboard_data(processor), etag=etag)
     except Exception as e:
         return jsonify({'error': f'获取数据失败: {str(e)}'}), 500
 
+def _build_dashboard_data(processor):
+    """汇总仪表盘数据"""
+    # 获取基本统计信息
+    stats = {}
+    
+    if processor.trades_df is not None:
+        stats['total_trades'] = len(processor.trades_df)
+        stats['total_amount'] = float(processor.trades_df['交易金额'].sum()) if '交易金额' in processor.trades_df.columns else 0
+    
+    if processor.positions:
+        stats['current_positions'] = len(processor.positions)
+        stats['total_market_value'] = sum([pos.get('市值', 0) for pos in processor.positions.values()])
+    
+    # 获取持仓数据
+    positions_data = []
+    for symbol, position in processor.positions.items():
+        positions_data.append({
+            'symbol': symbol,
+            'name': position.get('证券名称', ''),
+            'quantity': position.get('数量', 0),
+            'cost': position.get('成本价', 0),
+            'current_price': position.get('当前价格', 0),
+            'market_value': position.get('市值', 0),
+            'pnl': position.get('盈亏', 0)
+        })
+    
+    return {
+        'stats': stats,
+        'positions': positions_data
+    }
+
+@app.route('/run_report')
+def get_run_report():
+    """获取处理流程各阶段的耗时、处理行数和内存峰值"""
+    global processor
+    
+    if processor is None:
+        return jsonify({'error': '请先上传数据文件'}), 400
+    
+    return jsonify(processor.run_report.to_dict())
+
 @app.route('/generate_review', methods=['POST'])
 def generate_review():
     """生成交易复盘"""
@@ -161,7 +239,7 @@ def generate_review():
         report_filename = f"review_{review.review_date.strftime('%Y%m%d')}.md"
         report_path = os.path.join(REPORTS_DIR, report_filename)
         
-        if review.generate_review_report(report_path):
+        if review.save_review_report(report_path):
             # 读取报告内容
             with open(report_path, 'r', encoding='utf-8') as f:
                 report_content = f.read()
@@ -183,7 +261,14 @@ def download_file(filename):
     try:
         file_path = os.path.join(REPORTS_DIR, filename)
         if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
+            # conditional=True 处理 If-None-Match/304 和 Range 分段下载
+            return send_file(
+                file_path,
+                as_attachment=True,
+                conditional=True,
+                etag=file_etag(file_path),
+                max_age=0
+            )
         else:
             return jsonify({'error': '文件不存在'}), 404
     except Exception as e:
@@ -194,8 +279,6 @@ def too_large(e):
     return jsonify({'error': '文件太大，请上传小于16MB的文件'}), 413
 
 if __name__ == '__main__':
-    # 确保必要目录存在
-    os.makedirs(DATA_DIR, exist_ok=True)
-    os.makedirs(REPORTS_DIR, exist_ok=True)
+    setup_logging()
     
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file